@@ -0,0 +1,146 @@
+"""Closed-loop load driver for the research API.
+
+Keeps `concurrency` research tasks in flight until `tasks` have been
+submitted; each task is a POST /research followed by reading its SSE stream
+to the terminal event.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class TaskResult:
+    index: int
+    task_id: str | None = None
+    status: str = "pending"
+    error: str | None = None
+    # All timings are seconds from the POST being sent
+    accepted: float | None = None
+    first_event: float | None = None
+    first_delta: float | None = None
+    report: float | None = None
+    events: int = 0
+
+
+@dataclass
+class LoadResult:
+    tasks: list[TaskResult] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def wall_time(self) -> float:
+        return self.finished - self.started
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Linear-interpolated percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+async def _run_one(
+    client: httpx.AsyncClient, base_url: str, query: str, result: TaskResult
+) -> None:
+    started = time.monotonic()
+    try:
+        resp = await client.post(f"{base_url}/research", json={"query": query})
+        resp.raise_for_status()
+        result.accepted = time.monotonic() - started
+        result.task_id = resp.json()["task_id"]
+
+        async with client.stream("GET", f"{base_url}/research/{result.task_id}/stream") as stream:
+            async for line in stream.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                now = time.monotonic() - started
+                event = json.loads(line[5:])
+                result.events += 1
+                if result.first_event is None:
+                    result.first_event = now
+                event_type = event.get("event_type")
+                if event_type == "report_delta" and result.first_delta is None:
+                    result.first_delta = now
+                if event_type == "completed":
+                    result.report = now
+                    result.status = "completed"
+                    return
+                if event_type == "failed":
+                    result.status = "failed"
+                    result.error = event.get("message")
+                    return
+        result.status = "failed"
+        result.error = "Stream ended without a terminal event"
+    except Exception as e:
+        result.status = "error"
+        result.error = f"{e.__class__.__name__}: {e}"
+
+
+async def run_load(
+    base_url: str,
+    queries: list[str],
+    concurrency: int,
+    timeout: float = 600.0,
+) -> LoadResult:
+    """Run every query through the API with at most `concurrency` in flight."""
+    load = LoadResult(tasks=[TaskResult(index=i) for i in range(len(queries))])
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 2 + 10)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def _worker(i: int) -> None:
+            async with gate:
+                await _run_one(client, base_url, queries[i], load.tasks[i])
+
+        load.started = time.monotonic()
+        await asyncio.gather(*(_worker(i) for i in range(len(queries))))
+        load.finished = time.monotonic()
+    return load
+
+
+def report(load: LoadResult) -> dict:
+    completed = [t for t in load.tasks if t.status == "completed"]
+    errors: dict[str, int] = {}
+    for t in load.tasks:
+        if t.status != "completed":
+            key = (t.error or t.status)[:120]
+            errors[key] = errors.get(key, 0) + 1
+    return {
+        "tasks": len(load.tasks),
+        "completed": len(completed),
+        "failed": len(load.tasks) - len(completed),
+        "wall_time": load.wall_time,
+        "tasks_per_sec": len(completed) / load.wall_time if load.wall_time else None,
+        "time_to_accept": summarize([t.accepted for t in load.tasks if t.accepted is not None]),
+        "time_to_first_event": summarize(
+            [t.first_event for t in load.tasks if t.first_event is not None]
+        ),
+        "time_to_first_delta": summarize(
+            [t.first_delta for t in completed if t.first_delta is not None]
+        ),
+        "time_to_report": summarize([t.report for t in completed]),
+        "errors": errors,
+    }
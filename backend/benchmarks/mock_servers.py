@@ -0,0 +1,292 @@
+"""Local stand-ins for the Firecrawl and OpenAI APIs used by the benchmarks.
+
+One FastAPI app serves both:
+
+    POST /firecrawl/v1/search
+    POST /firecrawl/v1/scrape
+    POST /openai/v1/chat/completions   (streaming and non-streaming)
+
+Point the backend at it with
+    FIRECRAWL_BASE_URL=http://127.0.0.1:9100/firecrawl/v1
+    OPENAI_BASE_URL=http://127.0.0.1:9100/openai/v1
+
+Run standalone:
+    python -m benchmarks.mock_servers --port 9100 --search-latency 0.3,0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = (
+    "research analysis market growth energy policy data model system network "
+    "security cloud revenue adoption survey trend impact cost risk regulation "
+    "performance benchmark latency throughput study report evidence result"
+).split()
+
+
+@dataclass
+class Latency:
+    """Log-normal latency: median seconds with a spread of sigma."""
+
+    median: float = 0.0
+    sigma: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str) -> "Latency":
+        median, _, sigma = value.partition(",")
+        return cls(float(median), float(sigma or 0.0))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(self.sigma * rng.gauss(0.0, 1.0))
+
+    def __str__(self) -> str:
+        return f"{self.median},{self.sigma}"
+
+
+@dataclass
+class MockConfig:
+    search_latency: Latency = field(default_factory=lambda: Latency(0.3, 0.5))
+    scrape_latency: Latency = field(default_factory=lambda: Latency(0.8, 0.5))
+    llm_latency: Latency = field(default_factory=lambda: Latency(1.0, 0.4))
+    # Delay between streamed chunks (inter-token latency)
+    stream_chunk_delay: float = 0.01
+    search_error_rate: float = 0.0
+    scrape_error_rate: float = 0.0
+    llm_error_rate: float = 0.0
+    # Share of LLM errors returned as 429 rather than 500
+    llm_rate_limit_share: float = 0.5
+    search_results: int = 5
+    scrape_chars: int = 8000
+    report_chars: int = 6000
+    stream_chunk_chars: int = 20
+    subqueries: int = 4
+    follow_up_rate: float = 0.5
+    seed: int | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            k: str(v) if isinstance(v, Latency) else v
+            for k, v in self.__dict__.items()
+        }
+
+
+def _text(rng: random.Random, chars: int) -> str:
+    words: list[str] = []
+    size = 0
+    while size < chars:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def _completion(content: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "mock",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk(completion_id: str, delta: dict | None, usage: dict | None = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "mock",
+        "choices": [] if delta is None else [
+            {"index": 0, "delta": delta, "finish_reason": None}
+        ],
+    }
+    if usage is not None:
+        payload["usage"] = usage
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_mock_app(config: MockConfig | None = None) -> FastAPI:
+    config = config or MockConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="Deep Research benchmark mocks")
+    app.state.config = config
+    app.state.counters = {"search": 0, "scrape": 0, "chat": 0, "errors": 0}
+
+    def _fail(rate: float) -> bool:
+        if rate and rng.random() < rate:
+            app.state.counters["errors"] += 1
+            return True
+        return False
+
+    @app.post("/firecrawl/v1/search")
+    async def search(request: Request):
+        body = await request.json()
+        app.state.counters["search"] += 1
+        await asyncio.sleep(config.search_latency.sample(rng))
+        if _fail(config.search_error_rate):
+            return JSONResponse({"success": False, "error": "mock failure"}, status_code=500)
+        query = body.get("query", "")
+        limit = min(body.get("limit", config.search_results), config.search_results)
+        # Same query, same URLs, so source caching and dedup behave realistically
+        slug = uuid.uuid5(uuid.NAMESPACE_URL, query).hex[:10]
+        data = [
+            {
+                "title": f"{query} ({i + 1})",
+                "url": f"https://example.com/{slug}/{i}",
+                "description": _text(rng, 200),
+            }
+            for i in range(limit)
+        ]
+        return {"success": True, "data": data}
+
+    @app.post("/firecrawl/v1/scrape")
+    async def scrape(request: Request):
+        body = await request.json()
+        app.state.counters["scrape"] += 1
+        await asyncio.sleep(config.scrape_latency.sample(rng))
+        if _fail(config.scrape_error_rate):
+            return JSONResponse({"success": False, "error": "mock failure"}, status_code=500)
+        markdown = f"# {body.get('url', '')}\n\n" + _text(rng, config.scrape_chars)
+        return {"success": True, "data": {"markdown": markdown}}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.counters["chat"] += 1
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+
+        await asyncio.sleep(config.llm_latency.sample(rng))
+        if _fail(config.llm_error_rate):
+            if rng.random() < config.llm_rate_limit_share:
+                return JSONResponse(
+                    {"error": {"message": "mock rate limit", "type": "rate_limit"}},
+                    status_code=429,
+                    headers={"retry-after": "1"},
+                )
+            return JSONResponse(
+                {"error": {"message": "mock failure", "type": "server_error"}},
+                status_code=500,
+            )
+
+        if "research assistant" in system:
+            content = json.dumps(
+                {"queries": [_text(rng, 40) for _ in range(config.subqueries)]}
+            )
+        elif "research analyst" in system:
+            more = rng.random() < config.follow_up_rate
+            content = json.dumps(
+                {
+                    "needs_more_research": more,
+                    "follow_up_queries": [_text(rng, 40) for _ in range(2)] if more else [],
+                    "key_findings": _text(rng, 300),
+                }
+            )
+        else:
+            content = "# Mock report\n\n" + _text(rng, config.report_chars)
+
+        completion_tokens = len(content) // 4
+        if not body.get("stream"):
+            return _completion(content, prompt_tokens, completion_tokens)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        step = max(config.stream_chunk_chars, 1)
+
+        async def _events():
+            yield _chunk(completion_id, {"role": "assistant", "content": ""})
+            for i in range(0, len(content), step):
+                if config.stream_chunk_delay:
+                    await asyncio.sleep(config.stream_chunk_delay)
+                yield _chunk(completion_id, {"content": content[i : i + step]})
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            yield _chunk(completion_id, None, usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.counters
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockConfig()
+    parser.add_argument("--search-latency", type=Latency.parse, default=defaults.search_latency,
+                        help="median[,sigma] seconds (log-normal)")
+    parser.add_argument("--scrape-latency", type=Latency.parse, default=defaults.scrape_latency)
+    parser.add_argument("--llm-latency", type=Latency.parse, default=defaults.llm_latency)
+    parser.add_argument("--stream-chunk-delay", type=float, default=defaults.stream_chunk_delay)
+    parser.add_argument("--search-error-rate", type=float, default=defaults.search_error_rate)
+    parser.add_argument("--scrape-error-rate", type=float, default=defaults.scrape_error_rate)
+    parser.add_argument("--llm-error-rate", type=float, default=defaults.llm_error_rate)
+    parser.add_argument("--search-results", type=int, default=defaults.search_results)
+    parser.add_argument("--scrape-chars", type=int, default=defaults.scrape_chars)
+    parser.add_argument("--report-chars", type=int, default=defaults.report_chars)
+    parser.add_argument("--subqueries", type=int, default=defaults.subqueries)
+    parser.add_argument("--follow-up-rate", type=float, default=defaults.follow_up_rate)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def mock_config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        search_latency=args.search_latency,
+        scrape_latency=args.scrape_latency,
+        llm_latency=args.llm_latency,
+        stream_chunk_delay=args.stream_chunk_delay,
+        search_error_rate=args.search_error_rate,
+        scrape_error_rate=args.scrape_error_rate,
+        llm_error_rate=args.llm_error_rate,
+        search_results=args.search_results,
+        scrape_chars=args.scrape_chars,
+        report_chars=args.report_chars,
+        subqueries=args.subqueries,
+        follow_up_rate=args.follow_up_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    app = create_mock_app(mock_config_from_args(args))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
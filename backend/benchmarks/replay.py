@@ -0,0 +1,190 @@
+"""Replay a recorded research task offline, optionally under a profiler.
+
+Record traces by running the API with TRACE_RECORD_DIR set; each task's
+searches, scrapes and LLM calls are written to {task_id}.trace.json.gz.
+Replay runs run_research in-process against the recording, with no network:
+
+    cd backend
+    python -m benchmarks.replay traces/<task_id>.trace.json.gz
+    python -m benchmarks.replay TRACE --time-scale 1          # recorded latencies
+    python -m benchmarks.replay TRACE --profile cpu --profile-output replay.prof
+    python -m benchmarks.replay TRACE --profile memory --env EXTRACTION_ENABLED=false
+
+Zero-latency playback (the default) leaves only the engine's own CPU time,
+so wall times compare engine changes on identical inputs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import cProfile
+import hashlib
+import json
+import os
+import pstats
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from config import Settings
+from services.blob_storage import close_storage
+from services.call_trace import CallTrace, ReplayLLM, TracePlayer
+from services.executor import close_executor
+from services.research_engine import run_research
+from services.task_registry import TaskRegistry
+from sources.replay_source import ReplaySource
+
+
+def replay_settings(trace: CallTrace, overrides: dict[str, str]) -> Settings:
+    """The recorded settings plus overrides, with every side effect kept local."""
+    return Settings(
+        **{
+            **trace.config,
+            **overrides,
+            "AZURE_STORAGE_CONNECTION_STRING": "",
+            "CHECKPOINT_ENABLED": False,
+            "REPORT_CACHE_ENABLED": False,
+            "REPORT_INDEX_ENABLED": False,
+            "TRACE_RECORD_DIR": "",
+        }
+    )
+
+
+async def replay(trace: CallTrace, config: Settings, time_scale: float = 0.0) -> dict:
+    """Run the trace's task once against its recording; returns a summary."""
+    player = TracePlayer(trace, time_scale)
+    registry = TaskRegistry()
+    task_id = str(uuid.uuid4())
+    started = time.monotonic()
+    registry.create_task(
+        task_id,
+        run_research(
+            trace.query,
+            task_id,
+            registry,
+            ReplaySource(player),
+            config,
+            llm=ReplayLLM(player),
+        ),
+    )
+    events = 0
+    report = None
+    try:
+        async for event in registry.subscribe(task_id):
+            events += 1
+            if event.event_type == "completed":
+                report = (event.data or {}).get("report")
+    finally:
+        close_executor()
+        await close_storage()
+    info = await registry.get_task(task_id)
+    return {
+        "status": info.status if info else "unknown",
+        "error": info.error if info else None,
+        "wall_time": round(time.monotonic() - started, 4),
+        "events": events,
+        "report_sha256": hashlib.sha256(report.encode()).hexdigest() if report else None,
+        "timings": info.timings if info else None,
+        "calls": player.stats(),
+    }
+
+
+@contextmanager
+def profiled(kind: str | None, output: str | None, top: int) -> Iterator[None]:
+    """Run the block under cProfile ("cpu") or tracemalloc ("memory") and print hot spots."""
+    if kind == "cpu":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            if output:
+                profile.dump_stats(output)
+            pstats.Stats(profile, stream=sys.stderr).sort_stats("cumulative").print_stats(top)
+    elif kind == "memory":
+        tracemalloc.start(10)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if output:
+                snapshot.dump(output)
+            print(f"peak traced memory {peak / 1e6:.1f} MB", file=sys.stderr)
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat, file=sys.stderr)
+    else:
+        yield
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded research task")
+    parser.add_argument("trace", help="trace file written under TRACE_RECORD_DIR")
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="multiplier on recorded latencies (0 = none, 1 = real time)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--profile", choices=("cpu", "memory"))
+    parser.add_argument("--profile-output", help="write cProfile stats / tracemalloc snapshot")
+    parser.add_argument("--top", type=int, default=25, help="hot spots to print")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="setting override on top of the recorded ones (repeatable)")
+    parser.add_argument("--output", help="write the summary as JSON")
+    args = parser.parse_args()
+
+    trace = CallTrace.load(args.trace)
+    overrides = dict(item.split("=", 1) for item in args.env)
+    if args.profile == "cpu":
+        # cProfile only sees this thread, so run every CPU step inline
+        overrides.setdefault("CPU_OFFLOAD_MIN_SIZE", str(sys.maxsize))
+    profile_output = Path(args.profile_output).resolve() if args.profile_output else None
+
+    runs = []
+    # Run from an empty directory so no .env is picked up and reports land there
+    with tempfile.TemporaryDirectory(prefix="replay-") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            config = replay_settings(trace, overrides)
+            with profiled(args.profile, str(profile_output) if profile_output else None, args.top):
+                for _ in range(args.repeat):
+                    runs.append(asyncio.run(replay(trace, config, args.time_scale)))
+        finally:
+            os.chdir(cwd)
+
+    wall_times = [run["wall_time"] for run in runs]
+    summary = {
+        "trace": args.trace,
+        "query": trace.query,
+        "recorded_calls": len(trace.calls),
+        "time_scale": args.time_scale,
+        "settings_overrides": overrides,
+        "wall_time": {
+            "min": min(wall_times),
+            "median": statistics.median(wall_times),
+            "max": max(wall_times),
+        },
+        "runs": runs,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    last = runs[-1]
+    print(f"{last['status']} x{len(runs)}  wall min {min(wall_times):.3f}s  "
+          f"median {statistics.median(wall_times):.3f}s  events {last['events']}")
+    print(f"calls {last['calls']}")
+    if last["error"]:
+        print(f"error {last['error']}")
+    return 0 if all(run["status"] == "completed" for run in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
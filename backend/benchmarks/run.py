@@ -0,0 +1,252 @@
+"""End-to-end benchmark: mock upstreams + the real API server + a load driver.
+
+Starts the mock Firecrawl/OpenAI server and `uvicorn main:app` as
+subprocesses, drives N concurrent research tasks through the API and writes
+p50/p95/p99 latencies, tasks/sec and the API server's peak RSS to JSON.
+
+    cd backend
+    python -m benchmarks.run --tasks 50 --concurrency 20 --output bench.json
+    python -m benchmarks.run --baseline bench.json --env MAX_CONCURRENT_LLM_CALLS=20
+
+With --baseline, the run exits non-zero if a tracked metric regressed by
+more than --tolerance relative to the baseline file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.load_driver import report, run_load
+from benchmarks.mock_servers import add_mock_arguments, mock_config_from_args
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# metric path -> True if higher is better
+_TRACKED = {
+    ("time_to_first_event", "p50"): False,
+    ("time_to_first_event", "p95"): False,
+    ("time_to_report", "p50"): False,
+    ("time_to_report", "p95"): False,
+    ("time_to_report", "p99"): False,
+    ("tasks_per_sec",): True,
+    ("peak_rss_mb",): False,
+}
+
+
+def _peak_rss_mb(pid: int) -> float | None:
+    """High-water RSS of a process from /proc (Linux only)."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _mock_argv(args: argparse.Namespace) -> list[str]:
+    argv = [
+        "--port", str(args.mock_port),
+        "--search-latency", str(args.search_latency),
+        "--scrape-latency", str(args.scrape_latency),
+        "--llm-latency", str(args.llm_latency),
+        "--stream-chunk-delay", str(args.stream_chunk_delay),
+        "--search-error-rate", str(args.search_error_rate),
+        "--scrape-error-rate", str(args.scrape_error_rate),
+        "--llm-error-rate", str(args.llm_error_rate),
+        "--search-results", str(args.search_results),
+        "--scrape-chars", str(args.scrape_chars),
+        "--report-chars", str(args.report_chars),
+        "--subqueries", str(args.subqueries),
+        "--follow-up-rate", str(args.follow_up_rate),
+    ]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    return argv
+
+
+def _api_env(args: argparse.Namespace, overrides: dict[str, str]) -> dict[str, str]:
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{mock_url}/openai/v1",
+        "FIRECRAWL_API_KEY": "bench",
+        "FIRECRAWL_BASE_URL": f"{mock_url}/firecrawl/v1",
+        "AZURE_STORAGE_CONNECTION_STRING": "",
+        # Every benchmark query is distinct; keep the report cache out of the numbers
+        "REPORT_CACHE_ENABLED": "false",
+    }
+    env.update(overrides)
+    return env
+
+
+def _queries(count: int, seed: int | None) -> list[str]:
+    rng = random.Random(seed)
+    topics = ["energy", "semiconductors", "healthcare", "logistics", "fintech", "climate"]
+    aspects = ["market size", "regulation", "key players", "adoption", "risks", "outlook"]
+    return [
+        f"{rng.choice(topics)} {rng.choice(aspects)} {2020 + rng.randrange(6)} #{i}"
+        for i in range(count)
+    ]
+
+
+def _lookup(results: dict, path: tuple[str, ...]):
+    value = results
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of each tracked metric worse than baseline by > tolerance."""
+    regressions = []
+    for path, higher_is_better in _TRACKED.items():
+        now, before = _lookup(current, path), _lookup(baseline, path)
+        if not isinstance(now, (int, float)) or not isinstance(before, (int, float)) or not before:
+            continue
+        change = (now - before) / before
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{'.'.join(path)}: {before:.3f} -> {now:.3f} ({change:+.1%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Deep Research end-to-end benchmark")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--api-port", type=int, default=9000)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="setting override for the API server (repeatable)")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed relative regression against --baseline")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    overrides = dict(item.split("=", 1) for item in args.env)
+    mock_config = mock_config_from_args(args)
+    api_url = f"http://127.0.0.1:{args.api_port}"
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        mock = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_servers", *_mock_argv(args)],
+            cwd=BACKEND_DIR,
+        )
+        api = None
+        try:
+            _wait_ready(f"http://127.0.0.1:{args.mock_port}/stats", mock)
+            # Run from an empty directory so no .env is picked up and local
+            # reports land in the temp dir
+            api = subprocess.Popen(
+                [
+                    sys.executable, "-m", "uvicorn", "main:app",
+                    "--app-dir", str(BACKEND_DIR),
+                    "--port", str(args.api_port),
+                    "--log-level", "warning",
+                ],
+                cwd=workdir,
+                env=_api_env(args, overrides),
+            )
+            _wait_ready(f"{api_url}/health", api)
+
+            load = asyncio.run(
+                run_load(api_url, _queries(args.tasks, args.seed), args.concurrency)
+            )
+            results = report(load)
+            results["peak_rss_mb"] = _peak_rss_mb(api.pid)
+            results["upstream_calls"] = httpx.get(
+                f"http://127.0.0.1:{args.mock_port}/stats"
+            ).json()
+        finally:
+            if api is not None:
+                _stop(api)
+            _stop(mock)
+
+    output = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "params": {"tasks": args.tasks, "concurrency": args.concurrency},
+        "settings_overrides": overrides,
+        "mock": mock_config.to_dict(),
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(output, indent=2), encoding="utf-8")
+
+    ttfe, ttr = results["time_to_first_event"], results["time_to_report"]
+
+    def _fmt(value) -> str:
+        return "-" if value is None else f"{value:.2f}s"
+
+    print(f"completed {results['completed']}/{results['tasks']} "
+          f"in {results['wall_time']:.1f}s ({results['tasks_per_sec'] or 0:.2f} tasks/s)")
+    print(f"first event  p50 {_fmt(ttfe['p50'])}  p95 {_fmt(ttfe['p95'])}  p99 {_fmt(ttfe['p99'])}")
+    print(f"report       p50 {_fmt(ttr['p50'])}  p95 {_fmt(ttr['p95'])}  p99 {_fmt(ttr['p99'])}")
+    print(f"peak RSS     {results['peak_rss_mb'] or 0:.1f} MB")
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
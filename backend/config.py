@@ -3,13 +3,96 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = ""  # empty uses the SDK default
     FIRECRAWL_API_KEY: str = ""
+    FIRECRAWL_BASE_URL: str = "https://api.firecrawl.dev/v1"
     AZURE_STORAGE_CONNECTION_STRING: str = ""
     AZURE_STORAGE_CONTAINER_NAME: str = "deepresearch-results"
+    REPORT_GZIP: bool = False
+    REPORT_SAS_HOURS: float = 24.0
+    REPORT_INDEX_ENABLED: bool = True
+    REPORT_INDEX_DB_PATH: str = "reports.db"  # local to this host
+    REPORT_BODY_CACHE_BYTES: int = 67108864  # in-memory LRU for GET /reports/{task_id}
     CORS_ORIGINS: str = "http://localhost:5173"
     MAX_RESEARCH_DEPTH: int = 3
+    FOLLOW_UP_SIMILARITY: float = 0.7  # skip follow-ups this similar to a query already run
+    MIN_ROUND_NOVELTY: float = 0.2  # stop when a round's share of new results falls below
+    TASK_TIME_BUDGET_SECONDS: float = 0.0  # 0 = unlimited; then go straight to the report
+    TASK_TOKEN_BUDGET: int = 0  # LLM tokens per task, 0 = unlimited
     MAX_CONCURRENT_LLM_CALLS: int = 10
     MAX_CONCURRENT_SEARCH_CALLS: int = 10
+    MAX_CONCURRENT_TASKS: int = 20
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_LATENCY_TARGET: float = 20.0
+    LLM_TOKENS_PER_MINUTE: int = 0  # 0 disables the client-side TPM budget
+    LLM_MAX_RETRIES: int = 4
+    LLM_BACKOFF_BASE: float = 1.0
+    LLM_BACKOFF_MAX: float = 30.0
+    MAX_FETCHES_PER_ROUND: int = 5
+    PREFETCH_MAX_PAGES: int = 3  # next-ranked pages fetched during analysis; 0 disables
+    FINDINGS_DEDUP_THRESHOLD: float = 0.8
+    FINDING_MAX_TOKENS: int = 750  # per-source budget for extracted passages
+    EXTRACTION_ENABLED: bool = True
+    EXTRACTION_PASSAGE_TOKENS: int = 120
+    ANALYSIS_CONTEXT_TOKENS: int = 6000
+    REPORT_CONTEXT_TOKENS: int = 24000
+    # Findings above this many tokens are summarized in parallel chunks first; 0 = never
+    REPORT_MAP_REDUCE_THRESHOLD: int = 24000
+    REPORT_CHUNK_TOKENS: int = 6000
+    REPORT_MAX_CHUNKS: int = 16
+    REPORT_SUMMARY_MAX_TOKENS: int = 800
+    REPORT_STREAM_FLUSH_INTERVAL: float = 0.25
+    REPORT_STREAM_FLUSH_CHARS: int = 400
+    REPORT_CACHE_ENABLED: bool = True
+    REPORT_CACHE_MAX_ENTRIES: int = 256
+    REPORT_CACHE_TTL: float = 86400.0
+    REPORT_CACHE_SIMILARITY: float = 0.9
+    EVENT_LOG_SIZE: int = 512
+    SUBSCRIBER_QUEUE_SIZE: int = 256
+    TASK_RETENTION_SECONDS: float = 900.0
+    TASK_MAX_RETAINED: int = 200
+    TASK_RECORD_TTL_SECONDS: float = 604800.0
+    TASK_MAX_RECORDS: int = 10000
+    TASK_SWEEP_INTERVAL: float = 60.0
+    TASK_BACKEND: str = "memory"  # "memory" (single worker) or "sqlite" (shared)
+    TASK_BACKEND_PATH: str = "task_state.db"
+    TASK_POLL_INTERVAL: float = 0.5
+    BATCH_MAX_QUERIES: int = 50
+    BATCH_MAX_RETAINED: int = 256
+    CHECKPOINT_ENABLED: bool = True
+    CHECKPOINT_DB_PATH: str = "checkpoints.db"  # local to this host
+    CHECKPOINT_TTL_SECONDS: float = 604800.0
+    CHECKPOINT_RESUME_ON_STARTUP: bool = False
+    TRACE_RECORD_DIR: str = ""  # record each task's external calls here for replay; "" = off
+    CPU_EXECUTOR: str = "thread"  # "thread" or "process"
+    CPU_EXECUTOR_WORKERS: int = 0  # 0 = CPU count
+    CPU_OFFLOAD_MIN_SIZE: int = 20000  # chars; smaller inputs are processed inline
+    LOOP_LAG_INTERVAL: float = 0.1
+    LOOP_LAG_WARN_SECONDS: float = 0.25
+    LOOP_LAG_SHED_SECONDS: float = 1.0  # hold back new tasks above this lag; 0 = never
+    STREAM_MAX_TASKS: int = 50  # per multiplexed stream
+    MAX_MULTIPLEXED_STREAMS: int = 1000  # open at once per worker
+    STREAM_KEEPALIVE_SECONDS: float = 15.0
+    HTTP2_ENABLED: bool = True
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    SOURCES: str = "web"  # comma-separated backends: "web", "corpus"
+    LOCAL_CORPUS_DB_PATH: str = "corpus.db"
+    LOCAL_CORPUS_DEADLINE: float = 5.0
+    FIRECRAWL_SEARCH_DEADLINE: float = 30.0
+    FIRECRAWL_SCRAPE_DEADLINE: float = 60.0
+    SOURCE_HEDGE_ENABLED: bool = True
+    SOURCE_HEDGE_QUANTILE: float = 0.95
+    SOURCE_HEDGE_MIN_SAMPLES: int = 20
+    SOURCE_BREAKER_FAILURES: int = 5
+    SOURCE_BREAKER_COOLDOWN: float = 30.0
+    SOURCE_CACHE_ENABLED: bool = True
+    SOURCE_CACHE_MAX_ENTRIES: int = 2048
+    SOURCE_CACHE_DB_PATH: str = ""
+    SOURCE_CACHE_SEARCH_TTL: float = 3600.0
+    SOURCE_CACHE_CONTENT_TTL: float = 86400.0
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
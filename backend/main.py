@@ -1,10 +1,53 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
-from routers.research import router as research_router
+from routers.research import (
+    close_source,
+    recover_interrupted_tasks,
+    router as research_router,
+)
+from routers.reports import router as reports_router
+from services.blob_storage import close_storage, get_storage
+from services.checkpoints import close_checkpoint_store
+from services.executor import close_executor, close_loop_monitor, get_executor, get_loop_monitor
+from services.http_client import close_http_client, get_http_client
+from services.llm_gateway import close_llm_gateway
+from services.metrics import metrics
+from services.report_index import close_report_index
+from services.scheduler import scheduler
+from services.task_registry import registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client(settings)
+    get_executor(settings)
+    monitor = get_loop_monitor(settings)
+    monitor.start()
+    scheduler.hold_while_overloaded(monitor)
+    await get_storage(settings).start()
+    registry.start_sweeper(settings.TASK_SWEEP_INTERVAL)
+    await recover_interrupted_tasks()
+    yield
+    await registry.stop_sweeper()
+    # Running tasks checkpoint themselves as interrupted before services close
+    await registry.shutdown()
+    registry.backend.close()
+    close_source()
+    await close_llm_gateway()
+    await close_storage()
+    close_report_index()
+    await close_http_client()
+    close_checkpoint_store()
+    close_executor()
+    await close_loop_monitor()
 
-app = FastAPI(title="Deep Research API")
+
+app = FastAPI(title="Deep Research API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,8 +58,16 @@ app.add_middleware(
 )
 
 app.include_router(research_router)
+app.include_router(reports_router)
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "event_loop": get_loop_monitor(settings).stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
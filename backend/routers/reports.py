@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import re
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from config import settings
+from services.blob_storage import get_storage
+from services.executor import get_executor
+from services.report_index import ReportBody, get_report_bodies, get_report_index
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_MEDIA_TYPE = "text/markdown; charset=utf-8"
+# Clients may keep a copy but must revalidate; a matching ETag costs a 304
+_CACHE_CONTROL = "private, no-cache"
+
+
+@router.get("")
+async def list_reports(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    q: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+):
+    """Saved reports, newest first; q searches queries and report text."""
+    index = get_report_index(settings)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Report index is disabled")
+    total, items = await asyncio.to_thread(index.list, limit, offset, q, since, until)
+    for item in items:
+        item["url"] = f"/reports/{item['task_id']}"
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, and the gzip variant's tag validates the identity one
+    tags = (t.strip().removeprefix("W/").replace("-gzip", "") for t in header.split(","))
+    return etag in tags
+
+
+def _accepts_gzip(header: str | None) -> bool:
+    for part in (header or "").split(","):
+        coding, *params = part.strip().split(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        return quality > 0
+    return False
+
+
+def _parse_range(header: str, length: int) -> tuple[int, int] | None:
+    """(start, end) inclusive for a single byte range, or None if unsatisfiable."""
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the final N bytes
+        start, end = max(length - int(last), 0), length - 1
+    else:
+        start = int(first)
+        end = min(int(last), length - 1) if last else length - 1
+    if start >= length or start > end:
+        return None
+    return start, end
+
+
+async def _load_body(task_id: str) -> ReportBody | None:
+    index = get_report_index(settings)
+    meta = await asyncio.to_thread(index.get, task_id) if index is not None else None
+    bodies = get_report_bodies(settings)
+    body = bodies.get(task_id)
+    if body is not None and (meta is None or body.etag == f'"{meta["sha256"]}"'):
+        return body
+    # The index keeps a local copy of each report; blob storage is the fallback
+    content = await asyncio.to_thread(index.content, task_id) if meta is not None else None
+    if content is None:
+        content = await get_storage(settings).download_report(task_id)
+    if content is None:
+        return None
+    body = await get_executor(settings).run(
+        ReportBody.build, content, size=len(content), thread=True
+    )
+    bodies.put(task_id, body)
+    return body
+
+
+@router.get("/{task_id}")
+async def get_report(task_id: str, request: Request):
+    """Report Markdown with ETag revalidation, gzip and single byte ranges."""
+    body = await _load_body(task_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    gzipped = _accepts_gzip(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": body.etag[:-1] + '-gzip"' if gzipped else body.etag,
+        "Cache-Control": _CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), body.etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == body.etag):
+        # Ranges are served from the identity encoding
+        length = len(body.data)
+        headers["ETag"] = body.etag
+        byte_range = _parse_range(range_header, length)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{length}"
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+        return Response(
+            body.data[start : end + 1], status_code=206, media_type=_MEDIA_TYPE, headers=headers
+        )
+
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(body.gzipped, media_type=_MEDIA_TYPE, headers=headers)
+    return Response(body.data, media_type=_MEDIA_TYPE, headers=headers)
@@ -1,92 +1,612 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import uuid
+from typing import AsyncIterator
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from config import settings
-from services.task_registry import registry
-from services.research_engine import run_research
+from services.batches import Batch, BatchItem, batches
+from services.blob_storage import get_storage
+from services.checkpoints import get_checkpoint_store
+from services.executor import get_executor
+from services.task_models import TERMINAL_STATUSES
+from services.streams import MultiplexedStream, streams
+from services.task_registry import ProgressEvent, TaskInfo, TaskRecord, registry
+from services.http_client import get_http_client
+from services.report_cache import get_report_cache
+from services.research_engine import complete_from_cache, run_research
+from services.scheduler import scheduler
+from sources.base import ResearchSource
+from sources.cached_source import CachedSource
+from sources.composite_source import CircuitBreaker, CompositeSource, SourceBackend
+from sources.local_corpus_source import LocalCorpusSource
+from sources.normalize import normalize_query
+from sources.shared_source import SharedWorkSource
 from sources.web_source import WebSource
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/research", tags=["research"])
 
+_INTERRUPTED_ERROR = "Interrupted before completion; POST /research/{task_id}/resume to continue"
+
+# Module-level source (shared across all tasks)
+_source: ResearchSource | None = None
+
+
+def _backend(name: str) -> SourceBackend:
+    breaker = CircuitBreaker(settings.SOURCE_BREAKER_FAILURES, settings.SOURCE_BREAKER_COOLDOWN)
+    if name == "web":
+        source = WebSource(
+            api_key=settings.FIRECRAWL_API_KEY,
+            client=get_http_client(settings),
+            base_url=settings.FIRECRAWL_BASE_URL,
+            raise_errors=True,
+        )
+        return SourceBackend(
+            name,
+            source,
+            search_deadline=settings.FIRECRAWL_SEARCH_DEADLINE,
+            fetch_deadline=settings.FIRECRAWL_SCRAPE_DEADLINE,
+            breaker=breaker,
+        )
+    if name == "corpus":
+        return SourceBackend(
+            name,
+            LocalCorpusSource(settings.LOCAL_CORPUS_DB_PATH),
+            search_deadline=settings.LOCAL_CORPUS_DEADLINE,
+            fetch_deadline=settings.LOCAL_CORPUS_DEADLINE,
+            breaker=breaker,
+        )
+    raise ValueError(f"Unknown source: {name}")
+
+
+def _get_source() -> ResearchSource:
+    global _source
+    if _source is None:
+        names = [n.strip() for n in settings.SOURCES.split(",") if n.strip()]
+        _source = CompositeSource(
+            [_backend(name) for name in dict.fromkeys(names)],
+            hedge=settings.SOURCE_HEDGE_ENABLED,
+            hedge_quantile=settings.SOURCE_HEDGE_QUANTILE,
+            hedge_min_samples=settings.SOURCE_HEDGE_MIN_SAMPLES,
+        )
+        if settings.SOURCE_CACHE_ENABLED:
+            _source = CachedSource(
+                _source,
+                max_entries=settings.SOURCE_CACHE_MAX_ENTRIES,
+                search_ttl=settings.SOURCE_CACHE_SEARCH_TTL,
+                content_ttl=settings.SOURCE_CACHE_CONTENT_TTL,
+                db_path=settings.SOURCE_CACHE_DB_PATH,
+            )
+    return _source
+
+
+def _composite_source() -> CompositeSource:
+    source = _get_source()
+    return source.inner if isinstance(source, CachedSource) else source
+
+
+def close_source() -> None:
+    global _source
+    if _source is None:
+        return
+    _composite_source().close()
+    if isinstance(_source, CachedSource):
+        _source.close()
+    _source = None
+
 
 class ResearchRequest(BaseModel):
     query: str
+    # On a report cache hit, regenerate the report from the cached findings
+    refresh: bool = False
 
 
 class ResearchResponse(BaseModel):
     task_id: str
+    cached: bool = False
+    result_url: str | None = None
 
 
-@router.post("", response_model=ResearchResponse)
-async def start_research(request: ResearchRequest):
+def _client_key(http_request: Request) -> str:
+    client_id = http_request.headers.get("X-Client-Id")
+    if client_id:
+        return client_id
+    return http_request.client.host if http_request.client else "anonymous"
+
+
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _event_data(event: ProgressEvent) -> dict:
+    return {
+        "event_type": event.event_type,
+        "message": event.message,
+        "progress": event.progress,
+        "data": event.data,
+    }
+
+
+def _event_size(event: ProgressEvent) -> int:
+    return len(event.message) + sum(
+        len(v) for v in event.data.values() if isinstance(v, str)
+    )
+
+
+async def _encode(data: dict, size: int) -> str:
+    """JSON-encode an SSE payload; large ones (e.g. full reports) off the loop."""
+    return await get_executor(settings).run(json.dumps, data, size=size)
+
+
+class BatchRequest(BaseModel):
+    queries: list[str]
+    refresh: bool = False
+
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    task_ids: list[str]
+
+
+def _start(
+    query: str,
+    refresh: bool,
+    client_key: str,
+    source: ResearchSource,
+    batch: Batch | None = None,
+) -> ResearchResponse:
     task_id = str(uuid.uuid4())
-    source = WebSource(api_key=settings.FIRECRAWL_API_KEY)
+    cache = get_report_cache(settings)
+    hit = cache.lookup(query) if cache else None
+    findings = None
+    if hit:
+        entry, similarity = hit
+        if not refresh or entry.findings is None:
+            # Re-signed per hit: the stored SAS URL may be close to expiry
+            result_url = get_storage(settings).report_url(entry.task_id)
+            registry.create_task(
+                task_id,
+                complete_from_cache(task_id, registry, result_url, entry.report, similarity),
+            )
+            return ResearchResponse(task_id=task_id, cached=True, result_url=result_url)
+        findings = entry.findings
+
     coro = run_research(
-        query=request.query,
+        query=query,
         task_id=task_id,
         registry=registry,
         source=source,
         config=settings,
+        findings=findings,
     )
-    registry.create_task(task_id, coro)
+    if batch is not None:
+        coro = batches.track(batch, coro)
+    scheduler.submit(task_id, client_key, coro)
     return ResearchResponse(task_id=task_id)
 
 
-@router.get("/{task_id}")
-async def get_task_status(task_id: str):
-    task_info = registry.get_task(task_id)
-    if not task_info:
-        raise HTTPException(status_code=404, detail="Task not found")
+@router.post("", response_model=ResearchResponse)
+async def start_research(request: ResearchRequest, http_request: Request):
+    return _start(request.query, request.refresh, _client_key(http_request), _get_source())
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def start_batch(request: BatchRequest, http_request: Request):
+    queries = [q for q in request.queries if q.strip()]
+    if not queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_QUERIES} queries per batch",
+        )
+    client_key = _client_key(http_request)
+    # Searches and scrapes are shared by every task in the batch
+    source = SharedWorkSource(_get_source())
+    batch = Batch(id=str(uuid.uuid4()), items=[], source=source)
+    first_index: dict[str, int] = {}
+    for query in queries:
+        key = normalize_query(query)
+        if key in first_index:
+            index = first_index[key]
+            batch.items.append(
+                BatchItem(query, batch.items[index].task_id, duplicate_of=index)
+            )
+            continue
+        first_index[key] = len(batch.items)
+        response = _start(query, request.refresh, client_key, source, batch)
+        batch.items.append(BatchItem(query, response.task_id))
+    batches.add(batch)
+    return BatchResponse(
+        batch_id=batch.id, task_ids=[item.task_id for item in batch.items]
+    )
+
+
+def _get_batch(batch_id: str) -> Batch:
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
+@router.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    return await batches.status(_get_batch(batch_id))
+
+
+async def _merge_events(
+    subscriptions: dict[str, AsyncIterator[ProgressEvent]],
+) -> AsyncIterator[tuple[str, ProgressEvent]]:
+    """Interleave several task event streams, tagging each event with its task id."""
+    queue: asyncio.Queue[tuple[str, ProgressEvent | None]] = asyncio.Queue()
+
+    async def _pump(task_id: str, events: AsyncIterator[ProgressEvent]) -> None:
+        try:
+            async for event in events:
+                await queue.put((task_id, event))
+        finally:
+            await queue.put((task_id, None))
+
+    pumps = [asyncio.create_task(_pump(t, e)) for t, e in subscriptions.items()]
+    remaining = len(pumps)
+    try:
+        while remaining:
+            task_id, event = await queue.get()
+            if event is None:
+                remaining -= 1
+                continue
+            yield task_id, event
+    finally:
+        for pump in pumps:
+            pump.cancel()
+
+
+@router.get("/batch/{batch_id}/stream")
+async def stream_batch(batch_id: str):
+    batch = _get_batch(batch_id)
+
+    async def _item_events(task_id: str) -> AsyncIterator[ProgressEvent]:
+        if await registry.get_task(task_id, events=False) is None:
+            record = await registry.get_record(task_id)
+            if record:
+                yield _record_event(record)
+            return
+        async for event in registry.subscribe(task_id, None):
+            yield event
+
+    async def event_generator():
+        last_summary = None
+        merged = _merge_events({t: _item_events(t) for t in batch.task_ids})
+        async for task_id, event in merged:
+            data = {"task_id": task_id, **_event_data(event)}
+            yield f"data: {await _encode(data, _event_size(event))}\n\n"
+            # Aggregate progress, sent only when it changes
+            status = await batches.status(batch)
+            summary = (status["progress"], status["counts"])
+            if summary == last_summary:
+                continue
+            last_summary = summary
+            completed = status["counts"].get("completed", 0)
+            data = {
+                "event_type": "batch_progress",
+                "message": f"{completed}/{len(batch.items)} completed",
+                "progress": status["progress"],
+                "data": {"counts": status["counts"], "done": status["done"]},
+            }
+            yield f"data: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_generator(), media_type="text/event-stream", headers=_SSE_HEADERS
+    )
+
+
+class StreamUpdate(BaseModel):
+    # Task ids, optionally "task_id:last_event_id" to replay instead of a snapshot
+    add: list[str] = []
+    remove: list[str] = []
+
+
+def _parse_task_ids(values: list[str]) -> dict[str, int | None]:
+    task_ids: dict[str, int | None] = {}
+    for value in values:
+        task_id, _, last_event_id = value.strip().partition(":")
+        if task_id:
+            task_ids[task_id] = _parse_event_id(last_event_id)
+    return task_ids
+
+
+@router.get("/streams")
+async def open_stream(task_ids: str = ""):
+    """One SSE connection for many tasks; events carry their task_id."""
+    requested = _parse_task_ids(task_ids.split(","))
+    if len(requested) > settings.STREAM_MAX_TASKS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.STREAM_MAX_TASKS} tasks per stream"
+        )
+    if streams.full:
+        raise HTTPException(status_code=503, detail="Too many open streams")
+    stream = MultiplexedStream(registry, _snapshot, settings.STREAM_MAX_TASKS)
+
+    async def event_generator():
+        # Opened here, not before the response: a client that disconnects
+        # before the body starts then leaves no stream or pumps behind
+        try:
+            streams.open(stream)
+        except ValueError as e:
+            yield f"data: {json.dumps({'event_type': 'error', 'message': str(e)})}\n\n"
+            return
+        try:
+            await stream.add(requested)
+            opened = {
+                "event_type": "stream_opened",
+                "stream_id": stream.id,
+                "task_ids": stream.task_ids,
+            }
+            yield f"data: {json.dumps(opened)}\n\n"
+            async for item in stream.events(settings.STREAM_KEEPALIVE_SECONDS):
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                kind, task_id, payload = item
+                if kind == "snapshot":
+                    data = {"event_type": "snapshot", "tasks": payload}
+                    size = sum(
+                        len(m.get("content", ""))
+                        for snapshot in payload
+                        for m in snapshot.get("messages", [])
+                    )
+                else:
+                    data = {"task_id": task_id, "seq": payload.seq, **_event_data(payload)}
+                    size = _event_size(payload)
+                yield f"data: {await _encode(data, size)}\n\n"
+        finally:
+            streams.discard(stream)
+
+    return StreamingResponse(
+        event_generator(), media_type="text/event-stream", headers=_SSE_HEADERS
+    )
+
+
+@router.post("/streams/{stream_id}")
+async def update_stream(stream_id: str, update: StreamUpdate):
+    stream = streams.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    stream.remove(list(_parse_task_ids(update.remove)))
+    try:
+        added = await stream.add(_parse_task_ids(update.add))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"stream_id": stream.id, "added": added, "task_ids": stream.task_ids}
+
+
+def _resume(task_id: str, checkpoint: dict, client_key: str) -> None:
+    coro = run_research(
+        query=checkpoint["query"],
+        task_id=task_id,
+        registry=registry,
+        source=_get_source(),
+        config=settings,
+        resume=True,
+    )
+    scheduler.submit(task_id, client_key, coro, resume_seq=checkpoint["last_seq"])
+
+
+async def recover_interrupted_tasks() -> None:
+    """Find tasks cut off by the last shutdown or crash and resume them if enabled."""
+    store = get_checkpoint_store(settings)
+    if store is None:
+        return
+    await asyncio.to_thread(store.prune)
+    for task_id in await asyncio.to_thread(store.interrupted):
+        checkpoint = await asyncio.to_thread(store.info, task_id)
+        if settings.CHECKPOINT_RESUME_ON_STARTUP:
+            logger.info(f"Resuming task {task_id} from stage {checkpoint['stage']}")
+            _resume(task_id, checkpoint, "startup")
+            continue
+        logger.info(f"Found interrupted task {task_id} at stage {checkpoint['stage']}")
+        await asyncio.to_thread(store.set_status, task_id, "interrupted")
+        task_info = await registry.get_task(task_id, events=False)
+        if task_info and task_info.status not in TERMINAL_STATUSES:
+            # Stale state left behind in a shared backend
+            await registry.update_task(
+                task_id,
+                status="failed",
+                error=_INTERRUPTED_ERROR.format(task_id=task_id),
+            )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    source = _get_source()
+    if not isinstance(source, CachedSource):
+        return {"enabled": False}
+    return {"enabled": True, **source.stats()}
+
+
+@router.get("/stats")
+async def get_registry_stats():
+    cache = get_report_cache(settings)
+    return {
+        **registry.stats(),
+        "scheduler": scheduler.stats(),
+        "report_cache": cache.stats() if cache else None,
+        "sources": _composite_source().stats(),
+        "open_streams": len(streams),
+    }
+
+
+def _record_status(record: TaskRecord) -> dict:
+    return {
+        "id": record.id,
+        "status": record.status,
+        "progress": 100 if record.status == "completed" else 0,
+        "messages": [],
+        "result_url": record.result_url,
+        "created_at": record.created_at.isoformat(),
+        "error": record.error,
+        "last_event_id": 0,
+        "queue_position": None,
+        "timings": None,
+        "resumable": False,
+    }
+
+
+def _info_status(task_info: TaskInfo, resumable: bool = False) -> dict:
     return {
         "id": task_info.id,
         "status": task_info.status,
         "progress": task_info.progress,
-        "messages": task_info.messages,
+        "messages": list(task_info.messages),
         "result_url": task_info.result_url,
         "created_at": task_info.created_at.isoformat(),
         "error": task_info.error,
+        "last_event_id": task_info.last_seq,
+        "queue_position": scheduler.position(task_info.id),
+        "timings": task_info.timings,
+        "resumable": resumable,
     }
 
 
-@router.get("/{task_id}/stream")
-async def stream_task(task_id: str):
-    task_info = registry.get_task(task_id)
+async def _snapshot(task_id: str) -> dict:
+    """Current state of a task for a multiplexed stream (checkpoints not consulted)."""
+    task_info = await registry.get_task(task_id)
+    if task_info:
+        return _info_status(task_info)
+    record = await registry.get_record(task_id)
+    if record:
+        return _record_status(record)
+    return {"id": task_id, "status": "not_found", "last_event_id": 0}
+
+
+def _checkpoint_status(checkpoint: dict) -> dict:
+    return {
+        "id": checkpoint["task_id"],
+        "status": "failed",
+        "progress": 0,
+        "messages": [],
+        "result_url": None,
+        "created_at": None,
+        "error": _INTERRUPTED_ERROR.format(task_id=checkpoint["task_id"]),
+        "last_event_id": checkpoint["last_seq"],
+        "queue_position": None,
+        "timings": None,
+        "resumable": True,
+    }
+
+
+async def _load_checkpoint_info(task_id: str) -> dict | None:
+    store = get_checkpoint_store(settings)
+    if store is None:
+        return None
+    return await asyncio.to_thread(store.info, task_id)
+
+
+def _record_event(record: TaskRecord) -> ProgressEvent:
+    if record.status == "completed":
+        return ProgressEvent(
+            "completed", "Research complete!", 100, {"result_url": record.result_url}
+        )
+    return ProgressEvent("failed", f"Research failed: {record.error}", 0)
+
+
+@router.get("/{task_id}")
+async def get_task_status(task_id: str):
+    task_info = await registry.get_task(task_id)
     if not task_info:
+        record = await registry.get_record(task_id)
+        checkpoint = await _load_checkpoint_info(task_id)
+        if record:
+            return {**_record_status(record), "resumable": checkpoint is not None}
+        if checkpoint:
+            return _checkpoint_status(checkpoint)
         raise HTTPException(status_code=404, detail="Task not found")
+    resumable = False
+    if task_info.status == "failed":
+        resumable = await _load_checkpoint_info(task_id) is not None
+    return _info_status(task_info, resumable)
+
+
+def _parse_event_id(value: str | None) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@router.get("/{task_id}/stream")
+async def stream_task(
+    task_id: str,
+    last_event_id: str | None = None,
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+):
+    task_info = await registry.get_task(task_id, events=False)
+    record = await registry.get_record(task_id) if not task_info else None
+    checkpoint = None
+    if not task_info and not record:
+        checkpoint = await _load_checkpoint_info(task_id)
+        if not checkpoint:
+            raise HTTPException(status_code=404, detail="Task not found")
+    resume_from = _parse_event_id(last_event_id_header or last_event_id)
+
+    async def _events():
+        if record:
+            # Full event log was evicted; send the terminal state only
+            yield _record_event(record)
+            return
+        if checkpoint:
+            yield ProgressEvent(
+                "failed",
+                "Research interrupted.",
+                0,
+                {"resumable": True},
+                seq=checkpoint["last_seq"],
+            )
+            return
+        async for event in registry.subscribe(task_id, resume_from):
+            yield event
 
     async def event_generator():
-        async for event in registry.subscribe(task_id):
-            data = {
-                "event_type": event.event_type,
-                "message": event.message,
-                "progress": event.progress,
-                "data": event.data,
-            }
-            yield f"data: {json.dumps(data)}\n\n"
+        async for event in _events():
+            data = await _encode(_event_data(event), _event_size(event))
+            yield f"id: {event.seq}\ndata: {data}\n\n"
 
     return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        event_generator(), media_type="text/event-stream", headers=_SSE_HEADERS
     )
 
 
 @router.post("/{task_id}/cancel")
 async def cancel_task(task_id: str):
-    task_info = registry.get_task(task_id)
+    task_info = await registry.get_task(task_id, events=False)
     if not task_info:
         raise HTTPException(status_code=404, detail="Task not found")
-    cancelled = registry.cancel_task(task_id)
+    cancelled = await registry.cancel_task(task_id)
     if not cancelled:
         raise HTTPException(status_code=400, detail="Task cannot be cancelled")
     return {"status": "cancelled"}
+
+
+@router.post("/{task_id}/resume", response_model=ResearchResponse)
+async def resume_research(task_id: str, http_request: Request):
+    checkpoint = await _load_checkpoint_info(task_id)
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail="No checkpoint for task")
+    task_info = await registry.get_task(task_id, events=False)
+    if registry.is_running(task_id) or (
+        task_info and task_info.status not in TERMINAL_STATUSES
+    ):
+        raise HTTPException(status_code=409, detail="Task is still running")
+    _resume(task_id, checkpoint, _client_key(http_request))
+    return ResearchResponse(task_id=task_id)
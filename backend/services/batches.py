@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from config import settings
+from services.task_models import TERMINAL_STATUSES
+from services.task_registry import TaskRegistry, registry
+from sources.shared_source import SharedWorkSource
+
+
+@dataclass
+class BatchItem:
+    query: str
+    task_id: str
+    # Index of the first item with the same query; this item shares its task
+    duplicate_of: int | None = None
+
+
+@dataclass
+class Batch:
+    id: str
+    items: list[BatchItem]
+    source: SharedWorkSource | None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    pending: int = 0
+
+    @property
+    def task_ids(self) -> list[str]:
+        """Distinct task ids in item order."""
+        return list(dict.fromkeys(item.task_id for item in self.items))
+
+
+class BatchManager:
+    """Tracks research batches: their items, shared source and progress.
+
+    Items with the same normalized query share one task. Items are ordinary
+    research tasks; this class only adds the grouping and aggregate view.
+    Batches are kept in a bounded LRU.
+    """
+
+    def __init__(self, registry: TaskRegistry, max_batches: int = 256) -> None:
+        self.registry = registry
+        self.max_batches = max_batches
+        self._batches: OrderedDict[str, Batch] = OrderedDict()
+
+    def add(self, batch: Batch) -> None:
+        self._batches[batch.id] = batch
+        while len(self._batches) > self.max_batches:
+            _, evicted = self._batches.popitem(last=False)
+            self._release(evicted)
+
+    def get(self, batch_id: str) -> Batch | None:
+        return self._batches.get(batch_id)
+
+    def track(self, batch: Batch, coroutine):
+        """Wrap one item's coroutine so the shared source is released after the last one.
+
+        Counted when the item is created, not when it starts, so a queued item
+        keeps the memo alive.
+        """
+        batch.pending += 1
+        return self._tracked(batch, coroutine)
+
+    async def _tracked(self, batch: Batch, coroutine) -> None:
+        try:
+            await coroutine
+        finally:
+            batch.pending -= 1
+            if batch.pending == 0:
+                self._release(batch)
+
+    @staticmethod
+    def _release(batch: Batch) -> None:
+        if batch.source is not None:
+            batch.source.release()
+
+    async def _item_status(self, item: BatchItem) -> dict:
+        info = await self.registry.get_task(item.task_id, events=False)
+        if info is not None:
+            status, progress = info.status, info.progress
+            result_url, error = info.result_url, info.error
+        else:
+            record = await self.registry.get_record(item.task_id)
+            status = record.status if record else "unknown"
+            progress = 100 if status == "completed" else 0
+            result_url = record.result_url if record else None
+            error = record.error if record else None
+        return {
+            "query": item.query,
+            "task_id": item.task_id,
+            "duplicate_of": item.duplicate_of,
+            "status": status,
+            "progress": progress,
+            "result_url": result_url,
+            "error": error,
+        }
+
+    async def status(self, batch: Batch) -> dict:
+        items = [await self._item_status(item) for item in batch.items]
+        counts: dict[str, int] = {}
+        for item in items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        done = all(i["status"] in TERMINAL_STATUSES or i["status"] == "unknown" for i in items)
+        if done:
+            # Also covers items cancelled while queued, which never ran track's finally
+            self._release(batch)
+        return {
+            "id": batch.id,
+            "created_at": batch.created_at.isoformat(),
+            "progress": round(sum(i["progress"] for i in items) / len(items)) if items else 100,
+            "done": done,
+            "counts": counts,
+            "source": batch.source.stats() if batch.source is not None else None,
+            "items": items,
+        }
+
+
+batches = BatchManager(registry, settings.BATCH_MAX_RETAINED)
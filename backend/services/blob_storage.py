@@ -1,60 +1,215 @@
 from __future__ import annotations
 
-import os
+import asyncio
+import gzip
+import logging
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from config import Settings
+from services.metrics import call_span
+from services.report_index import ReportIndex, get_report_index
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_connection_string(connection_string: str) -> dict[str, str]:
+    parts: dict[str, str] = {}
+    for segment in connection_string.split(";"):
+        if "=" in segment:
+            key, value = segment.split("=", 1)
+            parts[key.strip()] = value.strip()
+    return parts
+
 
 class BlobStorageService:
-    def __init__(self, connection_string: str, container_name: str) -> None:
+    """Long-lived report storage.
+
+    Keeps one pooled BlobServiceClient for the life of the app, creates the
+    container at most once, and signs SAS URLs locally from the account key
+    in the connection string. Without a connection string, reports are
+    written to local_dir off the event loop. Uploaded reports are also
+    recorded in the report index, if one is given.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        container_name: str,
+        gzip_enabled: bool = False,
+        sas_hours: float = 24,
+        local_dir: str = "local_reports",
+        index: ReportIndex | None = None,
+    ) -> None:
         self.connection_string = connection_string
         self.container_name = container_name
+        self.gzip_enabled = gzip_enabled
+        self.sas_hours = sas_hours
+        self.local_dir = Path(local_dir)
+        self.index = index
+        self._service = None
+        self._container = None
+        self._lock = asyncio.Lock()
 
-    async def upload_report(self, task_id: str, content: str) -> str:
+        parts = _parse_connection_string(connection_string)
+        self.account_name = parts.get("AccountName", "")
+        self.account_key = parts.get("AccountKey", "")
+        endpoint = parts.get("BlobEndpoint")
+        if not endpoint and self.account_name:
+            protocol = parts.get("DefaultEndpointsProtocol", "https")
+            suffix = parts.get("EndpointSuffix", "core.windows.net")
+            endpoint = f"{protocol}://{self.account_name}.blob.{suffix}"
+        self.account_url = (endpoint or "").rstrip("/") + "/"
+
+    async def start(self) -> None:
         if not self.connection_string:
-            return await self._save_local(task_id, content)
+            return
+        try:
+            await self._get_container()
+        except Exception as e:
+            # Storage trouble shouldn't keep the API down; uploads retry the setup
+            logger.warning(f"Blob storage setup failed: {e}")
+
+    async def close(self) -> None:
+        if self._service is not None:
+            await self._service.close()
+            self._service = None
+            self._container = None
 
-        from azure.storage.blob.aio import BlobServiceClient
+    async def _get_container(self):
+        if self._container is not None:
+            return self._container
+        async with self._lock:
+            if self._container is None:
+                from azure.core.exceptions import ResourceExistsError
+                from azure.storage.blob.aio import BlobServiceClient
 
-        blob_name = f"{task_id}.md"
-        async with BlobServiceClient.from_connection_string(
-            self.connection_string
-        ) as service:
-            container = service.get_container_client(self.container_name)
+                if self._service is None:
+                    self._service = BlobServiceClient.from_connection_string(
+                        self.connection_string
+                    )
+                container = self._service.get_container_client(self.container_name)
+                try:
+                    await container.create_container()
+                except ResourceExistsError:
+                    pass
+                except Exception as e:
+                    # As before: the container may still exist (or the account may
+                    # not allow creating it); uploads will surface a real failure
+                    logger.warning(f"Could not create container {self.container_name}: {e}")
+                self._container = container
+        return self._container
+
+    def _blob_name(self, task_id: str) -> str:
+        return f"{task_id}.md"
+
+    async def upload_report(self, task_id: str, content: str, query: str = "") -> str:
+        if not self.connection_string:
+            with call_span("local", "save"):
+                url = await self._save_local(task_id, content)
+        else:
+            url = await self._upload_blob(task_id, content)
+        if self.index is not None:
             try:
-                await container.create_container()
-            except Exception:
-                pass
-            blob = container.get_blob_client(blob_name)
-            await blob.upload_blob(content.encode("utf-8"), overwrite=True)
+                await asyncio.to_thread(self.index.record, task_id, query, content)
+            except Exception as e:
+                # The report is saved; only listing and search miss it
+                logger.warning(f"Failed to index report {task_id}: {e}")
+        return url
+
+    async def _upload_blob(self, task_id: str, content: str) -> str:
+        from azure.storage.blob import ContentSettings
 
+        data = content.encode("utf-8")
+        content_settings = ContentSettings(content_type="text/markdown; charset=utf-8")
+        if self.gzip_enabled:
+            data = await asyncio.to_thread(gzip.compress, data)
+            content_settings.content_encoding = "gzip"
+
+        container = await self._get_container()
+        with call_span("blob", "upload"):
+            await container.upload_blob(
+                self._blob_name(task_id),
+                data,
+                overwrite=True,
+                content_settings=content_settings,
+            )
         return await self.get_report_url(task_id)
 
+    async def download_report(self, task_id: str) -> str | None:
+        """Read a saved report back, or None if there is none."""
+        if not self.connection_string:
+            file_path = self.local_dir / f"{task_id}.md"
+            with call_span("local", "read"):
+                try:
+                    return await asyncio.to_thread(file_path.read_text, encoding="utf-8")
+                except FileNotFoundError:
+                    return None
+
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container = await self._get_container()
+        with call_span("blob", "download"):
+            try:
+                downloader = await container.download_blob(self._blob_name(task_id))
+                data = await downloader.readall()
+            except ResourceNotFoundError:
+                return None
+        # The SDK already undoes Content-Encoding: gzip on download
+        return data.decode("utf-8")
+
     async def get_report_url(self, task_id: str) -> str:
+        return self.report_url(task_id)
+
+    def report_url(self, task_id: str) -> str:
+        """URL of a saved report, with a freshly signed SAS token for blobs."""
         if not self.connection_string:
-            local_path = Path("local_reports") / f"{task_id}.md"
+            local_path = self.local_dir / f"{task_id}.md"
             return str(local_path)
 
         from azure.storage.blob import generate_blob_sas, BlobSasPermissions
-        from azure.storage.blob.aio import BlobServiceClient
-
-        blob_name = f"{task_id}.md"
-        async with BlobServiceClient.from_connection_string(
-            self.connection_string
-        ) as service:
-            sas_token = generate_blob_sas(
-                account_name=service.account_name,
-                container_name=self.container_name,
-                blob_name=blob_name,
-                account_key=service.credential.account_key,
-                permission=BlobSasPermissions(read=True),
-                expiry=datetime.now(timezone.utc) + timedelta(hours=24),
-            )
-            return f"{service.url}{self.container_name}/{blob_name}?{sas_token}"
 
-    async def _save_local(self, task_id: str, content: str) -> str:
-        local_dir = Path("local_reports")
-        local_dir.mkdir(exist_ok=True)
-        file_path = local_dir / f"{task_id}.md"
+        blob_name = self._blob_name(task_id)
+        # Signed locally with the account key; no round trip to the service
+        sas_token = generate_blob_sas(
+            account_name=self.account_name,
+            container_name=self.container_name,
+            blob_name=blob_name,
+            account_key=self.account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.now(timezone.utc) + timedelta(hours=self.sas_hours),
+        )
+        return f"{self.account_url}{self.container_name}/{blob_name}?{sas_token}"
+
+    def _write_local(self, file_path: Path, content: str) -> None:
+        file_path.parent.mkdir(exist_ok=True)
         file_path.write_text(content, encoding="utf-8")
+
+    async def _save_local(self, task_id: str, content: str) -> str:
+        file_path = self.local_dir / f"{task_id}.md"
+        await asyncio.to_thread(self._write_local, file_path, content)
         return str(file_path)
+
+
+# Module-level service (shared across all tasks)
+_storage: BlobStorageService | None = None
+
+
+def get_storage(config: Settings) -> BlobStorageService:
+    global _storage
+    if _storage is None:
+        _storage = BlobStorageService(
+            config.AZURE_STORAGE_CONNECTION_STRING,
+            config.AZURE_STORAGE_CONTAINER_NAME,
+            gzip_enabled=config.REPORT_GZIP,
+            sas_hours=config.REPORT_SAS_HOURS,
+            index=get_report_index(config),
+        )
+    return _storage
+
+
+async def close_storage() -> None:
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator
+
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion
+
+from config import Settings
+from services.findings import estimate_tokens
+from services.llm_gateway import LLMGateway
+from services.metrics import current_stage
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+
+def _request_key(kwargs: dict) -> str:
+    request = json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(request.encode()).hexdigest()[:16]
+
+
+def _recordable_config(config: Settings) -> dict:
+    # Credentials and endpoints are neither needed for replay nor safe to write out
+    return {
+        name: value
+        for name, value in config.model_dump().items()
+        if not name.endswith(("_KEY", "_URL", "CONNECTION_STRING"))
+    }
+
+
+class CallTrace:
+    """Every external call one research task made: searches, scrapes and LLM requests.
+
+    Each call is stored with its result, the stage it ran in, and when it
+    started and how long it took relative to the start of the trace. Saved
+    as one gzipped JSON document.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        task_id: str = "",
+        config: dict | None = None,
+        calls: list[dict] | None = None,
+        recorded_at: float | None = None,
+    ) -> None:
+        self.query = query
+        self.task_id = task_id
+        self.config = config or {}
+        self.calls = calls or []
+        self.recorded_at = recorded_at or time.time()
+        self._started = time.monotonic()
+
+    @classmethod
+    def for_task(cls, query: str, task_id: str, config: Settings) -> CallTrace:
+        return cls(query, task_id, _recordable_config(config))
+
+    def add(
+        self, kind: str, key: str, started: float, result: Any = None, error: str | None = None
+    ) -> None:
+        call = {
+            "kind": kind,
+            "key": key,
+            "stage": current_stage(),
+            "start": round(started - self._started, 4),
+            "duration": round(time.monotonic() - started, 4),
+        }
+        if result is not None:
+            call["result"] = result
+        if error is not None:
+            call["error"] = error
+        self.calls.append(call)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": TRACE_VERSION,
+            "task_id": self.task_id,
+            "query": self.query,
+            "recorded_at": self.recorded_at,
+            "config": self.config,
+            "calls": self.calls,
+        }
+
+    def save(self, path: str) -> None:
+        """Write the trace. Blocking."""
+        data = json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(data)
+
+    @classmethod
+    def load(cls, path: str) -> CallTrace:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version: {data.get('version')}")
+        return cls(
+            data["query"],
+            data.get("task_id", ""),
+            data.get("config"),
+            data["calls"],
+            data.get("recorded_at"),
+        )
+
+
+class TracePlayer:
+    """Hands out a trace's recorded calls for replay.
+
+    A call is matched by kind and key (query, URL or LLM request hash),
+    oldest first. LLM requests whose prompt changed (e.g. after an engine
+    change reorders findings) fall back to the next unused call from the
+    same stage. time_scale stretches recorded latencies: 1.0 plays back in
+    real time. With 0 there is no latency, but each call still yields to the
+    event loop once per call recorded as finishing before it, so concurrent
+    calls complete in their recorded order and the engine takes the same path.
+    """
+
+    def __init__(self, trace: CallTrace, time_scale: float = 0.0) -> None:
+        self.trace = trace
+        self.time_scale = time_scale
+        self._by_key: dict[tuple[str, str], deque[dict]] = defaultdict(deque)
+        self._by_stage: dict[tuple[str, str], deque[dict]] = defaultdict(deque)
+        for call in trace.calls:
+            self._by_key[(call["kind"], call["key"])].append(call)
+            self._by_stage[(call["kind"], call["stage"])].append(call)
+        # Position of each call when ordered by recorded finish time
+        by_end = sorted(trace.calls, key=lambda c: c["start"] + c["duration"])
+        self._rank = {id(call): rank for rank, call in enumerate(by_end)}
+        self._used: set[int] = set()
+        self.counters = {"replayed": 0, "fallback": 0, "missing": 0}
+
+    def _next(self, calls: deque[dict]) -> dict | None:
+        while calls:
+            call = calls.popleft()
+            if id(call) not in self._used:
+                self._used.add(id(call))
+                return call
+        return None
+
+    def take(self, kind: str, key: str, stage: str | None = None) -> dict | None:
+        call = self._next(self._by_key[(kind, key)])
+        if call is None and stage is not None:
+            call = self._next(self._by_stage[(kind, stage)])
+            if call is not None:
+                self.counters["fallback"] += 1
+        if call is None:
+            self.counters["missing"] += 1
+            logger.warning(f"No recorded {kind} call for {key!r}")
+            return None
+        self.counters["replayed"] += 1
+        return call
+
+    async def wait_for(self, call: dict, duration: float | None = None) -> None:
+        """Stand in for the latency of a recorded call (or duration of it)."""
+        if duration is None:
+            duration = call["duration"]
+        if self.time_scale:
+            await asyncio.sleep(duration * self.time_scale)
+            return
+        for _ in range(self._rank[id(call)] + 1):
+            await asyncio.sleep(0)
+
+    async def wait(self, seconds: float) -> None:
+        # Always yield, so zero-latency playback still interleaves tasks
+        await asyncio.sleep(seconds * self.time_scale)
+
+    def stats(self) -> dict:
+        return {**self.counters, "unused": len(self.trace.calls) - len(self._used)}
+
+
+class RecordingLLM:
+    """LLMGateway wrapper that records every completion into a CallTrace.
+
+    Recorded latencies include the gateway's queueing and retries, so a
+    real-time replay reproduces the waits of the original run.
+    """
+
+    def __init__(self, inner: LLMGateway, trace: CallTrace) -> None:
+        self.inner = inner
+        self.trace = trace
+
+    async def complete(self, priority: int = 0, **kwargs):
+        started = time.monotonic()
+        try:
+            response = await self.inner.complete(priority, **kwargs)
+        except Exception as e:
+            self.trace.add("complete", _request_key(kwargs), started, error=repr(e))
+            raise
+        self.trace.add(
+            "complete", _request_key(kwargs), started, response.model_dump(mode="json")
+        )
+        return response
+
+    async def stream(self, priority: int = 0, **kwargs) -> AsyncIterator[str]:
+        started = time.monotonic()
+        deltas: list[tuple[float, str]] = []
+        error = None
+        try:
+            async for delta in self.inner.stream(priority, **kwargs):
+                deltas.append((round(time.monotonic() - started, 4), delta))
+                yield delta
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            result = {"deltas": deltas, "usage": self._stream_usage(kwargs, deltas)}
+            self.trace.add("stream", _request_key(kwargs), started, result, error)
+
+    @staticmethod
+    def _stream_usage(kwargs: dict, deltas: list[tuple[float, str]]) -> dict:
+        # Streamed usage only reaches the gateway's metrics; estimate it instead
+        prompt = sum(estimate_tokens(m.get("content") or "") for m in kwargs["messages"])
+        completion = estimate_tokens("".join(text for _, text in deltas))
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+        }
+
+
+class ReplayLLM:
+    """Stand-in for LLMGateway that answers from a TracePlayer."""
+
+    def __init__(self, player: TracePlayer) -> None:
+        self.player = player
+
+    def _take(self, kind: str, kwargs: dict) -> dict:
+        call = self.player.take(kind, _request_key(kwargs), current_stage())
+        if call is None:
+            raise LookupError(f"No recorded {kind} response for stage {current_stage()}")
+        return call
+
+    async def complete(self, priority: int = 0, **kwargs):
+        call = self._take("complete", kwargs)
+        await self.player.wait_for(call)
+        if "error" in call:
+            raise RuntimeError(f"Recorded LLM error: {call['error']}")
+        response = ChatCompletion.model_validate(call["result"])
+        if response.usage:
+            LLMGateway._record_usage(response.usage)
+        return response
+
+    async def stream(self, priority: int = 0, **kwargs) -> AsyncIterator[str]:
+        call = self._take("stream", kwargs)
+        result = call.get("result") or {}
+        deltas = result.get("deltas", [])
+        # Time to first delta, then the recorded gaps between deltas
+        elapsed = deltas[0][0] if deltas else 0.0
+        await self.player.wait_for(call, elapsed)
+        for offset, delta in deltas:
+            await self.player.wait(offset - elapsed)
+            elapsed = offset
+            yield delta
+        if "error" in call:
+            raise RuntimeError(f"Recorded LLM error: {call['error']}")
+        if result.get("usage"):
+            LLMGateway._record_usage(CompletionUsage.model_validate(result["usage"]))
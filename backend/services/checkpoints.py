@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+from config import Settings
+from services.findings import FindingsStore
+
+# Stages in the order run_research completes them
+STAGE_STARTED = "started"
+STAGE_RESEARCHING = "researching"  # sub-queries known; search/analysis rounds under way
+STAGE_GATHERED = "gathered"
+STAGE_REPORTED = "reported"
+STAGE_UPLOADED = "uploaded"
+STAGES = (STAGE_STARTED, STAGE_RESEARCHING, STAGE_GATHERED, STAGE_REPORTED, STAGE_UPLOADED)
+
+
+@dataclass
+class Checkpoint:
+    """Intermediate state of a research task after its last completed stage."""
+
+    task_id: str
+    query: str
+    stage: str = STAGE_STARTED
+    # "running" while a worker owns it; "interrupted", "failed" or "cancelled" otherwise
+    status: str = "running"
+    depth: int = 0
+    current_queries: list[str] = field(default_factory=list)
+    # Every sub-query searched so far, to skip near-duplicate follow-ups
+    queries_run: list[str] = field(default_factory=list)
+    findings: FindingsStore | None = field(default=None, repr=False)
+    report: str | None = field(default=None, repr=False)
+    result_url: str | None = None
+    # Last event seq, so a resumed task continues the same event numbering
+    last_seq: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+    def reached(self, stage: str) -> bool:
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+    def to_row(self) -> tuple:
+        state = {
+            "depth": self.depth,
+            "current_queries": self.current_queries,
+            "queries_run": self.queries_run,
+            "findings": self.findings.to_dict() if self.findings is not None else None,
+            "report": self.report,
+            "result_url": self.result_url,
+            "last_seq": self.last_seq,
+        }
+        return (
+            self.task_id,
+            self.query,
+            self.stage,
+            self.status,
+            json.dumps(state),
+            self.updated_at,
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> Checkpoint:
+        task_id, query, stage, status, state, updated_at = row
+        state = json.loads(state)
+        findings = state.get("findings")
+        return cls(
+            task_id=task_id,
+            query=query,
+            stage=stage,
+            status=status,
+            depth=state.get("depth", 0),
+            current_queries=state.get("current_queries", []),
+            queries_run=state.get("queries_run", []),
+            findings=FindingsStore.from_dict(findings) if findings else None,
+            report=state.get("report"),
+            result_url=state.get("result_url"),
+            last_seq=state.get("last_seq", 0),
+            updated_at=updated_at,
+        )
+
+
+class CheckpointStore:
+    """SQLite store of per-task checkpoints on local disk.
+
+    All methods are blocking; call them via a thread from async code. The
+    store is local to one host, so resuming needs the same volume (or a
+    worker on the same machine) as the run that wrote it.
+    """
+
+    def __init__(self, path: str, ttl: float = 604800) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "task_id TEXT PRIMARY KEY, query TEXT NOT NULL, stage TEXT NOT NULL, "
+                "status TEXT NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        checkpoint.updated_at = time.time()
+        row = checkpoint.to_row()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(task_id, query, stage, status, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._conn.commit()
+
+    def load(self, task_id: str) -> Checkpoint | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT task_id, query, stage, status, state, updated_at "
+                "FROM checkpoints WHERE task_id = ?",
+                (task_id,),
+            ).fetchone()
+        return Checkpoint.from_row(row) if row else None
+
+    def info(self, task_id: str) -> dict | None:
+        """Query, stage, status and last_seq without decoding the findings."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT query, stage, status, json_extract(state, '$.last_seq'), updated_at "
+                "FROM checkpoints WHERE task_id = ?",
+                (task_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        query, stage, status, last_seq, updated_at = row
+        return {
+            "task_id": task_id,
+            "query": query,
+            "stage": stage,
+            "status": status,
+            "last_seq": last_seq or 0,
+            "updated_at": updated_at,
+        }
+
+    def set_status(self, task_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE checkpoints SET status = ?, updated_at = ? WHERE task_id = ?",
+                (status, time.time(), task_id),
+            )
+            self._conn.commit()
+
+    def delete(self, task_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def interrupted(self) -> list[str]:
+        """Task ids cut off by a shutdown, restart or crash, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id FROM checkpoints "
+                "WHERE status IN ('running', 'interrupted') ORDER BY updated_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Module-level store (shared across all tasks)
+_store: CheckpointStore | None = None
+
+
+def get_checkpoint_store(config: Settings) -> CheckpointStore | None:
+    global _store
+    if not config.CHECKPOINT_ENABLED:
+        return None
+    if _store is None:
+        _store = CheckpointStore(config.CHECKPOINT_DB_PATH, config.CHECKPOINT_TTL_SECONDS)
+    return _store
+
+
+def close_checkpoint_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
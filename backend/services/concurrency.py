@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from services.metrics import QUEUE_DEPTH, SEMAPHORE_IN_USE, SEMAPHORE_WAIT_SECONDS
+
+
+class PrioritySemaphore:
+    """Semaphore that wakes waiters by priority (lower first), FIFO within a priority.
+
+    An optional inner limiter (e.g. a backend's cross-process semaphore) is
+    acquired after local admission, so ordering is decided locally while the
+    global limit is still enforced. Named semaphores report wait time, queue
+    depth and slots in use to the metrics registry.
+    """
+
+    def __init__(self, limit: int, inner=None, name: str | None = None) -> None:
+        self.name = name
+        self.limit = limit
+        self._available = limit
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._inner = inner
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    @property
+    def in_use(self) -> int:
+        return self.limit - self._available
+
+    async def acquire(self, priority: int = 0):
+        """Take a slot; returns the inner limiter's lease, to pass back to release()."""
+        started = time.monotonic()
+        if self.name:
+            QUEUE_DEPTH.observe(self.waiting, name=self.name)
+        if self._available > 0 and not self.waiting:
+            self._available -= 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._counter), fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # Slot was handed over just as we were cancelled
+                    self._release_local()
+                raise
+        lease = None
+        if self._inner is not None:
+            try:
+                lease = await self._inner.acquire()
+            except BaseException:
+                self._release_local()
+                raise
+        if self.name:
+            SEMAPHORE_WAIT_SECONDS.observe(time.monotonic() - started, name=self.name)
+            SEMAPHORE_IN_USE.set(self.in_use, name=self.name)
+        return lease
+
+    async def release(self, lease=None) -> None:
+        if self._inner is not None:
+            await self._inner.release(lease)
+        self._release_local()
+        if self.name:
+            SEMAPHORE_IN_USE.set(self.in_use, name=self.name)
+
+    def set_limit(self, limit: int) -> None:
+        """Resize the semaphore. Shrinking takes effect as holders release."""
+        self._available += limit - self.limit
+        self.limit = limit
+        self._wake()
+
+    def _release_local(self) -> None:
+        self._available += 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._available > 0 and self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self._available -= 1
+                fut.set_result(None)
+
+    def slot(self, priority: int = 0) -> _Slot:
+        return _Slot(self, priority)
+
+
+class _Slot:
+    # Carries the lease itself: a slot held across an async generator may be
+    # released from a different task than the one that acquired it
+    def __init__(self, semaphore: PrioritySemaphore, priority: int) -> None:
+        self._semaphore = semaphore
+        self._priority = priority
+        self._lease = None
+
+    async def __aenter__(self) -> None:
+        self._lease = await self._semaphore.acquire(self._priority)
+
+    async def __aexit__(self, *exc) -> None:
+        lease, self._lease = self._lease, None
+        await self._semaphore.release(lease)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from config import Settings
+from services.metrics import CPU_TASK_SECONDS, EVENT_LOOP_LAG_SECONDS, current_trace
+
+logger = logging.getLogger(__name__)
+
+
+class CPUExecutor:
+    """Worker pool for CPU-heavy pipeline steps, keeping them off the event loop.
+
+    run() uses the configured pool: threads, or processes for true
+    parallelism, in which case the function and its arguments must be
+    picklable. Steps that need shared in-process state (e.g. a FindingsStore
+    method) pass thread=True to always use the thread pool. Inputs smaller
+    than min_size run inline, where a pool round trip would cost more than
+    the work.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 0, min_size: int = 20000) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 4
+        self.min_size = min_size
+        self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix="cpu")
+        self._pool: Executor = self._threads
+        if kind == "process":
+            # Spawned, not forked: workers must not inherit the server's sockets
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        size: int | None = None,
+        thread: bool = False,
+    ) -> Any:
+        name = getattr(fn, "__name__", "call")
+        if size is not None and size < self.min_size:
+            mode = "inline"
+        else:
+            mode = "thread" if thread else self.kind
+        started = time.monotonic()
+        try:
+            if mode == "inline":
+                return fn(*args)
+            pool = self._threads if mode == "thread" else self._pool
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        finally:
+            elapsed = time.monotonic() - started
+            CPU_TASK_SECONDS.observe(elapsed, function=name, mode=mode)
+            trace = current_trace()
+            if trace is not None:
+                trace.record(f"cpu.{name}", elapsed)
+
+    def close(self) -> None:
+        if self._pool is not self._threads:
+            # Wait so no worker process outlives the server
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+class LoopLagMonitor:
+    """Measures event loop lag: how late a periodic timer fires.
+
+    Lag above warn_threshold is logged. While it stays above shed_threshold
+    the monitor reports overloaded (cleared once lag drops below half of
+    it), which the scheduler uses to hold back new tasks. Callbacks in
+    on_recover run when the overload clears.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        warn_threshold: float = 0.25,
+        shed_threshold: float = 1.0,
+    ) -> None:
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.shed_threshold = shed_threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.overloaded = False
+        self.on_recover: list[Callable[[], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "lag": round(self.lag, 4),
+            "max_lag": round(self.max_lag, 4),
+            "overloaded": self.overloaded,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, time.monotonic() - expected))
+
+    def observe(self, lag: float) -> None:
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        if lag >= self.warn_threshold:
+            logger.warning(f"Event loop lagged {lag:.3f}s")
+        if not self.shed_threshold:
+            return
+        if lag >= self.shed_threshold and not self.overloaded:
+            self.overloaded = True
+            logger.warning("Event loop overloaded; holding back new tasks")
+        elif self.overloaded and lag < self.shed_threshold / 2:
+            self.overloaded = False
+            for callback in self.on_recover:
+                callback()
+
+
+# Module-level executor and monitor (shared across all tasks)
+_executor: CPUExecutor | None = None
+_monitor: LoopLagMonitor | None = None
+
+
+def get_executor(config: Settings) -> CPUExecutor:
+    global _executor
+    if _executor is None:
+        _executor = CPUExecutor(
+            config.CPU_EXECUTOR, config.CPU_EXECUTOR_WORKERS, config.CPU_OFFLOAD_MIN_SIZE
+        )
+    return _executor
+
+
+def close_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.close()
+        _executor = None
+
+
+def get_loop_monitor(config: Settings) -> LoopLagMonitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopLagMonitor(
+            config.LOOP_LAG_INTERVAL, config.LOOP_LAG_WARN_SECONDS, config.LOOP_LAG_SHED_SECONDS
+        )
+    return _monitor
+
+
+async def close_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
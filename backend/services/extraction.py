@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from services.findings import estimate_tokens
+from services.text import index_terms
+
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_BARE_URL_RE = re.compile(r"https?://\S+")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_SENTENCE_RE = re.compile(r"(?<=[.!?。！？])\s+")
+_BOILERPLATE_RE = re.compile(
+    r"cookie|privacy policy|terms of (use|service)|all rights reserved|©|"
+    r"subscribe|newsletter|sign in|sign up|log in|skip to (main )?content|"
+    r"share (on|this)|follow us|accept all|advertisement|利用規約|プライバシー|ログイン",
+    re.IGNORECASE,
+)
+# Lines shorter than this are only kept if they carry little link text
+_SHORT_LINE_CHARS = 200
+
+
+@dataclass
+class Page:
+    """A fetched page waiting for extraction."""
+
+    url: str
+    content: str
+    query: str
+    passages: list[str] = field(default_factory=list, repr=False)
+
+
+def strip_boilerplate(markdown: str) -> str:
+    """Drop navigation, cookie banners and similar chrome from scraped markdown."""
+    lines = markdown.splitlines()
+    counts = Counter(line.strip() for line in lines if line.strip())
+    kept: list[str] = []
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            kept.append("")
+            continue
+        # Menus and footers repeat; real paragraphs rarely do
+        if counts[line] > 1 and len(line) < _SHORT_LINE_CHARS:
+            continue
+        line = _IMAGE_RE.sub("", _HTML_TAG_RE.sub("", line))
+        link_chars = sum(len(m.group(1)) for m in _LINK_RE.finditer(line))
+        text = _BARE_URL_RE.sub("", _LINK_RE.sub(r"\1", line)).strip()
+        if not text.strip("#*-|>_ "):
+            continue
+        if len(text) < _SHORT_LINE_CHARS:
+            if link_chars and link_chars / max(len(text), 1) > 0.5:
+                continue
+            if _BOILERPLATE_RE.search(text):
+                continue
+        kept.append(text)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def split_passages(text: str, passage_tokens: int = 120) -> list[str]:
+    """Split text into passages of roughly passage_tokens.
+
+    Short paragraphs are merged, long ones are split at sentence boundaries,
+    and a heading stays attached to the paragraph that follows it.
+    """
+    passages: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    def _flush() -> None:
+        nonlocal current_tokens
+        if current:
+            passages.append("\n".join(current))
+            current.clear()
+        current_tokens = 0
+
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith("#"):
+            _flush()
+            current.append(block)
+            current_tokens = estimate_tokens(block)
+            continue
+        tokens = estimate_tokens(block)
+        if tokens > passage_tokens * 2:
+            pieces = _SENTENCE_RE.split(block)
+        else:
+            pieces = [block]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current_tokens and current_tokens + piece_tokens > passage_tokens:
+                heading_only = len(current) == 1 and current[0].startswith("#")
+                if not heading_only:
+                    _flush()
+            current.append(piece)
+            current_tokens += piece_tokens
+    _flush()
+    return passages
+
+
+class _BM25:
+    """Okapi BM25 over a batch of passages."""
+
+    def __init__(self, documents: list[list[str]], k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.freqs = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = sum(self.lengths) / len(documents) if documents else 0.0
+        doc_freq: Counter = Counter()
+        for freq in self.freqs:
+            doc_freq.update(freq.keys())
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    def score(self, index: int, query_terms: set[str]) -> float:
+        freq = self.freqs[index]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.avg_length or 1))
+        total = 0.0
+        for term in query_terms:
+            tf = freq.get(term)
+            if tf:
+                total += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return total
+
+
+def extract_passages(
+    pages: list[Page],
+    query: str,
+    token_budget: int,
+    passage_tokens: int = 120,
+) -> list[str]:
+    """Compress each page to its most relevant passages within token_budget.
+
+    Passages from every page in the batch are scored together with BM25
+    against the original query and the page's sub-query, so term weights
+    reflect the whole round. Selected passages are returned in document
+    order, one string per page. CPU-bound; run it off the event loop.
+    """
+    spans: list[tuple[int, int]] = []
+    documents: list[list[str]] = []
+    for page in pages:
+        page.passages = split_passages(strip_boilerplate(page.content), passage_tokens)
+        start = len(documents)
+        documents.extend(index_terms(p) for p in page.passages)
+        spans.append((start, len(documents)))
+
+    bm25 = _BM25(documents)
+    query_terms = set(index_terms(query))
+    extracted: list[str] = []
+    for page, (start, end) in zip(pages, spans):
+        passages = page.passages
+        costs = [estimate_tokens(p) for p in passages]
+        if sum(costs) <= token_budget:
+            extracted.append("\n\n".join(passages))
+            continue
+        terms = query_terms | set(index_terms(page.query))
+        scores = [bm25.score(i, terms) for i in range(start, end)]
+        # Best-scoring first; document order breaks ties (and covers no-match pages)
+        order = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+        selected: list[int] = []
+        used = 0
+        for i in order:
+            if used + costs[i] > token_budget:
+                continue
+            selected.append(i)
+            used += costs[i]
+        extracted.append("\n\n".join(passages[i] for i in sorted(selected)))
+    return extracted
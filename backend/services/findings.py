@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import math
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+
+from services.text import index_terms
+from sources.normalize import canonicalize_url
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for GPT-style tokenizers)."""
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncate text to roughly max_tokens, preferring a paragraph or line boundary."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n\n"), cut.rfind("\n"))
+    if boundary > max_chars // 2:
+        cut = cut[:boundary]
+    return cut.rstrip()
+
+
+@dataclass
+class Finding:
+    url: str
+    title: str
+    text: str
+    kind: str  # "snippet" or "content"
+    query: str
+    depth: int
+    tokens: int
+    terms: Counter = field(default_factory=Counter, repr=False)
+
+    def render(self) -> str:
+        if self.kind == "content":
+            return f"### Full content from {self.url}\n{self.text}"
+        return f"### {self.title}\nURL: {self.url}\n{self.text}"
+
+
+class _MinHashIndex:
+    """MinHash signatures over term shingles with LSH banding for candidate lookup."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 5) -> None:
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed coefficients keep signatures stable across processes
+        self._coeffs = [
+            (zlib.crc32(f"a{i}".encode()) | 1, zlib.crc32(f"b{i}".encode()))
+            for i in range(num_perm)
+        ]
+        self._buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+        self._signatures: list[list[int]] = []
+
+    def signature(self, words: list[str]) -> list[int] | None:
+        n = self.shingle_size
+        if len(words) < n:
+            return None
+        shingles = {
+            zlib.crc32(" ".join(words[i : i + n]).encode())
+            for i in range(len(words) - n + 1)
+        }
+        return [
+            min(((a * s + b) % _MERSENNE_PRIME) & _MAX_HASH for s in shingles)
+            for a, b in self._coeffs
+        ]
+
+    def find_similar(self, sig: list[int], threshold: float) -> int | None:
+        seen: set[int] = set()
+        for band in range(self.bands):
+            key = (band, tuple(sig[band * self.rows : (band + 1) * self.rows]))
+            for idx in self._buckets.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                other = self._signatures[idx]
+                matches = sum(1 for x, y in zip(sig, other) if x == y)
+                if matches / self.num_perm >= threshold:
+                    return idx
+        return None
+
+    def add(self, sig: list[int]) -> None:
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        for band in range(self.bands):
+            key = (band, tuple(sig[band * self.rows : (band + 1) * self.rows]))
+            self._buckets.setdefault(key, []).append(idx)
+
+
+class FindingsStore:
+    """Structured, deduplicated store of research findings.
+
+    Findings are indexed by canonical URL and kind, near-duplicate page
+    content is dropped via MinHash, and token counts are tracked as findings
+    arrive so a context can be assembled for any token budget.
+    """
+
+    def __init__(
+        self,
+        dedup_threshold: float = 0.8,
+        max_finding_tokens: int = 750,
+    ) -> None:
+        self.dedup_threshold = dedup_threshold
+        self.max_finding_tokens = max_finding_tokens
+        self.findings: list[Finding] = []
+        self.total_tokens = 0
+        self.duplicates_dropped = 0
+        self._index: dict[tuple[str, str], Finding] = {}
+        self._doc_freq: Counter = Counter()
+        self._minhash = _MinHashIndex()
+
+    def __len__(self) -> int:
+        return len(self.findings)
+
+    def has(self, url: str, kind: str = "snippet") -> bool:
+        return (canonicalize_url(url), kind) in self._index
+
+    def add(
+        self,
+        url: str,
+        title: str,
+        text: str,
+        kind: str = "snippet",
+        query: str = "",
+        depth: int = 0,
+    ) -> Finding | None:
+        """Add a finding. Returns None if it duplicates an existing one."""
+        key = (canonicalize_url(url), kind)
+        if key in self._index or not text:
+            return None
+
+        text = truncate_to_tokens(text, self.max_finding_tokens)
+        words = index_terms(text)
+        if kind == "content":
+            sig = self._minhash.signature(words)
+            if sig is not None:
+                if self._minhash.find_similar(sig, self.dedup_threshold) is not None:
+                    self.duplicates_dropped += 1
+                    return None
+                self._minhash.add(sig)
+
+        finding = Finding(
+            url=url,
+            title=title,
+            text=text,
+            kind=kind,
+            query=query,
+            depth=depth,
+            tokens=estimate_tokens(text) + estimate_tokens(title) + estimate_tokens(url),
+            terms=Counter(words),
+        )
+        self.findings.append(finding)
+        self._index[key] = finding
+        self._doc_freq.update(finding.terms.keys())
+        self.total_tokens += finding.tokens
+        return finding
+
+    def to_dict(self) -> dict:
+        """JSON-serializable snapshot; indexes are rebuilt by from_dict."""
+        return {
+            "dedup_threshold": self.dedup_threshold,
+            "max_finding_tokens": self.max_finding_tokens,
+            "duplicates_dropped": self.duplicates_dropped,
+            "findings": [
+                {
+                    "url": f.url,
+                    "title": f.title,
+                    "text": f.text,
+                    "kind": f.kind,
+                    "query": f.query,
+                    "depth": f.depth,
+                }
+                for f in self.findings
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> FindingsStore:
+        store = cls(data["dedup_threshold"], data["max_finding_tokens"])
+        for item in data["findings"]:
+            store.add(**item)
+        store.duplicates_dropped = data.get("duplicates_dropped", 0)
+        return store
+
+    def rank(self, queries: list[str]) -> list[Finding]:
+        """Rank findings by lexical relevance (TF-IDF overlap) to the given queries."""
+        query_terms = set()
+        for q in queries:
+            query_terms.update(index_terms(q))
+        n_docs = len(self.findings)
+        idf = {
+            t: math.log(1 + n_docs / (1 + self._doc_freq.get(t, 0)))
+            for t in query_terms
+        }
+
+        def score(f: Finding) -> float:
+            s = sum(math.log1p(f.terms[t]) * w for t, w in idf.items() if t in f.terms)
+            # Normalize by length so long pages don't win on volume alone
+            return s / math.sqrt(1 + f.tokens / 100)
+
+        order = {id(f): i for i, f in enumerate(self.findings)}
+        return sorted(self.findings, key=lambda f: (-score(f), order[id(f)]))
+
+    def build_context(self, queries: list[str], token_budget: int) -> str:
+        """Assemble the most relevant findings that fit within token_budget."""
+        selected: list[str] = []
+        used = 0
+        for finding in self.rank(queries):
+            if used + finding.tokens > token_budget:
+                continue
+            selected.append(finding.render())
+            used += finding.tokens
+        return "\n\n".join(selected)
+
+    def chunk_contexts(self, queries: list[str], chunk_tokens: int) -> list[str]:
+        """Split all findings into contexts of about chunk_tokens each.
+
+        Findings are grouped by the sub-query that found them, groups ordered
+        by their best-ranked finding, so each chunk covers one or a few
+        related sub-queries and the least relevant material comes last.
+        """
+        groups: dict[str, list[Finding]] = {}
+        for finding in self.rank(queries):
+            groups.setdefault(finding.query, []).append(finding)
+        chunks: list[str] = []
+        current: list[str] = []
+        used = 0
+        for group in groups.values():
+            for finding in group:
+                if current and used + finding.tokens > chunk_tokens:
+                    chunks.append("\n\n".join(current))
+                    current = []
+                    used = 0
+                current.append(finding.render())
+                used += finding.tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
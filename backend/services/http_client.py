@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+
+import httpx
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Module-level client (shared across all tasks and sources)
+_http_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_http_client(config: Settings) -> httpx.AsyncClient:
+    """Return the process-wide pooled HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        http2 = config.HTTP2_ENABLED and _http2_available()
+        if config.HTTP2_ENABLED and not http2:
+            logger.info("h2 package not installed, falling back to HTTP/1.1")
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator
+
+import openai
+from openai import AsyncOpenAI
+
+from config import Settings
+from services.concurrency import PrioritySemaphore
+from services.findings import estimate_tokens
+from services.metrics import LLM_TOKENS, call_span, current_stage, current_trace
+from services.task_registry import TaskRegistry
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Tokens-per-minute budget. A rate of 0 disables the budget."""
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def consume(self, tokens: int) -> None:
+        if not self.rate:
+            return
+        tokens = min(tokens, self.capacity)
+        while True:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def adjust(self, delta: int) -> None:
+        """Charge (positive) or refund (negative) the difference from an estimate."""
+        if self.rate:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class AdaptiveLimit:
+    """AIMD controller for the LLM concurrency window.
+
+    Each success below the latency target grows the window by 1/window
+    (about +1 per round trip); a 429, or the provider reporting its
+    remaining token budget as nearly exhausted, halves it, at most once
+    per cooldown so a burst of concurrent 429s counts as one signal.
+    """
+
+    def __init__(
+        self,
+        semaphore: PrioritySemaphore,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        cooldown: float = 5.0,
+    ) -> None:
+        self.semaphore = semaphore
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.window = float(max_limit)
+        self._last_decrease = 0.0
+
+    def on_success(self, latency: float, headers: Any = None) -> None:
+        if headers is not None and self._budget_low(headers):
+            self._decrease()
+            return
+        if latency <= self.latency_target:
+            self.window = min(self.max_limit, self.window + 1.0 / self.window)
+            self._apply()
+
+    def on_rate_limited(self) -> None:
+        self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.window = max(self.min_limit, self.window / 2)
+        self._apply()
+        logger.info(f"LLM concurrency window reduced to {int(self.window)}")
+
+    def _apply(self) -> None:
+        limit = max(self.min_limit, int(self.window))
+        if limit != self.semaphore.limit:
+            self.semaphore.set_limit(limit)
+
+    @staticmethod
+    def _budget_low(headers: Any) -> bool:
+        try:
+            remaining = int(headers.get("x-ratelimit-remaining-tokens"))
+            limit = int(headers.get("x-ratelimit-limit-tokens"))
+        except (TypeError, ValueError):
+            return False
+        return limit > 0 and remaining < limit * 0.1
+
+
+class LLMGateway:
+    """Shared entry point for all chat completion calls.
+
+    Holds one pooled AsyncOpenAI client and wraps every call in the
+    priority-ordered LLM semaphore (resized by AdaptiveLimit), a
+    tokens-per-minute budget, and retries with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        semaphore: PrioritySemaphore,
+        config: Settings,
+    ) -> None:
+        self.client = client
+        self.semaphore = semaphore
+        self.limit = AdaptiveLimit(
+            semaphore,
+            min_limit=config.LLM_MIN_CONCURRENCY,
+            max_limit=config.MAX_CONCURRENT_LLM_CALLS,
+            latency_target=config.LLM_LATENCY_TARGET,
+        )
+        self.budget = TokenBucket(config.LLM_TOKENS_PER_MINUTE)
+        self.max_retries = config.LLM_MAX_RETRIES
+        self.backoff_base = config.LLM_BACKOFF_BASE
+        self.backoff_max = config.LLM_BACKOFF_MAX
+
+    @staticmethod
+    def _record_usage(usage) -> None:
+        stage = current_stage()
+        LLM_TOKENS.observe(usage.prompt_tokens, stage=stage, kind="prompt")
+        LLM_TOKENS.observe(usage.completion_tokens, stage=stage, kind="completion")
+        trace = current_trace()
+        if trace is not None:
+            trace.tokens += usage.prompt_tokens + usage.completion_tokens
+
+    @staticmethod
+    def _estimate_tokens(kwargs: dict) -> int:
+        prompt = sum(estimate_tokens(m.get("content") or "") for m in kwargs["messages"])
+        return prompt + kwargs.get("max_tokens", 1000)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        # Full jitter keeps retries from many tasks from re-synchronizing
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def complete(self, priority: int = 0, **kwargs):
+        """Non-streaming chat completion. Returns the parsed ChatCompletion."""
+        estimate = self._estimate_tokens(kwargs)
+        for attempt in range(self.max_retries + 1):
+            await self.budget.consume(estimate)
+            try:
+                async with self.semaphore.slot(priority):
+                    started = time.monotonic()
+                    with call_span("openai", "complete"):
+                        raw = await self.client.chat.completions.with_raw_response.create(
+                            **kwargs
+                        )
+                    self.limit.on_success(time.monotonic() - started, raw.headers)
+                response = raw.parse()
+                if response.usage:
+                    self.budget.adjust(response.usage.total_tokens - estimate)
+                    self._record_usage(response.usage)
+                return response
+            except _RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.limit.on_rate_limited()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def stream(self, priority: int = 0, **kwargs) -> AsyncIterator[str]:
+        """Streaming chat completion yielding content deltas.
+
+        The LLM slot is held until the stream is exhausted. A failure is only
+        retried if nothing has been yielded yet.
+        """
+        estimate = self._estimate_tokens(kwargs)
+        kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+        for attempt in range(self.max_retries + 1):
+            yielded = False
+            await self.budget.consume(estimate)
+            try:
+                async with self.semaphore.slot(priority):
+                    started = time.monotonic()
+                    first_chunk_latency = None
+                    with call_span("openai", "stream"):
+                        raw = await self.client.chat.completions.with_raw_response.create(
+                            **kwargs
+                        )
+                        async for chunk in raw.parse():
+                            if first_chunk_latency is None:
+                                first_chunk_latency = time.monotonic() - started
+                            if chunk.usage:
+                                self.budget.adjust(chunk.usage.total_tokens - estimate)
+                                self._record_usage(chunk.usage)
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                yielded = True
+                                yield delta
+                    # Judge streams by time to first token, not total generation time
+                    self.limit.on_success(first_chunk_latency or 0.0, raw.headers)
+                return
+            except _RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.limit.on_rate_limited()
+                if yielded or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"LLM stream failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+# Module-level gateway (shared across all tasks)
+_gateway: LLMGateway | None = None
+
+
+def get_llm_gateway(registry: TaskRegistry, config: Settings) -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        client = AsyncOpenAI(
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_BASE_URL or None,
+            max_retries=0,  # retries are handled by the gateway
+        )
+        _gateway = LLMGateway(
+            client,
+            registry.semaphore("llm", config.MAX_CONCURRENT_LLM_CALLS),
+            config,
+        )
+    return _gateway
+
+
+async def close_llm_gateway() -> None:
+    global _gateway
+    if _gateway is not None:
+        await _gateway.close()
+        _gateway = None
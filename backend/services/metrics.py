@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+_DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "research_stage_seconds", "Duration of research pipeline stages.", ("stage",)
+)
+EXTERNAL_CALL_SECONDS = metrics.histogram(
+    "research_external_call_seconds",
+    "Duration of calls to external services.",
+    ("service", "operation", "outcome"),
+)
+LLM_TOKENS = metrics.histogram(
+    "research_llm_tokens",
+    "Tokens used per LLM call.",
+    ("stage", "kind"),
+    buckets=_TOKEN_BUCKETS,
+)
+SEMAPHORE_WAIT_SECONDS = metrics.histogram(
+    "research_semaphore_wait_seconds", "Time spent waiting for a concurrency slot.", ("name",)
+)
+QUEUE_DEPTH = metrics.histogram(
+    "research_queue_depth",
+    "Number of waiters already queued when a slot is requested.",
+    ("name",),
+    buckets=_DEPTH_BUCKETS,
+)
+SEMAPHORE_IN_USE = metrics.gauge(
+    "research_semaphore_in_use", "Concurrency slots currently held.", ("name",)
+)
+CACHE_EVENTS = metrics.counter(
+    "research_cache_events_total", "Cache lookups by outcome.", ("cache", "outcome")
+)
+ERRORS = metrics.counter(
+    "research_errors_total", "Errors by stage and exception type.", ("stage", "error")
+)
+SOURCE_HEDGES = metrics.counter(
+    "research_source_hedges_total",
+    "Backup requests sent after a source call passed its latency quantile.",
+    ("source", "operation"),
+)
+SOURCE_FAILURES = metrics.counter(
+    "research_source_failures_total",
+    "Source calls that raised or missed their deadline.",
+    ("source", "operation", "reason"),
+)
+SOURCE_BREAKER_OPEN = metrics.gauge(
+    "research_source_breaker_open", "1 while a source's circuit breaker is open.", ("source",)
+)
+DEPTH_STOPS = metrics.counter(
+    "research_depth_stops_total", "Why research loops stopped adding rounds.", ("reason",)
+)
+PREFETCH_PAGES = metrics.counter(
+    "research_prefetch_pages_total",
+    "Pages fetched speculatively during analysis, by outcome.",
+    ("outcome",),
+)
+CPU_TASK_SECONDS = metrics.histogram(
+    "research_cpu_task_seconds",
+    "Duration of CPU-heavy steps by where they ran.",
+    ("function", "mode"),
+)
+EVENT_LOOP_LAG_SECONDS = metrics.histogram(
+    "research_event_loop_lag_seconds", "How late the event loop ran a periodic timer."
+)
+TASKS = metrics.counter("research_tasks_total", "Finished research tasks by status.", ("status",))
+
+
+class TaskTrace:
+    """Span timings for one task, aggregated by span name."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.spans: dict[str, dict[str, float]] = {}
+        # LLM tokens used by the task, for its cost budget
+        self.tokens = 0
+
+    def record(self, name: str, seconds: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = {"count": 1, "total": seconds, "max": seconds}
+        else:
+            span["count"] += 1
+            span["total"] += seconds
+            span["max"] = max(span["max"], seconds)
+
+    def summary(self) -> dict:
+        return {
+            "elapsed": round(time.monotonic() - self.started, 3),
+            "tokens": self.tokens,
+            "spans": {
+                name: {
+                    "count": int(s["count"]),
+                    "total": round(s["total"], 3),
+                    "max": round(s["max"], 3),
+                }
+                for name, s in self.spans.items()
+            },
+        }
+
+
+_current_trace: ContextVar[TaskTrace | None] = ContextVar("current_trace", default=None)
+_current_stage: ContextVar[str] = ContextVar("current_stage", default="none")
+
+
+def start_trace() -> TaskTrace:
+    """Start a trace for the current task; spans in this context record into it."""
+    trace = TaskTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> TaskTrace | None:
+    return _current_trace.get()
+
+
+def current_stage() -> str:
+    """Name of the innermost stage_span in this context ("none" outside one)."""
+    return _current_stage.get()
+
+
+@contextmanager
+def stage_span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into STAGE_SECONDS and the current task trace."""
+    started = time.monotonic()
+    token = _current_stage.set(stage)
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(stage=stage, error=e.__class__.__name__)
+        raise
+    finally:
+        _current_stage.reset(token)
+        elapsed = time.monotonic() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(stage, elapsed)
+
+
+class _CallSpan:
+    def __init__(self) -> None:
+        self.outcome = "ok"
+
+
+@contextmanager
+def call_span(service: str, operation: str) -> Iterator[_CallSpan]:
+    """Time an external call; set span.outcome for failures that don't raise."""
+    span = _CallSpan()
+    started = time.monotonic()
+    try:
+        yield span
+    except Exception as e:
+        span.outcome = "error"
+        ERRORS.inc(stage=f"{service}.{operation}", error=e.__class__.__name__)
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        EXTERNAL_CALL_SECONDS.observe(
+            elapsed, service=service, operation=operation, outcome=span.outcome
+        )
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(f"{service}.{operation}", elapsed)
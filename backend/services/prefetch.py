@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+from services.extraction import Page
+from services.metrics import PREFETCH_PAGES
+
+
+class Prefetcher:
+    """Speculative page fetches for one task, run while its analysis call is in flight.
+
+    start() fetches the next-ranked URLs a round didn't get to, holding at
+    most max_pages at once. take() hands over the finished pages, either
+    waiting for the rest (the research continues) or cancelling them (the
+    analysis said stop, so only pages already in hand are worth keeping).
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[str | None]], max_pages: int) -> None:
+        self.fetch = fetch
+        self.max_pages = max_pages
+        self._tasks: dict[str, tuple[str, asyncio.Task]] = {}
+
+    def start(self, candidates: list[tuple[str, str]]) -> int:
+        """Fetch (url, sub_query) candidates in order until the buffer is full."""
+        started = 0
+        for url, sub_query in candidates:
+            if len(self._tasks) >= self.max_pages:
+                break
+            if url in self._tasks:
+                continue
+            self._tasks[url] = (sub_query, asyncio.create_task(self.fetch(url)))
+            started += 1
+        return started
+
+    async def take(self, wait: bool) -> list[Page]:
+        if wait and self._tasks:
+            await asyncio.wait([task for _, task in self._tasks.values()])
+        tasks, self._tasks = self._tasks, {}
+        pages: list[Page] = []
+        for url, (sub_query, task) in tasks.items():
+            if not task.done():
+                task.cancel()
+                PREFETCH_PAGES.inc(outcome="cancelled")
+            elif task.cancelled() or task.exception() is not None or not task.result():
+                PREFETCH_PAGES.inc(outcome="empty")
+            else:
+                pages.append(Page(url, task.result(), sub_query))
+                PREFETCH_PAGES.inc(outcome="used")
+        return pages
+
+    def cancel(self) -> None:
+        for _, task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import math
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from config import Settings
+from services.findings import FindingsStore
+from services.metrics import CACHE_EVENTS
+from services.text import tokenize
+from sources.normalize import normalize_query
+
+SparseVector = dict[int, float]
+
+
+class Embedder(Protocol):
+    def embed(self, text: str) -> SparseVector: ...
+
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or "
+    "please tell the to what when where which who why with about".split()
+)
+
+
+class HashingEmbedder:
+    """Offline query embedder using feature hashing.
+
+    Content words, word bigrams and character n-grams are hashed into a fixed
+    number of buckets and L2-normalized. Runs of non-ASCII text (e.g. Japanese,
+    which has no spaces between words) are represented by character bigrams
+    only. Deterministic across processes.
+    """
+
+    def __init__(self, dim: int = 4096) -> None:
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> int:
+        return zlib.crc32(feature.encode()) % self.dim
+
+    def embed(self, text: str) -> SparseVector:
+        words = [w for w in tokenize(normalize_query(text)) if w not in _STOPWORDS]
+        vector: SparseVector = {}
+
+        def _add(feature: str, weight: float) -> None:
+            bucket = self._bucket(feature)
+            vector[bucket] = vector.get(bucket, 0.0) + weight
+
+        for word in words:
+            if word.isascii():
+                _add(f"w:{word}", 1.0)
+                padded = f" {word} "
+                for i in range(len(padded) - 2):
+                    _add(f"c:{padded[i : i + 3]}", 0.3)
+            else:
+                for i in range(max(len(word) - 1, 1)):
+                    _add(f"c:{word[i : i + 2]}", 1.0)
+        for a, b in zip(words, words[1:]):
+            _add(f"b:{a} {b}", 0.5)
+
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        if norm:
+            vector = {k: v / norm for k, v in vector.items()}
+        return vector
+
+
+def cosine(a: SparseVector, b: SparseVector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+@dataclass
+class CachedReport:
+    query: str
+    key: str
+    embedding: SparseVector = field(repr=False)
+    # Task that produced the report; its URL is re-signed on every hit
+    task_id: str
+    result_url: str
+    report: str = field(repr=False)
+    findings: FindingsStore | None = field(default=None, repr=False)
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class ReportCache:
+    """Report-level cache keyed by normalized query with near-duplicate matching.
+
+    Exact normalized matches are a dict lookup; otherwise the most similar
+    cached query above the similarity threshold is returned. Entries expire
+    after ttl seconds and the least recently used entry is evicted when full.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 86400,
+        threshold: float = 0.9,
+        embedder: Embedder | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder()
+        self._entries: OrderedDict[str, CachedReport] = OrderedDict()
+        self.counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+
+    def lookup(self, query: str) -> tuple[CachedReport, float] | None:
+        """Return the best cached report and its similarity, or None on a miss."""
+        self._expire()
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._count("exact_hits")
+            return self._touch(entry), 1.0
+
+        embedding = self.embedder.embed(query)
+        best: CachedReport | None = None
+        best_score = 0.0
+        for candidate in self._entries.values():
+            score = cosine(embedding, candidate.embedding)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= self.threshold:
+            self._count("similar_hits")
+            return self._touch(best), best_score
+
+        self._count("misses")
+        return None
+
+    def store(
+        self,
+        query: str,
+        task_id: str,
+        result_url: str,
+        report: str,
+        findings: FindingsStore | None = None,
+    ) -> None:
+        key = normalize_query(query)
+        self._entries[key] = CachedReport(
+            query=query,
+            key=key,
+            embedding=self.embedder.embed(query),
+            task_id=task_id,
+            result_url=result_url,
+            report=report,
+            findings=findings,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {**self.counters, "entries": len(self._entries)}
+
+    def _count(self, outcome: str) -> None:
+        self.counters[outcome] += 1
+        CACHE_EVENTS.inc(cache="report", outcome=outcome)
+
+    def _touch(self, entry: CachedReport) -> CachedReport:
+        entry.hits += 1
+        self._entries.move_to_end(entry.key)
+        return entry
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [k for k, e in self._entries.items() if e.created_at < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+
+# Module-level cache (shared across all tasks)
+_report_cache: ReportCache | None = None
+
+
+def get_report_cache(config: Settings) -> ReportCache | None:
+    global _report_cache
+    if not config.REPORT_CACHE_ENABLED:
+        return None
+    if _report_cache is None:
+        _report_cache = ReportCache(
+            max_entries=config.REPORT_CACHE_MAX_ENTRIES,
+            ttl=config.REPORT_CACHE_TTL,
+            threshold=config.REPORT_CACHE_SIMILARITY,
+        )
+    return _report_cache
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from config import Settings
+from services.metrics import CACHE_EVENTS
+
+_WORD_RE = re.compile(r"\w+")
+
+_COLUMNS = "task_id, query, created_at, updated_at, size, sha256"
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ReportIndex:
+    """SQLite index of saved reports: metadata plus an FTS5 table over query and body.
+
+    Fed by BlobStorageService.upload_report, so it only knows reports saved
+    through this host (like the checkpoint store, it lives on local disk).
+    Uses the trigram tokenizer, so search words shorter than three characters
+    are ignored. All methods are blocking; call them via a thread from async code.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                "id INTEGER PRIMARY KEY, task_id TEXT NOT NULL UNIQUE, query TEXT NOT NULL, "
+                "content TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "size INTEGER NOT NULL, sha256 TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS reports_created_at ON reports (created_at)"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5("
+                "query, content, content='reports', content_rowid='id', "
+                "tokenize='trigram')"
+            )
+            self._conn.commit()
+
+    def record(self, task_id: str, query: str, content: str) -> dict:
+        """Index a report, replacing an earlier version with the same task id."""
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        sha256 = content_hash(content)
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT id, query, content, created_at FROM reports WHERE task_id = ?",
+                (task_id,),
+            ).fetchone()
+            created_at = now
+            if old is not None:
+                created_at = old[3]
+                self._conn.execute(
+                    "INSERT INTO reports_fts (reports_fts, rowid, query, content) "
+                    "VALUES ('delete', ?, ?, ?)",
+                    old[:3],
+                )
+                self._conn.execute("DELETE FROM reports WHERE id = ?", (old[0],))
+            cursor = self._conn.execute(
+                "INSERT INTO reports "
+                "(task_id, query, content, created_at, updated_at, size, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (task_id, query, content, created_at, now, size, sha256),
+            )
+            self._conn.execute(
+                "INSERT INTO reports_fts (rowid, query, content) VALUES (?, ?, ?)",
+                (cursor.lastrowid, query, content),
+            )
+            self._conn.commit()
+        return self._row_dict((task_id, query, created_at, now, size, sha256))
+
+    @staticmethod
+    def _row_dict(row: tuple) -> dict:
+        task_id, query, created_at, updated_at, size, sha256 = row
+        return {
+            "task_id": task_id,
+            "query": query,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "size": size,
+            "sha256": sha256,
+        }
+
+    @staticmethod
+    def _match_expression(text: str) -> str:
+        # Every word must match; quoted so user input can't use FTS5 syntax
+        terms = dict.fromkeys(w for w in _WORD_RE.findall(text) if len(w) >= 3)
+        return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+    def list(
+        self,
+        limit: int = 20,
+        offset: int = 0,
+        search: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> tuple[int, list[dict]]:
+        """Total matching reports and one page of them.
+
+        Newest first, or by relevance when searching (with a snippet of the
+        matching text).
+        """
+        where: list[str] = []
+        params: list = []
+        if since is not None:
+            where.append("r.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.created_at < ?")
+            params.append(until)
+        expression = self._match_expression(search) if search else ""
+        if search and not expression:
+            return 0, []
+        if expression:
+            where.append("reports_fts MATCH ?")
+            params.append(expression)
+            source = "reports_fts JOIN reports r ON r.id = reports_fts.rowid"
+            extra = ", snippet(reports_fts, 1, '', '', '…', 24)"
+            order = "bm25(reports_fts)"
+        else:
+            source = "reports r"
+            extra = ""
+            order = "r.created_at DESC"
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        columns = ", ".join(f"r.{c.strip()}" for c in _COLUMNS.split(","))
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM {source}{clause}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {columns}{extra} FROM {source}{clause} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        items = []
+        for row in rows:
+            item = self._row_dict(row[:6])
+            if expression:
+                item["snippet"] = row[6]
+            items.append(item)
+        return total, items
+
+    def get(self, task_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM reports WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._row_dict(row) if row else None
+
+    def content(self, task_id: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM reports WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class ReportBody:
+    """A report ready to serve: identity bytes, their gzip encoding and an ETag."""
+
+    data: bytes
+    gzipped: bytes
+    etag: str
+
+    @classmethod
+    def build(cls, content: str) -> ReportBody:
+        data = content.encode("utf-8")
+        return cls(data, gzip.compress(data), f'"{content_hash(content)}"')
+
+    @property
+    def size(self) -> int:
+        return len(self.data) + len(self.gzipped)
+
+
+class ReportBodyCache:
+    """LRU of encoded report bodies, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._entries: OrderedDict[str, ReportBody] = OrderedDict()
+
+    def get(self, task_id: str) -> ReportBody | None:
+        body = self._entries.get(task_id)
+        if body is None:
+            CACHE_EVENTS.inc(cache="report_body", outcome="miss")
+            return None
+        self._entries.move_to_end(task_id)
+        CACHE_EVENTS.inc(cache="report_body", outcome="hit")
+        return body
+
+    def put(self, task_id: str, body: ReportBody) -> None:
+        self.discard(task_id)
+        if body.size > self.max_bytes:
+            return
+        self._entries[task_id] = body
+        self._bytes += body.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def discard(self, task_id: str) -> None:
+        body = self._entries.pop(task_id, None)
+        if body is not None:
+            self._bytes -= body.size
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+# Module-level index and body cache (shared across all tasks)
+_index: ReportIndex | None = None
+_bodies: ReportBodyCache | None = None
+
+
+def get_report_index(config: Settings) -> ReportIndex | None:
+    global _index
+    if not config.REPORT_INDEX_ENABLED:
+        return None
+    if _index is None:
+        _index = ReportIndex(config.REPORT_INDEX_DB_PATH)
+    return _index
+
+
+def get_report_bodies(config: Settings) -> ReportBodyCache:
+    global _bodies
+    if _bodies is None:
+        _bodies = ReportBodyCache(config.REPORT_BODY_CACHE_BYTES)
+    return _bodies
+
+
+def close_report_index() -> None:
+    global _index, _bodies
+    if _index is not None:
+        _index.close()
+        _index = None
+    _bodies = None
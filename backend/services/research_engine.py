@@ -3,9 +3,11 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import math
 import re
-
-from openai import AsyncOpenAI
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
 
 logger = logging.getLogger(__name__)
 
@@ -22,85 +24,199 @@ def _parse_json(text: str | None) -> any:
     return json.loads(cleaned)
 
 from config import Settings
-from services.blob_storage import BlobStorageService
+from services.blob_storage import get_storage
+from services.call_trace import CallTrace, RecordingLLM
+from services.checkpoints import (
+    STAGE_GATHERED,
+    STAGE_REPORTED,
+    STAGE_RESEARCHING,
+    STAGE_UPLOADED,
+    Checkpoint,
+    get_checkpoint_store,
+)
+from services.executor import CPUExecutor, get_executor
+from services.extraction import Page, extract_passages
+from services.findings import FindingsStore
+from services.llm_gateway import LLMGateway, get_llm_gateway
+from services.metrics import DEPTH_STOPS, TaskTrace, current_trace, stage_span, start_trace
+from services.prefetch import Prefetcher
+from services.report_cache import get_report_cache
+from services.task_models import TERMINAL_STATUSES
 from services.task_registry import TaskRegistry, ProgressEvent
+from services.text import index_terms
 from sources.base import ResearchSource
+from sources.normalize import normalize_query
+from sources.replay_source import RecordingSource
 
 
-# Module-level semaphores (shared across all tasks)
-_llm_semaphore: asyncio.Semaphore | None = None
-_search_semaphore: asyncio.Semaphore | None = None
+# Lower values are served first, so tasks close to finishing aren't starved
+# by a burst of newly submitted ones.
+_PRIORITY_REPORT = 0
+_PRIORITY_ANALYSIS = 10
+_PRIORITY_DECOMPOSE = 20
 
+# Progress messages for rounds cut short by adaptive depth control
+_STOP_MESSAGES = {
+    "low_novelty": "Latest round found little new information; writing report...",
+    "duplicate_queries": "Follow-up queries repeat earlier searches; writing report...",
+    "time_budget": "Time budget reached; writing report with findings so far...",
+    "token_budget": "Token budget reached; writing report with findings so far...",
+}
 
-def _get_semaphores(config: Settings) -> tuple[asyncio.Semaphore, asyncio.Semaphore]:
-    global _llm_semaphore, _search_semaphore
-    if _llm_semaphore is None:
-        _llm_semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_LLM_CALLS)
-    if _search_semaphore is None:
-        _search_semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_SEARCH_CALLS)
-    return _llm_semaphore, _search_semaphore
 
+async def _decompose(
+    query: str,
+    task_id: str,
+    registry: TaskRegistry,
+    llm: LLMGateway,
+    executor: CPUExecutor,
+) -> list[str]:
+    """Split the query into sub-queries for the first search round."""
+    # Step 1: Decompose query
+    await registry.emit(
+        task_id,
+        ProgressEvent("progress", "Analyzing query...", 5),
+    )
+
+    with stage_span("decompose"):
+        decompose_resp = await llm.complete(
+            _PRIORITY_DECOMPOSE,
+            model="gpt-4o",
+            response_format={"type": "json_object"},
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a research assistant. Given a research query, "
+                        "decompose it into 3-5 specific search queries that will "
+                        "help gather comprehensive information. Return JSON: "
+                        '{"queries": ["query1", "query2", ...]}.'
+                    ),
+                },
+                {"role": "user", "content": query},
+            ],
+            temperature=0.3,
+        )
 
-async def run_research(
+    try:
+        content = decompose_resp.choices[0].message.content
+        parsed = await executor.run(_parse_json, content, size=len(content or ""))
+        if isinstance(parsed, dict):
+            sub_queries = parsed.get("queries", [query])
+        elif isinstance(parsed, list):
+            sub_queries = parsed
+        else:
+            sub_queries = [query]
+        if not sub_queries:
+            sub_queries = [query]
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("Failed to parse sub-queries, using original query")
+        sub_queries = [query]
+    return sub_queries
+
+
+def _query_similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _novel_queries(candidates: list[str], previous: list[str], threshold: float) -> list[str]:
+    """Drop follow-up queries that are near-duplicates of earlier or sibling queries."""
+    seen = [set(index_terms(normalize_query(q))) for q in previous]
+    kept: list[str] = []
+    for query in candidates:
+        if not isinstance(query, str) or not query.strip():
+            continue
+        terms = set(index_terms(normalize_query(query)))
+        if any(_query_similarity(terms, other) >= threshold for other in seen):
+            logger.info(f"Skipping near-duplicate follow-up query: {query}")
+            continue
+        seen.append(terms)
+        kept.append(query)
+    return kept
+
+
+def _budget_exhausted(config: Settings, started: float, trace: TaskTrace | None) -> str | None:
+    """Name of the per-task budget that has run out, if any."""
+    time_budget = config.TASK_TIME_BUDGET_SECONDS
+    if time_budget and time.monotonic() - started >= time_budget:
+        return "time_budget"
+    token_budget = config.TASK_TOKEN_BUDGET
+    if token_budget and trace is not None and trace.tokens >= token_budget:
+        return "token_budget"
+    return None
+
+
+async def _gather_findings(
     query: str,
     task_id: str,
     registry: TaskRegistry,
     source: ResearchSource,
     config: Settings,
+    llm: LLMGateway,
+    findings: FindingsStore,
+    checkpoint: Checkpoint,
+    save: Callable[[], Awaitable[None]],
 ) -> None:
-    client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
-    llm_sem, search_sem = _get_semaphores(config)
-    task_info = registry.get_task(task_id)
-    if not task_info:
-        return
-
-    task_info.status = "running"
-    all_findings: list[str] = []
-
-    try:
-        # Step 1: Decompose query
-        await registry.emit(
-            task_id,
-            ProgressEvent("progress", "Analyzing query...", 5),
+    """Run search/analysis rounds, filling findings.
+
+    The checkpoint is advanced and saved after decomposition and after each
+    round, so a resumed task restarts at the round that was cut off. Rounds
+    stop early when follow-ups only repeat earlier queries, when a round adds
+    little new material, or when the task's time or token budget runs out.
+    While each analysis call runs, the round's next-ranked unfetched pages
+    are prefetched for the next round, or for the report if research stops.
+    """
+    # Shared across all tasks (and workers, with a shared backend)
+    search_sem = registry.semaphore("search", config.MAX_CONCURRENT_SEARCH_CALLS)
+    executor = get_executor(config)
+    started = time.monotonic()
+    trace = current_trace()
+    stop_reason: str | None = None
+
+    if not checkpoint.reached(STAGE_RESEARCHING):
+        checkpoint.current_queries = await _decompose(
+            query, task_id, registry, llm, executor
         )
-
-        async with llm_sem:
-            decompose_resp = await client.chat.completions.create(
-                model="gpt-4o",
-                response_format={"type": "json_object"},
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a research assistant. Given a research query, "
-                            "decompose it into 3-5 specific search queries that will "
-                            "help gather comprehensive information. Return JSON: "
-                            '{"queries": ["query1", "query2", ...]}.'
-                        ),
-                    },
-                    {"role": "user", "content": query},
-                ],
-                temperature=0.3,
+        checkpoint.depth = 0
+        checkpoint.stage = STAGE_RESEARCHING
+        await save()
+
+    depth = checkpoint.depth
+    current_queries = checkpoint.current_queries
+
+    async def _speculative_fetch(u: str):
+        # Behind every non-speculative search and fetch
+        async with search_sem.slot(1):
+            return await source.fetch_content(u)
+
+    prefetch = Prefetcher(_speculative_fetch, config.PREFETCH_MAX_PAGES)
+
+    async def _extract(pages: list[Page]) -> list[str]:
+        if not pages or not config.EXTRACTION_ENABLED:
+            return [page.content for page in pages]
+        # One batch per round: BM25 weights span every page, off the loop
+        with stage_span("extract"):
+            return await executor.run(
+                extract_passages,
+                pages,
+                query,
+                config.FINDING_MAX_TOKENS,
+                config.EXTRACTION_PASSAGE_TOKENS,
             )
 
-        try:
-            parsed = _parse_json(decompose_resp.choices[0].message.content)
-            if isinstance(parsed, dict):
-                sub_queries = parsed.get("queries", [query])
-            elif isinstance(parsed, list):
-                sub_queries = parsed
-            else:
-                sub_queries = [query]
-            if not sub_queries:
-                sub_queries = [query]
-        except (json.JSONDecodeError, TypeError):
-            logger.warning("Failed to parse sub-queries, using original query")
-            sub_queries = [query]
-
-        depth = 0
-        current_queries = sub_queries
+    try:
+        while depth < config.MAX_RESEARCH_DEPTH and current_queries:
+            if depth > 0 and (budget := _budget_exhausted(config, started, trace)):
+                stop_reason = budget
+                checkpoint.current_queries = []
+                await save()
+                break
+            for q in current_queries:
+                if q not in checkpoint.queries_run:
+                    checkpoint.queries_run.append(q)
 
-        while depth < config.MAX_RESEARCH_DEPTH:
             # Step 2: Search
             progress_base = 10 + depth * 20
             progress_step = max(1, 30 // max(len(current_queries), 1))
@@ -114,47 +230,103 @@ async def run_research(
                 ),
             )
 
+            # Later rounds are closer to the report, so they go first
             async def _guarded_search(q: str):
-                async with search_sem:
-                    return await source.search(q)
-
-            search_tasks = [_guarded_search(q) for q in current_queries]
-            search_results_lists = await asyncio.gather(*search_tasks)
-
-            all_urls: list[str] = []
-            for i, results in enumerate(search_results_lists):
-                progress = min(progress_base + (i + 1) * progress_step, 90)
-                await registry.emit(
-                    task_id,
-                    ProgressEvent(
-                        "progress",
-                        f"Found {len(results)} results for sub-query {i + 1}",
-                        progress,
-                    ),
-                )
-                for r in results:
-                    if r.url and r.url not in all_urls:
-                        all_urls.append(r.url)
-                        all_findings.append(
-                            f"### {r.title}\nURL: {r.url}\n{r.snippet}"
-                        )
-
-            # Fetch full content for top results (max 5)
-            top_urls = all_urls[:5]
-            if top_urls:
-                async def _guarded_fetch(u: str):
-                    async with search_sem:
-                        return await source.fetch_content(u)
-
-                fetch_tasks = [_guarded_fetch(u) for u in top_urls]
-                contents = await asyncio.gather(*fetch_tasks)
-                for url, content in zip(top_urls, contents):
-                    if content:
-                        # Truncate long content
-                        truncated = content[:3000]
-                        all_findings.append(
-                            f"### Full content from {url}\n{truncated}"
+                async with search_sem.slot(-depth):
+                    return q, await source.search(q)
+
+            async def _guarded_fetch(u: str, q: str):
+                async with search_sem.slot(-depth):
+                    return u, q, await source.fetch_content(u)
+
+            # Scrape each search's top URLs as soon as that search returns,
+            # instead of waiting for the slowest search in the round.
+            fetch_cap = config.MAX_FETCHES_PER_ROUND
+            per_query_cap = max(1, math.ceil(fetch_cap / max(len(current_queries), 1)))
+            round_urls: list[tuple[str, str]] = []
+            fetched_urls: set[str] = set()
+            pages: list[Page] = []
+            results_seen = 0
+            with stage_span("search"):
+                search_tasks = [
+                    asyncio.create_task(_guarded_search(q)) for q in current_queries
+                ]
+                fetch_tasks: list[asyncio.Task] = []
+                try:
+                    for i, next_search in enumerate(asyncio.as_completed(search_tasks)):
+                        sub_query, results = await next_search
+                        progress = min(progress_base + (i + 1) * progress_step, 90)
+                        await registry.emit(
+                            task_id,
+                            ProgressEvent(
+                                "progress",
+                                f"Found {len(results)} results for sub-query {i + 1}",
+                                progress,
+                            ),
                         )
+                        scheduled = 0
+                        for r in results:
+                            if not r.url:
+                                continue
+                            results_seen += 1
+                            if findings.has(r.url):
+                                continue
+                            findings.add(
+                                r.url, r.title, r.snippet, "snippet", sub_query, depth
+                            )
+                            round_urls.append((r.url, sub_query))
+                            if (
+                                scheduled < per_query_cap
+                                and len(fetch_tasks) < fetch_cap
+                                and not findings.has(r.url, "content")
+                            ):
+                                fetched_urls.add(r.url)
+                                fetch_tasks.append(
+                                    asyncio.create_task(_guarded_fetch(r.url, sub_query))
+                                )
+                                scheduled += 1
+
+                    # Spend any fetch budget left by searches with few results
+                    for url, sub_query in round_urls:
+                        if len(fetch_tasks) >= fetch_cap:
+                            break
+                        if url not in fetched_urls and not findings.has(url, "content"):
+                            fetched_urls.add(url)
+                            fetch_tasks.append(
+                                asyncio.create_task(_guarded_fetch(url, sub_query))
+                            )
+
+                    for next_fetch in asyncio.as_completed(fetch_tasks):
+                        url, sub_query, content = await next_fetch
+                        if content:
+                            pages.append(Page(url, content, sub_query))
+                finally:
+                    for t in search_tasks + fetch_tasks:
+                        t.cancel()
+
+            # Pages prefetched during the last analysis are kept, but were
+            # chosen from an earlier round, so don't count toward novelty
+            carried = await prefetch.take(wait=True)
+            extracted = await _extract(pages + carried)
+            new_content = 0
+            for i, (page, text) in enumerate(zip(pages + carried, extracted)):
+                added = findings.add(page.url, page.url, text, "content", page.query, depth)
+                if added and i < len(pages):
+                    new_content += 1
+
+            # Share of this round's results and pages that were new to the task
+            seen = results_seen + len(pages)
+            novelty = (len(round_urls) + new_content) / seen if seen else 0.0
+            if depth > 0 and novelty < config.MIN_ROUND_NOVELTY:
+                stop_reason = "low_novelty"
+            else:
+                stop_reason = _budget_exhausted(config, started, trace)
+            if stop_reason:
+                # Not worth an analysis call; go straight to the report
+                checkpoint.depth = depth + 1
+                checkpoint.current_queries = []
+                await save()
+                break
 
             # Step 3: Analyze if more research needed
             await registry.emit(
@@ -162,9 +334,23 @@ async def run_research(
                 ProgressEvent("progress", "Analyzing findings...", 50 + depth * 10),
             )
 
-            findings_text = "\n\n".join(all_findings[-20:])  # Last 20 findings
-            async with llm_sem:
-                analysis_resp = await client.chat.completions.create(
+            # Ranks and joins every finding; total_tokens * 4 approximates its size in chars
+            findings_text = await executor.run(
+                findings.build_context,
+                [query, *current_queries],
+                config.ANALYSIS_CONTEXT_TOKENS,
+                size=findings.total_tokens * 4,
+                thread=True,
+            )
+            # Fetch the next-ranked pages this round skipped while the LLM works
+            prefetch.start([
+                (url, sub_query)
+                for url, sub_query in round_urls
+                if url not in fetched_urls and not findings.has(url, "content")
+            ])
+            with stage_span("analysis"):
+                analysis_resp = await llm.complete(
+                    _PRIORITY_ANALYSIS - depth,
                     model="gpt-4o",
                     response_format={"type": "json_object"},
                     messages=[
@@ -189,7 +375,8 @@ async def run_research(
                 )
 
             try:
-                analysis = _parse_json(analysis_resp.choices[0].message.content)
+                content = analysis_resp.choices[0].message.content
+                analysis = await executor.run(_parse_json, content, size=len(content or ""))
                 if not isinstance(analysis, dict):
                     analysis = {"needs_more_research": False}
             except (json.JSONDecodeError, TypeError):
@@ -197,14 +384,26 @@ async def run_research(
                 analysis = {"needs_more_research": False}
 
             depth += 1
-
-            if (
-                not analysis.get("needs_more_research", False)
-                or depth >= config.MAX_RESEARCH_DEPTH
-            ):
-                break
-
-            current_queries = analysis.get("follow_up_queries", [])
+            if not analysis.get("needs_more_research", False):
+                stop_reason = "analysis"
+                current_queries = []
+            elif depth >= config.MAX_RESEARCH_DEPTH:
+                stop_reason = "max_depth"
+                current_queries = []
+            else:
+                current_queries = _novel_queries(
+                    analysis.get("follow_up_queries") or [],
+                    checkpoint.queries_run,
+                    config.FOLLOW_UP_SIMILARITY,
+                )
+                stop_reason = "duplicate_queries"
+                if current_queries and (budget := _budget_exhausted(config, started, trace)):
+                    stop_reason = budget
+                    current_queries = []
+
+            checkpoint.depth = depth
+            checkpoint.current_queries = current_queries
+            await save()
             if not current_queries:
                 break
 
@@ -217,54 +416,324 @@ async def run_research(
                 ),
             )
 
-        # Step 4: Generate final report
+        # Keep prefetched pages already in hand for the report
+        late = await prefetch.take(wait=False)
+        for page, text in zip(late, await _extract(late)):
+            findings.add(page.url, page.url, text, "content", page.query, depth)
+    finally:
+        prefetch.cancel()
+
+    if stop_reason is None:
+        return
+    DEPTH_STOPS.inc(reason=stop_reason)
+    message = _STOP_MESSAGES.get(stop_reason)
+    if message:
         await registry.emit(
             task_id,
-            ProgressEvent("progress", "Generating report...", 80),
+            ProgressEvent("progress", message, 50 + depth * 10, {"stop_reason": stop_reason}),
         )
 
-        findings_text = "\n\n".join(all_findings)
-        async with llm_sem:
-            report_resp = await client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a research report writer. Given a research query and "
-                            "gathered findings, produce a comprehensive, well-structured "
-                            "Markdown report. Include an executive summary, key findings, "
-                            "detailed analysis, and references. Make it thorough and insightful."
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            f"Research query: {query}\n\n"
-                            f"Gathered findings:\n{findings_text}"
-                        ),
-                    },
-                ],
-                temperature=0.4,
+
+async def _summarize_findings(
+    query: str,
+    task_id: str,
+    registry: TaskRegistry,
+    config: Settings,
+    llm: LLMGateway,
+    findings: FindingsStore,
+) -> str:
+    """Map step of map-reduce reporting: summarize chunks of findings in parallel.
+
+    Chunks run concurrently, bounded by the LLM gateway's semaphore, so this
+    takes about chunks / concurrency LLM round trips however large the
+    findings are. Returns the summaries as the context for the final report.
+    """
+    chunks = await get_executor(config).run(
+        findings.chunk_contexts,
+        [query],
+        config.REPORT_CHUNK_TOKENS,
+        size=findings.total_tokens * 4,
+        thread=True,
+    )
+    # Least relevant chunks come last; drop them past the cap
+    chunks = chunks[: config.REPORT_MAX_CHUNKS]
+    await registry.emit(
+        task_id,
+        ProgressEvent("progress", f"Summarizing findings in {len(chunks)} parts...", 80),
+    )
+    done = 0
+
+    async def _summarize(chunk: str) -> str:
+        nonlocal done
+        resp = await llm.complete(
+            _PRIORITY_REPORT,
+            model="gpt-4o",
+            max_tokens=config.REPORT_SUMMARY_MAX_TOKENS,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a research note-taker. Condense the findings below into "
+                        "dense Markdown notes relevant to the research query: keep facts, "
+                        "figures, dates and disagreements between sources, and cite the "
+                        "source URL after each point. Do not add information."
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": f"Research query: {query}\n\nFindings:\n{chunk}",
+                },
+            ],
+            temperature=0.2,
+        )
+        done += 1
+        await registry.emit(
+            task_id,
+            ProgressEvent(
+                "progress", f"Summarized part {done} of {len(chunks)}", 80 + 5 * done // len(chunks)
+            ),
+        )
+        return resp.choices[0].message.content or ""
+
+    with stage_span("report_map"):
+        summaries = await asyncio.gather(*[_summarize(chunk) for chunk in chunks])
+    return "\n\n".join(
+        f"## Notes {i + 1}\n{summary}" for i, summary in enumerate(summaries) if summary
+    )
+
+
+async def _write_report(
+    query: str,
+    task_id: str,
+    registry: TaskRegistry,
+    config: Settings,
+    llm: LLMGateway,
+    findings: FindingsStore,
+) -> str:
+    """Stream the final report, emitting batched report_delta events.
+
+    Findings above REPORT_MAP_REDUCE_THRESHOLD tokens are summarized in
+    parallel chunks first and the report is written from the summaries;
+    otherwise the most relevant findings go into a single prompt.
+    """
+    # Step 4: Generate final report
+    await registry.emit(
+        task_id,
+        ProgressEvent("progress", "Generating report...", 80),
+    )
+
+    threshold = config.REPORT_MAP_REDUCE_THRESHOLD
+    if threshold and findings.total_tokens > threshold:
+        findings_text = await _summarize_findings(
+            query, task_id, registry, config, llm, findings
+        )
+    else:
+        findings_text = await get_executor(config).run(
+            findings.build_context,
+            [query],
+            config.REPORT_CONTEXT_TOKENS,
+            size=findings.total_tokens * 4,
+            thread=True,
+        )
+    report_parts: list[str] = []
+    pending: list[str] = []
+    pending_chars = 0
+    last_flush = time.monotonic()
+
+    async def _flush_report_delta() -> None:
+        nonlocal pending_chars, last_flush
+        if pending:
+            await registry.emit(
+                task_id,
+                ProgressEvent("report_delta", "", 80, {"delta": "".join(pending)}),
             )
+            pending.clear()
+        pending_chars = 0
+        last_flush = time.monotonic()
+
+    report_stream = llm.stream(
+        _PRIORITY_REPORT,
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are a research report writer. Given a research query and "
+                    "gathered findings, produce a comprehensive, well-structured "
+                    "Markdown report. Include an executive summary, key findings, "
+                    "detailed analysis, and references. Make it thorough and insightful."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Research query: {query}\n\n"
+                    f"Gathered findings:\n{findings_text}"
+                ),
+            },
+        ],
+        temperature=0.4,
+    )
+    # Batch tokens into report_delta events by time or size
+    async for delta in report_stream:
+        report_parts.append(delta)
+        pending.append(delta)
+        pending_chars += len(delta)
+        if (
+            pending_chars >= config.REPORT_STREAM_FLUSH_CHARS
+            or time.monotonic() - last_flush >= config.REPORT_STREAM_FLUSH_INTERVAL
+        ):
+            await _flush_report_delta()
+    await _flush_report_delta()
+
+    report = "".join(report_parts)
+    return report
+
+
+async def complete_from_cache(
+    task_id: str,
+    registry: TaskRegistry,
+    result_url: str,
+    report: str,
+    similarity: float,
+) -> None:
+    """Finish a task immediately with a previously generated report."""
+    await registry.update_task(
+        task_id, status="completed", result_url=result_url, progress=100
+    )
+    await registry.emit(
+        task_id,
+        ProgressEvent(
+            "completed",
+            "Research complete! (cached)",
+            100,
+            {
+                "result_url": result_url,
+                "report": report,
+                "cached": True,
+                "similarity": round(similarity, 3),
+            },
+        ),
+    )
+
+
+async def _save_recording(recording: CallTrace, config: Settings) -> None:
+    path = Path(config.TRACE_RECORD_DIR) / f"{recording.task_id}.trace.json.gz"
+    try:
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(recording.save, str(path))
+    except Exception as e:
+        logger.warning(f"Failed to save call trace for task {recording.task_id}: {e}")
 
-        report = report_resp.choices[0].message.content
 
-        # Step 5: Save report
+async def run_research(
+    query: str,
+    task_id: str,
+    registry: TaskRegistry,
+    source: ResearchSource,
+    config: Settings,
+    findings: FindingsStore | None = None,
+    resume: bool = False,
+    llm: LLMGateway | None = None,
+) -> None:
+    """Run a research task end to end.
+
+    If findings are given (e.g. from the report cache), searching is skipped
+    and only the report is regenerated from them. State is checkpointed after
+    each stage; with resume=True the task continues from its last checkpoint.
+    llm replaces the shared gateway (e.g. with a ReplayLLM). With
+    TRACE_RECORD_DIR set, every external call is recorded for replay.
+    """
+    llm = llm or get_llm_gateway(registry, config)
+    # The scheduler starts the trace so queue time is included
+    trace = current_trace() or start_trace()
+    if not await registry.update_task(task_id, status="running"):
+        return
+
+    recording = None
+    if config.TRACE_RECORD_DIR:
+        recording = CallTrace.for_task(query, task_id, config)
+        source = RecordingSource(source, recording)
+        llm = RecordingLLM(llm, recording)
+
+    store = get_checkpoint_store(config)
+    checkpoint = None
+    if resume and store is not None:
+        checkpoint = await asyncio.to_thread(store.load, task_id)
+    if checkpoint is None:
+        checkpoint = Checkpoint(task_id=task_id, query=query)
+        if findings is not None:
+            checkpoint.findings = findings
+            checkpoint.stage = STAGE_GATHERED
+    else:
+        checkpoint.status = "running"
         await registry.emit(
             task_id,
-            ProgressEvent("progress", "Saving report...", 90),
+            ProgressEvent("progress", f"Resuming from checkpoint ({checkpoint.stage})...", 5),
         )
 
-        storage = BlobStorageService(
-            config.AZURE_STORAGE_CONNECTION_STRING,
-            config.AZURE_STORAGE_CONTAINER_NAME,
-        )
-        result_url = await storage.upload_report(task_id, report)
+    async def _save() -> None:
+        if store is None:
+            return
+        task_info = await registry.get_task(task_id, events=False)
+        if task_info:
+            checkpoint.last_seq = task_info.last_seq
+        try:
+            await asyncio.to_thread(store.save, checkpoint)
+        except Exception as e:
+            logger.warning(f"Failed to checkpoint task {task_id}: {e}")
+
+    try:
+        if checkpoint.findings is None:
+            checkpoint.findings = FindingsStore(
+                dedup_threshold=config.FINDINGS_DEDUP_THRESHOLD,
+                max_finding_tokens=config.FINDING_MAX_TOKENS,
+            )
+        findings = checkpoint.findings
+        await _save()
+
+        if not checkpoint.reached(STAGE_GATHERED):
+            with stage_span("gather"):
+                await _gather_findings(
+                    query, task_id, registry, source, config, llm, findings, checkpoint, _save
+                )
+            checkpoint.stage = STAGE_GATHERED
+            await _save()
+            await registry.update_task(task_id, timings=trace.summary())
+
+        if not checkpoint.reached(STAGE_REPORTED):
+            with stage_span("report"):
+                checkpoint.report = await _write_report(
+                    query, task_id, registry, config, llm, findings
+                )
+            checkpoint.stage = STAGE_REPORTED
+            await _save()
+        report = checkpoint.report
+
+        if not checkpoint.reached(STAGE_UPLOADED):
+            # Step 5: Save report
+            await registry.emit(
+                task_id,
+                ProgressEvent("progress", "Saving report...", 90),
+            )
+            with stage_span("upload"):
+                checkpoint.result_url = await get_storage(config).upload_report(
+                    task_id, report, query
+                )
+            checkpoint.stage = STAGE_UPLOADED
+            await _save()
+        result_url = checkpoint.result_url
 
-        task_info.status = "completed"
-        task_info.result_url = result_url
-        task_info.progress = 100
+        await registry.update_task(
+            task_id,
+            status="completed",
+            result_url=result_url,
+            progress=100,
+            timings=trace.summary(),
+        )
+        cache = get_report_cache(config)
+        if cache is not None:
+            cache.store(query, task_id, result_url, report, findings)
 
         await registry.emit(
             task_id,
@@ -275,19 +744,45 @@ async def run_research(
                 {"result_url": result_url, "report": report},
             ),
         )
+        if store is not None:
+            await asyncio.to_thread(store.delete, task_id)
 
     except asyncio.CancelledError:
-        task_info.status = "failed"
-        task_info.error = "Cancelled by user"
+        task_info = await registry.get_task(task_id, events=False)
+        # cancel_task marks the task failed before the cancellation lands; any
+        # other cancellation is a shutdown, which leaves the task resumable
+        by_user = task_info is not None and task_info.status in TERMINAL_STATUSES
+        if store is not None:
+            await asyncio.to_thread(
+                store.set_status, task_id, "cancelled" if by_user else "interrupted"
+            )
+        error = "Cancelled by user" if by_user else "Interrupted by shutdown"
+        task_info = await registry.update_task(
+            task_id, status="failed", error=error, timings=trace.summary()
+        )
         await registry.emit(
             task_id,
-            ProgressEvent("failed", "Research cancelled.", task_info.progress),
+            ProgressEvent(
+                "failed",
+                "Research cancelled." if by_user else "Research interrupted.",
+                task_info.progress if task_info else 0,
+            ),
         )
     except Exception as e:
         logger.error(f"Research failed for task {task_id}: {e}", exc_info=True)
-        task_info.status = "failed"
-        task_info.error = str(e)
+        if store is not None:
+            await asyncio.to_thread(store.set_status, task_id, "failed")
+        task_info = await registry.update_task(
+            task_id, status="failed", error=str(e), timings=trace.summary()
+        )
         await registry.emit(
             task_id,
-            ProgressEvent("failed", f"Research failed: {e}", task_info.progress),
+            ProgressEvent(
+                "failed",
+                f"Research failed: {e}",
+                task_info.progress if task_info else 0,
+            ),
         )
+    finally:
+        if recording is not None:
+            await _save_recording(recording, config)
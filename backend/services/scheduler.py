@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+
+from config import settings
+from services.executor import LoopLagMonitor
+from services.metrics import stage_span, start_trace
+from services.task_registry import ProgressEvent, TaskRegistry, registry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Waiter:
+    task_id: str
+    client_key: str
+    future: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+    announced_position: int = 0
+
+
+class ResearchScheduler:
+    """Admission control in front of run_research.
+
+    At most max_running research tasks run at once. Further submissions wait
+    in per-client FIFO queues. A free slot goes to the queued client with the
+    fewest running tasks (round-robin among ties), so one client's burst
+    cannot starve everyone else. Waiting tasks have status "queued" and
+    receive "queued" events whenever their position changes. With a loop
+    monitor attached, new tasks also wait while the event loop is overloaded.
+    """
+
+    def __init__(self, registry: TaskRegistry, max_running: int) -> None:
+        self.registry = registry
+        self.max_running = max_running
+        self._active = 0
+        self._running_by_client: Counter = Counter()
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._monitor: LoopLagMonitor | None = None
+
+    def hold_while_overloaded(self, monitor: LoopLagMonitor) -> None:
+        """Queue new tasks while monitor reports the loop overloaded."""
+        self._monitor = monitor
+        monitor.on_recover.append(self._dispatch)
+
+    def _held(self) -> bool:
+        # At least one task always runs, so an overload can't stall the queue
+        return self._monitor is not None and self._monitor.overloaded and self._active > 0
+
+    def submit(
+        self, task_id: str, client_key: str, coroutine, resume_seq: int | None = None
+    ) -> None:
+        self.registry.create_task(
+            task_id, self._run(task_id, client_key, coroutine), resume_seq=resume_seq
+        )
+
+    def position(self, task_id: str) -> int | None:
+        """1-based position in the dispatch order, or None if not queued."""
+        for i, waiter in enumerate(self._dispatch_order()):
+            if waiter.task_id == task_id:
+                return i + 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "max_running": self.max_running,
+            "running": self._active,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "queued_clients": len(self._queues),
+            "held": self._held(),
+        }
+
+    async def _run(self, task_id: str, client_key: str, coroutine) -> None:
+        start_trace()
+        try:
+            with stage_span("queued"):
+                if self._active >= self.max_running or self._queues or self._held():
+                    await self._wait_for_turn(task_id, client_key)
+                else:
+                    self._admit(client_key)
+            try:
+                async with self.registry.semaphore("tasks", self.max_running).slot():
+                    await coroutine
+            finally:
+                self._finish(client_key)
+                self._dispatch()
+                await self._announce_positions()
+        finally:
+            # No-op if it ran; silences "never awaited" if cancelled while queued
+            coroutine.close()
+
+    async def _wait_for_turn(self, task_id: str, client_key: str) -> None:
+        waiter = _Waiter(task_id, client_key)
+        self._queues.setdefault(client_key, deque()).append(waiter)
+        await self.registry.update_task(task_id, status="queued")
+        await self._announce_positions()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we were cancelled; give the slot back
+                self._finish(client_key)
+                self._dispatch()
+            else:
+                self._remove(waiter)
+            await self.registry.emit(
+                task_id, ProgressEvent("failed", "Research cancelled.", 0)
+            )
+            await self._announce_positions()
+            raise
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.client_key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.client_key]
+
+    def _admit(self, client_key: str) -> None:
+        self._active += 1
+        self._running_by_client[client_key] += 1
+
+    def _finish(self, client_key: str) -> None:
+        self._active -= 1
+        self._running_by_client[client_key] -= 1
+        if self._running_by_client[client_key] <= 0:
+            del self._running_by_client[client_key]
+
+    @staticmethod
+    def _pick(queues: OrderedDict[str, deque], running: Counter) -> str:
+        # min() keeps the first of equal keys, i.e. round-robin order among ties
+        return min(queues, key=lambda client_key: running[client_key])
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_running and self._queues and not self._held():
+            client_key = self._pick(self._queues, self._running_by_client)
+            queue = self._queues.pop(client_key)
+            waiter = queue.popleft()
+            # Rotate: this client goes to the back of the round-robin order
+            if queue:
+                self._queues[client_key] = queue
+            if waiter.future.done():
+                continue
+            self._admit(client_key)
+            waiter.future.set_result(None)
+
+    def _dispatch_order(self) -> list[_Waiter]:
+        """Simulate dispatch (assuming no task finishes) to get queue positions."""
+        queues = OrderedDict((k, deque(q)) for k, q in self._queues.items())
+        running = Counter(self._running_by_client)
+        order: list[_Waiter] = []
+        while queues:
+            client_key = self._pick(queues, running)
+            queue = queues.pop(client_key)
+            order.append(queue.popleft())
+            running[client_key] += 1
+            if queue:
+                queues[client_key] = queue
+        return order
+
+    async def _announce_positions(self) -> None:
+        for i, waiter in enumerate(self._dispatch_order()):
+            position = i + 1
+            if waiter.announced_position != position:
+                waiter.announced_position = position
+                await self.registry.emit(
+                    waiter.task_id,
+                    ProgressEvent(
+                        "queued",
+                        f"Waiting in queue (position {position})...",
+                        0,
+                        {"position": position},
+                    ),
+                )
+
+
+scheduler = ResearchScheduler(registry, settings.MAX_CONCURRENT_TASKS)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable
+
+from config import settings
+from services.task_models import TERMINAL_STATUSES
+from services.task_registry import TaskRegistry
+
+
+class MultiplexedStream:
+    """Events from a changeable set of tasks, merged into one bounded queue.
+
+    Tasks added without a last event id get a snapshot (sent in one batch
+    per add) and then live events after the snapshot. Tasks added with one
+    replay their logged events after it instead. When the client stalls the
+    queue fills and the pumps block, so each task's subscriber queue in the
+    registry overflows and falls back to replaying from the event log (the
+    same drop-and-resync policy as single-task streams).
+    """
+
+    def __init__(
+        self,
+        registry: TaskRegistry,
+        snapshot: Callable[[str], Awaitable[dict]],
+        max_tasks: int = 50,
+    ) -> None:
+        self.id = str(uuid.uuid4())
+        self.registry = registry
+        self.snapshot = snapshot
+        self.max_tasks = max_tasks
+        # (task_id, ProgressEvent) from the pumps
+        self._queue: asyncio.Queue[tuple[str, object]] = asyncio.Queue(
+            maxsize=registry.subscriber_queue_size
+        )
+        # Snapshot batches waiting to be sent; at most one per add()
+        self._snapshots: list[list[dict]] = []
+        self._wake = asyncio.Event()
+        self._closed = False
+        # Task id -> pump task, or None for tasks that have already finished
+        self._pumps: dict[str, asyncio.Task | None] = {}
+
+    @property
+    def task_ids(self) -> list[str]:
+        return list(self._pumps)
+
+    async def add(self, task_ids: dict[str, int | None]) -> list[str]:
+        """Subscribe to tasks (task id -> last event id or None). Returns those added."""
+        added: list[str] = []
+        snapshots: list[dict] = []
+        for task_id, last_event_id in task_ids.items():
+            if task_id in self._pumps:
+                continue
+            if len(self._pumps) >= self.max_tasks:
+                raise ValueError(f"At most {self.max_tasks} tasks per stream")
+            # Claimed before the lookups below, so a concurrent add can't take it too
+            self._pumps[task_id] = None
+            finished = False
+            if (
+                last_event_id is None
+                or await self.registry.get_task(task_id, events=False) is None
+            ):
+                # Evicted tasks have no event log to replay; a snapshot covers them
+                snapshot = await self.snapshot(task_id)
+                snapshots.append(snapshot)
+                last_event_id = snapshot["last_event_id"]
+                finished = snapshot["status"] in (*TERMINAL_STATUSES, "not_found")
+            if task_id not in self._pumps or self._closed:
+                # Removed (or the stream closed) while we looked it up
+                continue
+            added.append(task_id)
+            if not finished:
+                self._pumps[task_id] = asyncio.create_task(self._pump(task_id, last_event_id))
+        if snapshots:
+            self._snapshots.append(snapshots)
+            self._wake.set()
+        return added
+
+    def remove(self, task_ids: list[str]) -> None:
+        for task_id in task_ids:
+            pump = self._pumps.pop(task_id, None)
+            if pump is not None:
+                pump.cancel()
+
+    def close(self) -> None:
+        self.remove(list(self._pumps))
+        self._closed = True
+        self._wake.set()
+
+    async def events(
+        self, keepalive: float = 15.0
+    ) -> AsyncIterator[tuple[str, str | None, object] | None]:
+        """Yield snapshot batches and task events until closed; None marks a keepalive."""
+        while not self._closed:
+            if self._snapshots:
+                yield ("snapshot", None, self._snapshots.pop(0))
+            elif not self._queue.empty():
+                task_id, event = self._queue.get_nowait()
+                # Drop events from tasks removed after they were queued
+                if task_id in self._pumps:
+                    yield ("event", task_id, event)
+            else:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+
+    async def _pump(self, task_id: str, last_event_id: int) -> None:
+        async for event in self.registry.subscribe(task_id, last_event_id):
+            # Blocks while the queue is full, leaving the registry to resync us
+            await self._queue.put((task_id, event))
+            self._wake.set()
+        if self._pumps.get(task_id) is asyncio.current_task():
+            self._pumps[task_id] = None
+
+
+class StreamHub:
+    """Open multiplexed streams by id, so their task sets can be changed."""
+
+    def __init__(self, max_streams: int = 1000) -> None:
+        self.max_streams = max_streams
+        self._streams: OrderedDict[str, MultiplexedStream] = OrderedDict()
+
+    @property
+    def full(self) -> bool:
+        return len(self._streams) >= self.max_streams
+
+    def open(self, stream: MultiplexedStream) -> None:
+        if self.full:
+            raise ValueError("Too many open streams")
+        self._streams[stream.id] = stream
+
+    def get(self, stream_id: str) -> MultiplexedStream | None:
+        return self._streams.get(stream_id)
+
+    def discard(self, stream: MultiplexedStream) -> None:
+        self._streams.pop(stream.id, None)
+        stream.close()
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+streams = StreamHub(settings.MAX_MULTIPLEXED_STREAMS)
@@ -0,0 +1,686 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from services.task_models import (
+    TERMINAL_STATUSES,
+    ProgressEvent,
+    TaskInfo,
+    TaskRecord,
+    approx_size,
+)
+
+_EXITED_ERROR = "Task exited unexpectedly"
+
+
+class TaskBackend(ABC):
+    """Storage for task state, event logs, cancel signals and concurrency limits.
+
+    Methods are synchronous. Async code calls them through run(), which
+    backends doing I/O move off the event loop.
+    """
+
+    # True when state is visible to other worker processes
+    shared: bool = False
+
+    def __init__(self, event_log_size: int = 512) -> None:
+        self.event_log_size = event_log_size
+
+    @abstractmethod
+    def create(self, info: TaskInfo) -> None: ...
+
+    @abstractmethod
+    def reopen(self, task_id: str, last_seq: int = 0) -> TaskInfo | None:
+        """Reset a known (possibly finished or compacted) task to pending.
+
+        The event sequence continues from at least last_seq. Returns None if
+        the task is unknown.
+        """
+
+    async def run(self, fn, *args):
+        """Call fn (one of this backend's methods) from async code."""
+        return fn(*args)
+
+    @abstractmethod
+    def get(self, task_id: str, events: bool = True) -> TaskInfo | None:
+        """Task state; with events=False the messages and event log may be left empty."""
+
+    @abstractmethod
+    def get_record(self, task_id: str) -> TaskRecord | None: ...
+
+    @abstractmethod
+    def update(self, task_id: str, **fields) -> TaskInfo | None:
+        """Set fields; returns the task's state, possibly without its event log."""
+
+    @abstractmethod
+    def finish(self, task_id: str) -> str | None:
+        """Stamp finished_at, failing a task that never reached a terminal status.
+
+        Returns the final status, or None if the task is unknown.
+        """
+
+    @abstractmethod
+    def append_event(self, task_id: str, event: ProgressEvent) -> None:
+        """Assign the next sequence number to event and append it to the log."""
+
+    @abstractmethod
+    def events_after(self, task_id: str, after_seq: int) -> list[ProgressEvent]: ...
+
+    @abstractmethod
+    def request_cancel(self, task_id: str) -> None: ...
+
+    @abstractmethod
+    def cancel_requested(self, task_ids: Iterable[str]) -> set[str]: ...
+
+    @abstractmethod
+    def sweep(
+        self,
+        retention_seconds: float,
+        max_retained: int,
+        record_ttl_seconds: float,
+        max_records: int,
+        keep: set[str],
+    ) -> int:
+        """Compact expired terminal tasks into records; returns the number compacted."""
+
+    @abstractmethod
+    def semaphore(self, name: str, limit: int):
+        """Return a limiter bounding concurrency for name.
+
+        Shared backends return one with acquire() -> lease and release(lease),
+        used as the inner limit of the registry's PrioritySemaphore.
+        """
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryTaskBackend(TaskBackend):
+    """Process-local backend. The default; only valid for a single worker."""
+
+    def __init__(self, event_log_size: int = 512) -> None:
+        super().__init__(event_log_size)
+        self.tasks: dict[str, TaskInfo] = {}
+        self.records: OrderedDict[str, TaskRecord] = OrderedDict()
+        self._cancel_requests: set[str] = set()
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def create(self, info: TaskInfo) -> None:
+        info.messages = deque(info.messages, maxlen=self.event_log_size)
+        info.events = deque(info.events, maxlen=self.event_log_size)
+        self.tasks[info.id] = info
+
+    def reopen(self, task_id: str, last_seq: int = 0) -> TaskInfo | None:
+        info = self.tasks.get(task_id)
+        if info is None:
+            record = self.records.pop(task_id, None)
+            if record is None:
+                return None
+            info = TaskInfo(id=task_id, created_at=record.created_at)
+            self.create(info)
+        info.status = "pending"
+        info.error = None
+        info.result_url = None
+        info.finished_at = None
+        info.last_seq = max(info.last_seq, last_seq)
+        self._cancel_requests.discard(task_id)
+        return info
+
+    def get(self, task_id: str, events: bool = True) -> TaskInfo | None:
+        return self.tasks.get(task_id)
+
+    def get_record(self, task_id: str) -> TaskRecord | None:
+        return self.records.get(task_id)
+
+    def update(self, task_id: str, **fields) -> TaskInfo | None:
+        info = self.tasks.get(task_id)
+        if info:
+            for name, value in fields.items():
+                setattr(info, name, value)
+        return info
+
+    def finish(self, task_id: str) -> str | None:
+        info = self.tasks.get(task_id)
+        if info is None:
+            return None
+        info.finished_at = datetime.now(timezone.utc)
+        if info.status not in TERMINAL_STATUSES:
+            info.status = "failed"
+            info.error = info.error or _EXITED_ERROR
+        return info.status
+
+    def append_event(self, task_id: str, event: ProgressEvent) -> None:
+        info = self.tasks.get(task_id)
+        if not info:
+            return
+        info.last_seq += 1
+        event.seq = info.last_seq
+        info.events.append(event)
+        info.progress = event.progress
+        # Report deltas are transient; the full report arrives with "completed"
+        if event.event_type != "report_delta":
+            info.messages.append({"role": "assistant", "content": event.message})
+
+    def events_after(self, task_id: str, after_seq: int) -> list[ProgressEvent]:
+        info = self.tasks.get(task_id)
+        if not info:
+            return []
+        return [e for e in info.events if e.seq > after_seq]
+
+    def request_cancel(self, task_id: str) -> None:
+        self._cancel_requests.add(task_id)
+
+    def cancel_requested(self, task_ids: Iterable[str]) -> set[str]:
+        return self._cancel_requests.intersection(task_ids)
+
+    def sweep(
+        self,
+        retention_seconds: float,
+        max_retained: int,
+        record_ttl_seconds: float,
+        max_records: int,
+        keep: set[str],
+    ) -> int:
+        now = datetime.now(timezone.utc)
+        retention = timedelta(seconds=retention_seconds)
+        finished = sorted(
+            (
+                info
+                for info in self.tasks.values()
+                if info.finished_at is not None and info.id not in keep
+            ),
+            key=lambda info: info.finished_at,
+        )
+        overflow = len(finished) - max_retained
+        compacted = 0
+        for i, info in enumerate(finished):
+            if i < overflow or now - info.finished_at > retention:
+                self.records[info.id] = TaskRecord(
+                    id=info.id,
+                    status=info.status,
+                    result_url=info.result_url,
+                    error=info.error,
+                    created_at=info.created_at,
+                    finished_at=info.finished_at,
+                )
+                del self.tasks[info.id]
+                self._cancel_requests.discard(info.id)
+                compacted += 1
+
+        record_ttl = timedelta(seconds=record_ttl_seconds)
+        while self.records:
+            oldest = next(iter(self.records.values()))
+            if len(self.records) <= max_records and now - oldest.finished_at <= record_ttl:
+                break
+            self.records.popitem(last=False)
+        return compacted
+
+    def semaphore(self, name: str, limit: int) -> asyncio.Semaphore:
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(limit)
+        return self._semaphores[name]
+
+    def stats(self) -> dict:
+        live = [i for i in self.tasks.values() if i.finished_at is None]
+        retained = [i for i in self.tasks.values() if i.finished_at is not None]
+        return {
+            "backend": "memory",
+            "live_tasks": len(live),
+            "retained_tasks": len(retained),
+            "terminal_records": len(self.records),
+            "approx_memory_bytes": {
+                "live_tasks": sum(approx_size(i) for i in live),
+                "retained_tasks": sum(approx_size(i) for i in retained),
+                "terminal_records": sum(approx_size(r) for r in self.records.values()),
+            },
+        }
+
+
+_TASK_COLUMNS = (
+    "status, progress, result_url, error, created_at, finished_at, last_seq, timings"
+)
+_TERMINAL = ", ".join(f"'{status}'" for status in TERMINAL_STATUSES)
+
+
+class _SQLiteSemaphore:
+    """Cross-process semaphore implemented as expiring leases in SQLite.
+
+    A local asyncio.Semaphore keeps surplus waiters in this process from
+    polling the database; held leases are renewed by a heartbeat so a
+    crashed worker's slots expire after lease_seconds.
+    """
+
+    def __init__(
+        self,
+        backend: SQLiteTaskBackend,
+        name: str,
+        limit: int,
+        lease_seconds: float,
+        poll_interval: float,
+    ) -> None:
+        self._backend = backend
+        self.name = name
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._local = asyncio.Semaphore(limit)
+        self._heartbeats: dict[str, asyncio.Task] = {}
+
+    async def acquire(self) -> str:
+        """Wait for a lease; returns its id, to pass back to release()."""
+        await self._local.acquire()
+        lease_id = uuid.uuid4().hex
+        delay = self.poll_interval
+        try:
+            while not await self._backend.run(
+                self._backend._try_lease, self.name, self.limit, lease_id, self.lease_seconds
+            ):
+                await asyncio.sleep(delay * (0.5 + random.random()))
+                delay = min(delay * 2, 1.0)
+        except BaseException:
+            self._local.release()
+            raise
+        self._heartbeats[lease_id] = asyncio.create_task(self._heartbeat(lease_id))
+        return lease_id
+
+    async def release(self, lease_id: str) -> None:
+        self._heartbeats.pop(lease_id).cancel()
+        try:
+            await self._backend.run(self._backend._release_lease, lease_id)
+        finally:
+            self._local.release()
+
+    async def _heartbeat(self, lease_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self._backend.run(self._backend._renew_lease, lease_id, self.lease_seconds)
+
+
+class SQLiteTaskBackend(TaskBackend):
+    """Backend sharing task state between worker processes through a SQLite file."""
+
+    shared = True
+
+    def __init__(
+        self,
+        path: str,
+        event_log_size: int = 512,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        super().__init__(event_log_size)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self._semaphores: dict[str, _SQLiteSemaphore] = {}
+        # A single thread runs calls in submission order, so events get their
+        # sequence numbers in emit order, and waiting out another worker's
+        # lock (up to the busy timeout) never blocks the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-backend")
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    result_url TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    finished_at TEXT,
+                    last_seq INTEGER NOT NULL DEFAULT 0,
+                    compacted INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS events (
+                    task_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event_type TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    progress INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (task_id, seq)
+                );
+                CREATE TABLE IF NOT EXISTS leases (
+                    lease_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS leases_name ON leases (name);
+                CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (compacted, finished_at);
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+            if "timings" not in columns:
+                self._conn.execute("ALTER TABLE tasks ADD COLUMN timings TEXT")
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _dt(value: datetime | None) -> str | None:
+        return value.isoformat() if value else None
+
+    @staticmethod
+    def _parse_dt(value: str | None) -> datetime | None:
+        return datetime.fromisoformat(value) if value else None
+
+    @staticmethod
+    def _event(row: tuple) -> ProgressEvent:
+        seq, event_type, message, progress, data = row
+        return ProgressEvent(event_type, message, progress, json.loads(data), seq)
+
+    def create(self, info: TaskInfo) -> None:
+        self._execute(
+            "INSERT INTO tasks (id, status, progress, result_url, error, created_at, last_seq) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                info.id,
+                info.status,
+                info.progress,
+                info.result_url,
+                info.error,
+                self._dt(info.created_at),
+                info.last_seq,
+            ),
+        )
+
+    def reopen(self, task_id: str, last_seq: int = 0) -> TaskInfo | None:
+        rows = self._execute(
+            "UPDATE tasks SET status = 'pending', error = NULL, result_url = NULL, "
+            "finished_at = NULL, compacted = 0, cancel_requested = 0, "
+            "last_seq = MAX(last_seq, ?) WHERE id = ? RETURNING id",
+            (last_seq, task_id),
+        )
+        return self.get(task_id, events=False) if rows else None
+
+    def get(self, task_id: str, events: bool = True) -> TaskInfo | None:
+        rows = self._execute(
+            f"SELECT {_TASK_COLUMNS} FROM tasks WHERE id = ? AND compacted = 0", (task_id,)
+        )
+        if not rows:
+            return None
+        return self._info(task_id, rows[0], events)
+
+    def _info(self, task_id: str, row: tuple, with_events: bool) -> TaskInfo:
+        (
+            status,
+            progress,
+            result_url,
+            error,
+            created_at,
+            finished_at,
+            last_seq,
+            timings,
+        ) = row
+        events = []
+        if with_events:
+            events = self.events_after(task_id, last_seq - self.event_log_size)
+        return TaskInfo(
+            id=task_id,
+            status=status,
+            progress=progress,
+            messages=deque(
+                (
+                    {"role": "assistant", "content": e.message}
+                    for e in events
+                    if e.event_type != "report_delta"
+                ),
+                maxlen=self.event_log_size,
+            ),
+            result_url=result_url,
+            created_at=self._parse_dt(created_at),
+            error=error,
+            events=deque(events, maxlen=self.event_log_size),
+            last_seq=last_seq,
+            finished_at=self._parse_dt(finished_at),
+            timings=json.loads(timings) if timings else None,
+        )
+
+    def get_record(self, task_id: str) -> TaskRecord | None:
+        rows = self._execute(
+            "SELECT status, result_url, error, created_at, finished_at "
+            "FROM tasks WHERE id = ? AND compacted = 1",
+            (task_id,),
+        )
+        if not rows:
+            return None
+        status, result_url, error, created_at, finished_at = rows[0]
+        return TaskRecord(
+            id=task_id,
+            status=status,
+            result_url=result_url,
+            error=error,
+            created_at=self._parse_dt(created_at),
+            finished_at=self._parse_dt(finished_at),
+        )
+
+    def update(self, task_id: str, **fields) -> TaskInfo | None:
+        columns = {"status", "progress", "result_url", "error", "finished_at", "timings"}
+        unknown = set(fields) - columns
+        if unknown:
+            raise ValueError(f"Cannot update task fields: {sorted(unknown)}")
+        if fields:
+            values = [
+                self._dt(v)
+                if isinstance(v, datetime)
+                else json.dumps(v)
+                if isinstance(v, dict)
+                else v
+                for v in fields.values()
+            ]
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            rows = self._execute(
+                f"UPDATE tasks SET {assignments} WHERE id = ? AND compacted = 0 "
+                f"RETURNING {_TASK_COLUMNS}",
+                (*values, task_id),
+            )
+            return self._info(task_id, rows[0], False) if rows else None
+        return self.get(task_id, events=False)
+
+    def finish(self, task_id: str) -> str | None:
+        # One statement: SET expressions all see the row as it was before
+        rows = self._execute(
+            "UPDATE tasks SET finished_at = ?, "
+            f"error = CASE WHEN status IN ({_TERMINAL}) THEN error "
+            "ELSE COALESCE(error, ?) END, "
+            f"status = CASE WHEN status IN ({_TERMINAL}) THEN status ELSE 'failed' END "
+            "WHERE id = ? AND compacted = 0 RETURNING status",
+            (self._dt(datetime.now(timezone.utc)), _EXITED_ERROR, task_id),
+        )
+        return rows[0][0] if rows else None
+
+    def append_event(self, task_id: str, event: ProgressEvent) -> None:
+        def _append(conn: sqlite3.Connection) -> None:
+            row = conn.execute(
+                "UPDATE tasks SET last_seq = last_seq + 1, progress = ? "
+                "WHERE id = ? RETURNING last_seq",
+                (event.progress, task_id),
+            ).fetchone()
+            if row is None:
+                return
+            event.seq = row[0]
+            conn.execute(
+                "INSERT INTO events (task_id, seq, event_type, message, progress, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    task_id,
+                    event.seq,
+                    event.event_type,
+                    event.message,
+                    event.progress,
+                    json.dumps(event.data),
+                ),
+            )
+            conn.execute(
+                "DELETE FROM events WHERE task_id = ? AND seq <= ?",
+                (task_id, event.seq - self.event_log_size),
+            )
+
+        self._transaction(_append)
+
+    def events_after(self, task_id: str, after_seq: int) -> list[ProgressEvent]:
+        rows = self._execute(
+            "SELECT seq, event_type, message, progress, data FROM events "
+            "WHERE task_id = ? AND seq > ? ORDER BY seq",
+            (task_id, after_seq),
+        )
+        return [self._event(row) for row in rows]
+
+    def request_cancel(self, task_id: str) -> None:
+        self._execute("UPDATE tasks SET cancel_requested = 1 WHERE id = ?", (task_id,))
+
+    def cancel_requested(self, task_ids: Iterable[str]) -> set[str]:
+        ids = list(task_ids)
+        if not ids:
+            return set()
+        placeholders = ", ".join("?" for _ in ids)
+        rows = self._execute(
+            f"SELECT id FROM tasks WHERE cancel_requested = 1 AND id IN ({placeholders})",
+            tuple(ids),
+        )
+        return {row[0] for row in rows}
+
+    def sweep(
+        self,
+        retention_seconds: float,
+        max_retained: int,
+        record_ttl_seconds: float,
+        max_records: int,
+        keep: set[str],
+    ) -> int:
+        now = datetime.now(timezone.utc)
+        retention_cutoff = self._dt(now - timedelta(seconds=retention_seconds))
+        record_cutoff = self._dt(now - timedelta(seconds=record_ttl_seconds))
+
+        def _sweep(conn: sqlite3.Connection) -> int:
+            rows = conn.execute(
+                "SELECT id, finished_at FROM tasks "
+                "WHERE compacted = 0 AND finished_at IS NOT NULL ORDER BY finished_at"
+            ).fetchall()
+            finished = [r for r in rows if r[0] not in keep]
+            overflow = len(finished) - max_retained
+            to_compact = [
+                task_id
+                for i, (task_id, finished_at) in enumerate(finished)
+                if i < overflow or finished_at < retention_cutoff
+            ]
+            for task_id in to_compact:
+                conn.execute("UPDATE tasks SET compacted = 1 WHERE id = ?", (task_id,))
+                conn.execute("DELETE FROM events WHERE task_id = ?", (task_id,))
+
+            conn.execute(
+                "DELETE FROM tasks WHERE compacted = 1 AND finished_at < ?",
+                (record_cutoff,),
+            )
+            conn.execute(
+                "DELETE FROM tasks WHERE id IN ("
+                "SELECT id FROM tasks WHERE compacted = 1 "
+                "ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+                (max_records,),
+            )
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (time.time(),))
+            return len(to_compact)
+
+        return self._transaction(_sweep)
+
+    def semaphore(self, name: str, limit: int) -> _SQLiteSemaphore:
+        if name not in self._semaphores:
+            self._semaphores[name] = _SQLiteSemaphore(
+                self, name, limit, self.lease_seconds, self.poll_interval
+            )
+        return self._semaphores[name]
+
+    def _try_lease(self, name: str, limit: int, lease_id: str, lease_seconds: float) -> bool:
+        def _acquire(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            conn.execute("DELETE FROM leases WHERE name = ? AND expires_at < ?", (name, now))
+            (held,) = conn.execute(
+                "SELECT COUNT(*) FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if held >= limit:
+                return False
+            conn.execute(
+                "INSERT INTO leases (lease_id, name, expires_at) VALUES (?, ?, ?)",
+                (lease_id, name, now + lease_seconds),
+            )
+            return True
+
+        return self._transaction(_acquire)
+
+    def _renew_lease(self, lease_id: str, lease_seconds: float) -> None:
+        self._execute(
+            "UPDATE leases SET expires_at = ? WHERE lease_id = ?",
+            (time.time() + lease_seconds, lease_id),
+        )
+
+    def _release_lease(self, lease_id: str) -> None:
+        self._execute("DELETE FROM leases WHERE lease_id = ?", (lease_id,))
+
+    def stats(self) -> dict:
+        (live, retained, records) = self._execute(
+            "SELECT "
+            "SUM(compacted = 0 AND finished_at IS NULL), "
+            "SUM(compacted = 0 AND finished_at IS NOT NULL), "
+            "SUM(compacted = 1) FROM tasks"
+        )[0]
+        (event_bytes,) = self._execute(
+            "SELECT COALESCE(SUM(LENGTH(message) + LENGTH(data)), 0) FROM events"
+        )[0]
+        return {
+            "backend": "sqlite",
+            "live_tasks": live or 0,
+            "retained_tasks": retained or 0,
+            "terminal_records": records or 0,
+            "approx_event_log_bytes": event_bytes,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        with self._lock:
+            self._conn.close()
+
+
+def create_backend(kind: str, path: str, event_log_size: int) -> TaskBackend:
+    if kind == "memory":
+        return InMemoryTaskBackend(event_log_size)
+    if kind == "sqlite":
+        return SQLiteTaskBackend(path, event_log_size)
+    raise ValueError(f"Unknown task backend: {kind}")
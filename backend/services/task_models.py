@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+TERMINAL_EVENTS = ("completed", "failed")
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+@dataclass
+class ProgressEvent:
+    event_type: str
+    message: str
+    progress: int
+    data: dict = field(default_factory=dict)
+    seq: int = 0
+
+
+@dataclass
+class TaskInfo:
+    id: str
+    status: str = "pending"
+    progress: int = 0
+    messages: deque[dict] = field(default_factory=deque)
+    result_url: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    error: str | None = None
+    events: deque[ProgressEvent] = field(default_factory=deque)
+    last_seq: int = 0
+    finished_at: datetime | None = None
+    # Per-stage span timings (metrics.TaskTrace.summary())
+    timings: dict | None = None
+
+
+@dataclass
+class TaskRecord:
+    """Compact terminal-state record kept after a task's full state is evicted."""
+
+    id: str
+    status: str
+    result_url: str | None
+    error: str | None
+    created_at: datetime
+    finished_at: datetime
+
+
+def approx_size(obj, _depth: int = 0) -> int:
+    """Rough recursive memory estimate for plain containers and dataclasses."""
+    size = sys.getsizeof(obj)
+    if _depth > 6:
+        return size
+    if isinstance(obj, dict):
+        size += sum(
+            approx_size(k, _depth + 1) + approx_size(v, _depth + 1)
+            for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, deque, set)):
+        size += sum(approx_size(v, _depth + 1) for v in obj)
+    elif hasattr(obj, "__dataclass_fields__"):
+        size += sum(
+            approx_size(getattr(obj, name), _depth + 1)
+            for name in obj.__dataclass_fields__
+        )
+    return size
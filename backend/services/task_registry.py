@@ -1,84 +1,317 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import dataclass, field
-from datetime import datetime, timezone
+import functools
+import logging
 from typing import AsyncGenerator
 
+from config import settings
+from services.concurrency import PrioritySemaphore
+from services.metrics import TASKS
+from services.task_backends import TaskBackend, InMemoryTaskBackend, create_backend
+from services.task_models import (
+    TERMINAL_EVENTS,
+    TERMINAL_STATUSES,
+    ProgressEvent,
+    TaskInfo,
+    TaskRecord,
+)
 
-@dataclass
-class ProgressEvent:
-    event_type: str
-    message: str
-    progress: int
-    data: dict = field(default_factory=dict)
+__all__ = ["ProgressEvent", "TaskInfo", "TaskRecord", "TaskRegistry", "registry"]
 
+logger = logging.getLogger(__name__)
 
-@dataclass
-class TaskInfo:
-    id: str
-    status: str = "pending"
-    progress: int = 0
-    messages: list[dict] = field(default_factory=list)
-    result_url: str | None = None
-    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    error: str | None = None
+# Queue marker telling a subscriber it fell behind and must replay from the log
+_RESYNC = object()
 
 
 class TaskRegistry:
-    def __init__(self) -> None:
-        self.tasks: dict[str, TaskInfo] = {}
+    """Runs research coroutines and fans their events out to subscribers.
+
+    Task state, the event log, cancel signals and concurrency limits live in
+    a TaskBackend so they can be shared across worker processes. The
+    asyncio.Tasks and subscriber queues are always local to this process;
+    subscribers fall back to polling the backend for tasks running elsewhere.
+    Backend calls from async code go through backend.run(), which keeps the
+    SQLite backend's I/O off the event loop.
+    """
+
+    def __init__(
+        self,
+        backend: TaskBackend | None = None,
+        subscriber_queue_size: int = 256,
+        retention_seconds: float = 900,
+        max_retained: int = 200,
+        record_ttl_seconds: float = 604800,
+        max_records: int = 10000,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.backend = backend or InMemoryTaskBackend()
+        self.subscriber_queue_size = subscriber_queue_size
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self.record_ttl_seconds = record_ttl_seconds
+        self.max_records = max_records
+        self.poll_interval = poll_interval
         self._queues: dict[str, list[asyncio.Queue]] = {}
         self._async_tasks: dict[str, asyncio.Task] = {}
+        self._background: list[asyncio.Task] = []
+        self._finishing: set[asyncio.Task] = set()
+        self._semaphores: dict[str, PrioritySemaphore] = {}
 
-    def create_task(self, task_id: str, coroutine) -> TaskInfo:
-        info = TaskInfo(id=task_id)
-        self.tasks[task_id] = info
-        self._queues[task_id] = []
+    def create_task(
+        self, task_id: str, coroutine, resume_seq: int | None = None
+    ) -> TaskInfo:
+        """Start coroutine as task_id.
+
+        With resume_seq, an existing task with this id is reopened (or a new
+        one created) and its event numbering continues after resume_seq, so
+        clients reconnecting with an old Last-Event-ID still see new events.
+        """
+        info = None
+        if resume_seq is not None:
+            info = self.backend.reopen(task_id, resume_seq)
+        if info is None:
+            info = TaskInfo(id=task_id, last_seq=resume_seq or 0)
+            self.backend.create(info)
+        self._queues.setdefault(task_id, [])
         async_task = asyncio.create_task(coroutine)
         self._async_tasks[task_id] = async_task
+        async_task.add_done_callback(lambda _: self._on_task_done(task_id))
         return info
 
-    def get_task(self, task_id: str) -> TaskInfo | None:
-        return self.tasks.get(task_id)
+    def _on_task_done(self, task_id: str) -> None:
+        # Drop the asyncio.Task (and the report held by its frames) right away
+        self._async_tasks.pop(task_id, None)
+        finishing = asyncio.create_task(self._finish(task_id))
+        self._finishing.add(finishing)
+        finishing.add_done_callback(self._finishing.discard)
 
-    def cancel_task(self, task_id: str) -> bool:
+    async def _finish(self, task_id: str) -> None:
+        try:
+            status = await self.backend.run(self.backend.finish, task_id)
+            if status:
+                TASKS.inc(status=status)
+        except Exception as e:
+            logger.error(f"Failed to finish task {task_id}: {e}", exc_info=True)
+        # Wake subscribers so they finish from the event log instead of waiting
+        for q in self._queues.get(task_id, []):
+            try:
+                q.put_nowait(_RESYNC)
+            except asyncio.QueueFull:
+                pass
+        if not self._queues.get(task_id):
+            self._queues.pop(task_id, None)
+
+    def is_running(self, task_id: str) -> bool:
+        """True if task_id has a live asyncio.Task in this process."""
+        async_task = self._async_tasks.get(task_id)
+        return async_task is not None and not async_task.done()
+
+    async def get_task(self, task_id: str, events: bool = True) -> TaskInfo | None:
+        """Task state; events=False skips loading its messages and event log."""
+        return await self.backend.run(self.backend.get, task_id, events)
+
+    async def get_record(self, task_id: str) -> TaskRecord | None:
+        return await self.backend.run(self.backend.get_record, task_id)
+
+    async def update_task(self, task_id: str, **fields) -> TaskInfo | None:
+        return await self.backend.run(functools.partial(self.backend.update, task_id, **fields))
+
+    def semaphore(self, name: str, limit: int) -> PrioritySemaphore:
+        """Priority-ordered concurrency limit shared by every task.
+
+        With a shared backend the backend's cross-process limit is enforced too.
+        """
+        if name not in self._semaphores:
+            inner = self.backend.semaphore(name, limit) if self.backend.shared else None
+            self._semaphores[name] = PrioritySemaphore(limit, inner, name=name)
+        return self._semaphores[name]
+
+    async def cancel_task(self, task_id: str) -> bool:
         async_task = self._async_tasks.get(task_id)
         if async_task and not async_task.done():
             async_task.cancel()
-            task_info = self.tasks.get(task_id)
-            if task_info:
-                task_info.status = "failed"
-                task_info.error = "Cancelled by user"
-            return True
-        return False
+        elif self.backend.shared:
+            # Running in another worker; it picks the request up from the backend
+            task_info = await self.get_task(task_id, events=False)
+            if not task_info or task_info.status in TERMINAL_STATUSES:
+                return False
+            await self.backend.run(self.backend.request_cancel, task_id)
+        else:
+            return False
+        await self.update_task(task_id, status="failed", error="Cancelled by user")
+        return True
 
     async def emit(self, task_id: str, event: ProgressEvent) -> None:
-        task_info = self.tasks.get(task_id)
-        if task_info:
-            task_info.progress = event.progress
-            task_info.messages.append(
-                {"role": "assistant", "content": event.message}
-            )
+        await self.backend.run(self.backend.append_event, task_id, event)
+        # Never block on a slow subscriber: on overflow, drop its backlog and
+        # let it catch up from the event log instead.
         queues = self._queues.get(task_id, [])
         for q in queues:
-            await q.put(event)
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(_RESYNC)
 
-    async def subscribe(self, task_id: str) -> AsyncGenerator[ProgressEvent, None]:
-        q: asyncio.Queue[ProgressEvent | None] = asyncio.Queue()
+    async def _replay(self, task_id: str, after_seq: int) -> list[ProgressEvent]:
+        """Logged events after after_seq, led by a "resync" event if some were evicted."""
+        events = await self.backend.run(self.backend.events_after, task_id, after_seq)
+        if events and events[0].seq > after_seq + 1:
+            # The ring no longer holds everything the subscriber missed; tell it
+            # so, with the current state, before the events that are left
+            info = await self.get_task(task_id, events=False)
+            missed = events[0].seq - after_seq - 1
+            state = {"missed": missed}
+            if info is not None:
+                state.update(
+                    status=info.status,
+                    progress=info.progress,
+                    result_url=info.result_url,
+                    error=info.error,
+                )
+            events.insert(
+                0,
+                ProgressEvent(
+                    "resync",
+                    f"{missed} earlier updates are no longer available",
+                    info.progress if info else events[0].progress,
+                    state,
+                    seq=events[0].seq - 1,
+                ),
+            )
+        return events
+
+    async def subscribe(
+        self, task_id: str, last_event_id: int | None = None
+    ) -> AsyncGenerator[ProgressEvent, None]:
+        """Yield events for a task, replaying logged events after last_event_id first."""
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
         self._queues.setdefault(task_id, []).append(q)
+        last_seq = last_event_id or 0
         try:
+            backlog = await self._replay(task_id, last_seq)
             while True:
-                event = await q.get()
+                if backlog:
+                    event = backlog.pop(0)
+                elif task_id in self._async_tasks:
+                    event = await q.get()
+                    if event is _RESYNC:
+                        backlog = await self._replay(task_id, last_seq)
+                        continue
+                else:
+                    # No live task here: whatever is still to come is in the event log
+                    backlog = await self._replay(task_id, last_seq)
+                    if backlog:
+                        continue
+                    task_info = await self.get_task(task_id, events=False)
+                    # finished_at is set once the task has emitted its last event
+                    if (
+                        not self.backend.shared
+                        or task_info is None
+                        or task_info.finished_at is not None
+                    ):
+                        break
+                    # Task runs in another worker: poll the shared event log
+                    await asyncio.sleep(self.poll_interval)
+                    continue
                 if event is None:
                     break
+                if event.seq and event.seq <= last_seq:
+                    continue
+                last_seq = event.seq
                 yield event
-                if event.event_type in ("completed", "failed"):
+                if event.event_type in TERMINAL_EVENTS:
                     break
         finally:
             queues = self._queues.get(task_id, [])
             if q in queues:
                 queues.remove(q)
+            if not queues and task_id not in self._async_tasks:
+                self._queues.pop(task_id, None)
+
+    async def sweep(self) -> int:
+        """Compact expired terminal tasks into TaskRecords and expire old records.
+
+        Returns the number of tasks compacted.
+        """
+        keep = {task_id for task_id, queues in self._queues.items() if queues}
+        return await self.backend.run(
+            self.backend.sweep,
+            self.retention_seconds,
+            self.max_retained,
+            self.record_ttl_seconds,
+            self.max_records,
+            keep,
+        )
+
+    async def _apply_cancel_requests(self) -> None:
+        requested = await self.backend.run(self.backend.cancel_requested, list(self._async_tasks))
+        for task_id in requested:
+            async_task = self._async_tasks.get(task_id)
+            if async_task and not async_task.done():
+                async_task.cancel()
+
+    async def _sweep_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                compacted = await self.sweep()
+                if compacted:
+                    logger.info(f"Compacted {compacted} finished tasks")
+            except Exception as e:
+                logger.error(f"Task sweep failed: {e}", exc_info=True)
+
+    async def _cancel_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._apply_cancel_requests()
+            except Exception as e:
+                logger.error(f"Cancel polling failed: {e}", exc_info=True)
+
+    def start_sweeper(self, interval: float) -> None:
+        if any(not t.done() for t in self._background):
+            return
+        self._background = [asyncio.create_task(self._sweep_loop(interval))]
+        if self.backend.shared:
+            self._background.append(asyncio.create_task(self._cancel_loop()))
+
+    async def stop_sweeper(self) -> None:
+        for background in self._background:
+            background.cancel()
+            try:
+                await background
+            except asyncio.CancelledError:
+                pass
+        self._background = []
+
+    async def shutdown(self) -> None:
+        """Cancel this process's tasks and wait for their cleanup to finish."""
+        pending = [t for t in self._async_tasks.values() if not t.done()]
+        for async_task in pending:
+            async_task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await asyncio.gather(*self._finishing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            **self.backend.stats(),
+            "local_tasks": len(self._async_tasks),
+            "subscribers": sum(len(q) for q in self._queues.values()),
+        }
 
 
-registry = TaskRegistry()
+registry = TaskRegistry(
+    backend=create_backend(
+        settings.TASK_BACKEND, settings.TASK_BACKEND_PATH, settings.EVENT_LOG_SIZE
+    ),
+    subscriber_queue_size=settings.SUBSCRIBER_QUEUE_SIZE,
+    retention_seconds=settings.TASK_RETENTION_SECONDS,
+    max_retained=settings.TASK_MAX_RETAINED,
+    record_ttl_seconds=settings.TASK_RECORD_TTL_SECONDS,
+    max_records=settings.TASK_MAX_RECORDS,
+    poll_interval=settings.TASK_POLL_INTERVAL,
+)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import re
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD_RE.findall(text.casefold())
+
+
+def index_terms(text: str) -> list[str]:
+    """Words for ASCII text; character bigrams for unsegmented (e.g. Japanese) runs."""
+    terms: list[str] = []
+    for word in tokenize(text):
+        if word.isascii():
+            terms.append(word)
+        elif len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return terms
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable
+
+from services.metrics import CACHE_EVENTS
+from sources.base import ResearchSource, SearchResult
+from sources.normalize import canonicalize_url, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class _DiskCache:
+    """SQLite-backed second cache tier. All methods are blocking; call via a thread."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS source_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM source_cache WHERE expires_at < ?", (time.time(),)
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> tuple[float, str] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM source_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return row[0], row[1]
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO source_cache (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedSource(ResearchSource):
+    """Caching wrapper around another ResearchSource.
+
+    Lookups go through a bounded in-memory LRU tier, then an optional SQLite
+    tier, then the wrapped source. Concurrent identical misses share a single
+    upstream call. Empty results are never cached since the underlying
+    sources return them on errors.
+    """
+
+    def __init__(
+        self,
+        inner: ResearchSource,
+        max_entries: int = 2048,
+        search_ttl: float = 3600,
+        content_ttl: float = 86400,
+        db_path: str = "",
+    ) -> None:
+        self.inner = inner
+        self.max_entries = max_entries
+        self.search_ttl = search_ttl
+        self.content_ttl = content_ttl
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._disk = _DiskCache(db_path) if db_path else None
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+        }
+
+    async def search(self, query: str) -> list[SearchResult]:
+        return await self._get_or_load(
+            f"search:{normalize_query(query)}",
+            self.search_ttl,
+            lambda: self.inner.search(query),
+            encode=lambda results: json.dumps([asdict(r) for r in results]),
+            decode=lambda raw: [SearchResult(**r) for r in json.loads(raw)],
+        )
+
+    async def fetch_content(self, url: str) -> str:
+        return await self._get_or_load(
+            f"content:{canonicalize_url(url)}",
+            self.content_ttl,
+            lambda: self.inner.fetch_content(url),
+            encode=lambda content: content,
+            decode=lambda raw: raw,
+        )
+
+    def stats(self) -> dict[str, float]:
+        lookups = sum(self.counters.values())
+        # Coalesced lookups shared another lookup's upstream call, so they count as hits
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+            "inflight": len(self._inflight),
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def _count(self, outcome: str) -> None:
+        self.counters[outcome] += 1
+        CACHE_EVENTS.inc(cache="source", outcome=outcome)
+
+    async def _get_or_load(
+        self,
+        key: str,
+        ttl: float,
+        loader: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], str],
+        decode: Callable[[str], Any],
+    ) -> Any:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] >= now:
+                self._memory.move_to_end(key)
+                self._count("memory_hits")
+                return entry[1]
+            del self._memory[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count("coalesced")
+            return await asyncio.shield(inflight)
+
+        async def _load() -> Any:
+            if self._disk is not None:
+                try:
+                    row = await asyncio.to_thread(self._disk.get, key)
+                except Exception as e:
+                    logger.warning(f"Source cache read failed for {key}: {e}")
+                    row = None
+                if row is not None:
+                    self._count("disk_hits")
+                    value = decode(row[1])
+                    self._remember(key, value, row[0])
+                    return value
+
+            self._count("misses")
+            value = await loader()
+            if value:
+                expires_at = time.time() + ttl
+                self._remember(key, value, expires_at)
+                if self._disk is not None:
+                    try:
+                        await asyncio.to_thread(
+                            self._disk.set, key, encode(value), expires_at
+                        )
+                    except Exception as e:
+                        logger.warning(f"Source cache write failed for {key}: {e}")
+            return value
+
+        task = asyncio.ensure_future(_load())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from services.metrics import SOURCE_BREAKER_OPEN, SOURCE_FAILURES, SOURCE_HEDGES
+from sources.base import ResearchSource, SearchResult
+from sources.normalize import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyWindow:
+    """Recent call latencies for one source operation."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> float | None:
+        if len(self._samples) < max(min_samples, 1):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """Stops calling a source after consecutive failures.
+
+    Opens after failure_threshold failures in a row; after cooldown seconds a
+    single trial call is let through (half-open), which closes the breaker on
+    success or re-opens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._trial:
+            return False
+        self._trial = True
+        return True
+
+    def release_trial(self) -> None:
+        """Give back the half-open trial after a call that ended without a verdict."""
+        self._trial = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class SourceBackend:
+    """One source behind a CompositeSource, with its deadlines and health state.
+
+    The source should raise on errors rather than return empty results, so
+    that failures reach the circuit breaker.
+    """
+
+    name: str
+    source: ResearchSource
+    search_deadline: float = 30.0
+    fetch_deadline: float = 60.0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    latencies: dict[str, LatencyWindow] = field(
+        default_factory=lambda: {"search": LatencyWindow(), "fetch": LatencyWindow()}
+    )
+
+
+class CompositeSource(ResearchSource):
+    """Fan-out over several sources with hedging, deadlines and circuit breakers.
+
+    Searches go to every source whose breaker allows it; results are
+    interleaved by rank and deduplicated by canonical URL. Content is fetched
+    from the source that returned the URL, falling back to the others in
+    order. A call that runs past its source's recent latency quantile gets
+    one backup request, and whichever finishes first wins. Like other
+    sources, it returns empty results rather than raising.
+    """
+
+    def __init__(
+        self,
+        backends: list[SourceBackend],
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        max_origins: int = 4096,
+    ) -> None:
+        if not backends:
+            raise ValueError("CompositeSource needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_origins = max_origins
+        # Canonical URL -> name of the backend that returned it
+        self._origins: OrderedDict[str, str] = OrderedDict()
+        self.counters: dict[str, dict[str, int]] = {
+            b.name: {"calls": 0, "hedges": 0, "failures": 0, "rejected": 0} for b in backends
+        }
+
+    async def search(self, query: str) -> list[SearchResult]:
+        async def _search(backend: SourceBackend) -> list[SearchResult]:
+            # Checked inside the task, so a gather cancelled before it starts holds no trial
+            if not self._allow(backend):
+                return []
+            return await self._call(
+                backend, "search", lambda: backend.source.search(query), []
+            )
+
+        per_source = await asyncio.gather(*[_search(b) for b in self.backends])
+        merged: list[SearchResult] = []
+        seen: set[str] = set()
+        for rank in range(max((len(r) for r in per_source), default=0)):
+            for backend, results in zip(self.backends, per_source):
+                if rank >= len(results):
+                    continue
+                result = results[rank]
+                key = canonicalize_url(result.url)
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(result)
+                self._remember_origin(key, backend.name)
+        return merged
+
+    async def fetch_content(self, url: str) -> str:
+        origin = self._origins.get(canonicalize_url(url))
+        ordered = sorted(self.backends, key=lambda b: b.name != origin)
+        for backend in ordered:
+            if not self._allow(backend):
+                continue
+            content = await self._call(
+                backend, "fetch", lambda b=backend: b.source.fetch_content(url), ""
+            )
+            if content:
+                return content
+        return ""
+
+    def stats(self) -> dict[str, dict]:
+        stats = {}
+        for b in self.backends:
+            stats[b.name] = {
+                **self.counters[b.name],
+                "breaker": b.breaker.state,
+                **{
+                    f"{op}_p{int(q * 100)}": (
+                        round(v, 3) if (v := window.quantile(q)) is not None else None
+                    )
+                    for op, window in b.latencies.items()
+                    for q in (0.5, self.hedge_quantile)
+                },
+            }
+        return stats
+
+    def close(self) -> None:
+        for b in self.backends:
+            close = getattr(b.source, "close", None)
+            if close is not None:
+                close()
+
+    def _allow(self, backend: SourceBackend) -> bool:
+        if backend.breaker.allow():
+            return True
+        self.counters[backend.name]["rejected"] += 1
+        return False
+
+    def _remember_origin(self, key: str, name: str) -> None:
+        self._origins[key] = name
+        self._origins.move_to_end(key)
+        while len(self._origins) > self.max_origins:
+            self._origins.popitem(last=False)
+
+    async def _call(
+        self,
+        backend: SourceBackend,
+        operation: str,
+        factory: Callable[[], Awaitable[Any]],
+        empty: Any,
+    ) -> Any:
+        deadline = backend.search_deadline if operation == "search" else backend.fetch_deadline
+        # Called right after _allow(), so a non-closed breaker means this is its trial
+        trial = backend.breaker.state != "closed"
+        self.counters[backend.name]["calls"] += 1
+        try:
+            result = await asyncio.wait_for(
+                self._hedged(backend, operation, factory), deadline
+            )
+        except asyncio.CancelledError:
+            # Says nothing about the source's health; let the next call be the trial
+            if trial:
+                backend.breaker.release_trial()
+            raise
+        except Exception as e:
+            reason = "deadline" if isinstance(e, asyncio.TimeoutError) else "error"
+            logger.warning(f"Source {backend.name} {operation} failed ({reason}): {e!r}")
+            self.counters[backend.name]["failures"] += 1
+            SOURCE_FAILURES.inc(source=backend.name, operation=operation, reason=reason)
+            backend.breaker.record_failure()
+            SOURCE_BREAKER_OPEN.set(
+                int(backend.breaker.state != "closed"), source=backend.name
+            )
+            return empty
+        backend.breaker.record_success()
+        SOURCE_BREAKER_OPEN.set(0, source=backend.name)
+        return result
+
+    async def _hedged(
+        self,
+        backend: SourceBackend,
+        operation: str,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        window = backend.latencies[operation]
+
+        async def _attempt() -> Any:
+            started = time.monotonic()
+            result = await factory()
+            window.add(time.monotonic() - started)
+            return result
+
+        delay = (
+            window.quantile(self.hedge_quantile, self.hedge_min_samples)
+            if self.hedge
+            else None
+        )
+        attempts = {asyncio.ensure_future(_attempt())}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    self.counters[backend.name]["hedges"] += 1
+                    SOURCE_HEDGES.inc(source=backend.name, operation=operation)
+                    attempts.add(asyncio.ensure_future(_attempt()))
+            error: BaseException | None = None
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from services.metrics import call_span
+from sources.base import ResearchSource, SearchResult
+
+_WORD_RE = re.compile(r"\w+")
+_INDEXED_SUFFIXES = {".md", ".markdown", ".txt"}
+
+
+class LocalCorpusSource(ResearchSource):
+    """Search over an on-disk SQLite FTS5 index of local documents.
+
+    Uses the trigram tokenizer so Japanese text matches without a word
+    segmenter; as a consequence query words shorter than three characters
+    are ignored. Build the index with `python -m sources.local_corpus_source`.
+    """
+
+    def __init__(self, path: str, limit: int = 5) -> None:
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL, "
+                "content TEXT NOT NULL, indexed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+                "title, content, content='documents', content_rowid='id', "
+                "tokenize='trigram')"
+            )
+            self._conn.commit()
+
+    async def search(self, query: str) -> list[SearchResult]:
+        with call_span("corpus", "search") as span:
+            results = await asyncio.to_thread(self._search, query)
+            if not results:
+                span.outcome = "empty"
+        return results
+
+    async def fetch_content(self, url: str) -> str:
+        with call_span("corpus", "fetch") as span:
+            content = await asyncio.to_thread(self._fetch, url)
+            if not content:
+                span.outcome = "empty"
+        return content
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        terms = dict.fromkeys(w for w in _WORD_RE.findall(query) if len(w) >= 3)
+        return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+    def _search(self, query: str) -> list[SearchResult]:
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.url, d.title, snippet(documents_fts, 1, '', '', '…', 24) "
+                "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+                "WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts) LIMIT ?",
+                (expression, self.limit),
+            ).fetchall()
+        return [SearchResult(title=title, url=url, snippet=snippet) for url, title, snippet in rows]
+
+    def _fetch(self, url: str) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM documents WHERE url = ?", (url,)
+            ).fetchone()
+        return row[0] if row else ""
+
+    def add(self, url: str, title: str, content: str) -> None:
+        """Index a document, replacing any earlier version with the same URL. Blocking."""
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT id, title, content FROM documents WHERE url = ?", (url,)
+            ).fetchone()
+            if old is not None:
+                self._conn.execute(
+                    "INSERT INTO documents_fts (documents_fts, rowid, title, content) "
+                    "VALUES ('delete', ?, ?, ?)",
+                    old,
+                )
+                self._conn.execute("DELETE FROM documents WHERE id = ?", (old[0],))
+            cursor = self._conn.execute(
+                "INSERT INTO documents (url, title, content, indexed_at) VALUES (?, ?, ?, ?)",
+                (url, title, content, time.time()),
+            )
+            self._conn.execute(
+                "INSERT INTO documents_fts (rowid, title, content) VALUES (?, ?, ?)",
+                (cursor.lastrowid, title, content),
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _title(path: Path, content: str) -> str:
+    for line in content.splitlines():
+        if line.startswith("# "):
+            return line[2:].strip()
+    return path.stem
+
+
+def index_directory(corpus: LocalCorpusSource, root: Path) -> int:
+    """Index every Markdown/text file under root; returns the number of files."""
+    indexed = 0
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() not in _INDEXED_SUFFIXES or not path.is_file():
+            continue
+        content = path.read_text(encoding="utf-8", errors="replace")
+        corpus.add(path.resolve().as_uri(), _title(path, content), content)
+        indexed += 1
+    return indexed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the local corpus index")
+    parser.add_argument("directory", type=Path, help="Directory of .md/.txt files")
+    parser.add_argument("--db", default="corpus.db", help="Index path (LOCAL_CORPUS_DB_PATH)")
+    args = parser.parse_args()
+    corpus = LocalCorpusSource(args.db)
+    try:
+        indexed = index_directory(corpus, args.directory)
+        print(f"Indexed {indexed} files; {corpus.count()} documents in {args.db}")
+    finally:
+        corpus.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_query(query: str) -> str:
+    """Normalize search text so trivially different spellings share a cache key."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" \t\n.,;:!?\"'")
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonicalize a URL for deduplication (scheme/host case, ports, tracking params)."""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        # Out-of-range or non-numeric port; leave the URL as given
+        return url
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    params = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(params))
+    return urlunsplit((scheme, host, path, query, ""))
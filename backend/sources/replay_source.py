@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+
+from services.call_trace import CallTrace, TracePlayer
+from sources.base import ResearchSource, SearchResult
+from sources.normalize import canonicalize_url, normalize_query
+
+
+class RecordingSource(ResearchSource):
+    """Wrapper that records every search and fetch, with its result, into a CallTrace."""
+
+    def __init__(self, inner: ResearchSource, trace: CallTrace) -> None:
+        self.inner = inner
+        self.trace = trace
+
+    async def search(self, query: str) -> list[SearchResult]:
+        started = time.monotonic()
+        key = normalize_query(query)
+        try:
+            results = await self.inner.search(query)
+        except Exception as e:
+            self.trace.add("search", key, started, error=repr(e))
+            raise
+        self.trace.add("search", key, started, [[r.title, r.url, r.snippet] for r in results])
+        return results
+
+    async def fetch_content(self, url: str) -> str:
+        started = time.monotonic()
+        key = canonicalize_url(url)
+        try:
+            content = await self.inner.fetch_content(url)
+        except Exception as e:
+            self.trace.add("fetch", key, started, error=repr(e))
+            raise
+        self.trace.add("fetch", key, started, content)
+        return content
+
+
+class ReplaySource(ResearchSource):
+    """Offline source answering from a recorded CallTrace.
+
+    Calls the recording doesn't have (possible once engine changes pick
+    different URLs) come back empty, as a failed upstream call would.
+    """
+
+    def __init__(self, player: TracePlayer) -> None:
+        self.player = player
+
+    async def search(self, query: str) -> list[SearchResult]:
+        call = self.player.take("search", normalize_query(query))
+        if call is None:
+            return []
+        await self.player.wait_for(call)
+        if "error" in call:
+            raise RuntimeError(f"Recorded search error: {call['error']}")
+        return [SearchResult(title, url, snippet) for title, url, snippet in call["result"]]
+
+    async def fetch_content(self, url: str) -> str:
+        call = self.player.take("fetch", canonicalize_url(url))
+        if call is None:
+            return ""
+        await self.player.wait_for(call)
+        if "error" in call:
+            raise RuntimeError(f"Recorded fetch error: {call['error']}")
+        return call["result"]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from sources.base import ResearchSource, SearchResult
+from sources.normalize import canonicalize_url, normalize_query
+
+
+class SharedWorkSource(ResearchSource):
+    """Wrapper that runs each distinct search and scrape once for a group of tasks.
+
+    Used per batch: results (empty ones included) are kept until release(),
+    and concurrent identical requests share one upstream call, so tasks in
+    the same batch never repeat work regardless of the global source cache's
+    size or TTL.
+    """
+
+    def __init__(self, inner: ResearchSource) -> None:
+        self.inner = inner
+        self._calls: dict[str, asyncio.Future] = {}
+        self.counters = {"requested": 0, "executed": 0}
+
+    async def search(self, query: str) -> list[SearchResult]:
+        return await self._once(
+            f"search:{normalize_query(query)}", lambda: self.inner.search(query)
+        )
+
+    async def fetch_content(self, url: str) -> str:
+        return await self._once(
+            f"content:{canonicalize_url(url)}", lambda: self.inner.fetch_content(url)
+        )
+
+    async def _once(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self.counters["requested"] += 1
+        call = self._calls.get(key)
+        if call is None or (call.done() and (call.cancelled() or call.exception())):
+            self.counters["executed"] += 1
+            call = asyncio.ensure_future(loader())
+            self._calls[key] = call
+        # One task giving up must not cancel the call for the others
+        return await asyncio.shield(call)
+
+    def stats(self) -> dict[str, int]:
+        requested = self.counters["requested"]
+        executed = self.counters["executed"]
+        return {"requested": requested, "executed": executed, "saved": requested - executed}
+
+    def release(self) -> None:
+        """Drop memoized results once no task in the group needs them."""
+        self._calls.clear()
@@ -2,47 +2,68 @@ from __future__ import annotations
 
 import httpx
 
+from services.metrics import call_span
 from sources.base import ResearchSource, SearchResult
 
 
 class WebSource(ResearchSource):
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        client: httpx.AsyncClient,
+        base_url: str = "https://api.firecrawl.dev/v1",
+        raise_errors: bool = False,
+    ) -> None:
         self.api_key = api_key
-        self.base_url = "https://api.firecrawl.dev/v1"
+        self.base_url = base_url.rstrip("/")
+        self.client = client
+        # Raise instead of returning empty results (for CompositeSource's breaker)
+        self.raise_errors = raise_errors
 
     async def search(self, query: str) -> list[SearchResult]:
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                resp = await client.post(
+            with call_span("firecrawl", "search") as span:
+                resp = await self.client.post(
                     f"{self.base_url}/search",
                     headers={"Authorization": f"Bearer {self.api_key}"},
                     json={"query": query, "limit": 5},
+                    timeout=30,
                 )
                 resp.raise_for_status()
                 data = resp.json()
-                results = []
-                for item in data.get("data", []):
-                    results.append(
-                        SearchResult(
-                            title=item.get("title", ""),
-                            url=item.get("url", ""),
-                            snippet=item.get("description", item.get("snippet", "")),
-                        )
+                if not data.get("data"):
+                    span.outcome = "empty"
+            results = []
+            for item in data.get("data", []):
+                results.append(
+                    SearchResult(
+                        title=item.get("title", ""),
+                        url=item.get("url", ""),
+                        snippet=item.get("description", item.get("snippet", "")),
                     )
-                return results
+                )
+            return results
         except Exception:
+            if self.raise_errors:
+                raise
             return []
 
     async def fetch_content(self, url: str) -> str:
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
-                resp = await client.post(
+            with call_span("firecrawl", "scrape") as span:
+                resp = await self.client.post(
                     f"{self.base_url}/scrape",
                     headers={"Authorization": f"Bearer {self.api_key}"},
                     json={"url": url, "formats": ["markdown"]},
+                    timeout=60,
                 )
                 resp.raise_for_status()
                 data = resp.json()
-                return data.get("data", {}).get("markdown", "")
+                markdown = data.get("data", {}).get("markdown", "")
+                if not markdown:
+                    span.outcome = "empty"
+            return markdown
         except Exception:
+            if self.raise_errors:
+                raise
             return ""
@@ -0,0 +1,88 @@
+import asyncio
+
+from services.batches import Batch, BatchItem, BatchManager
+from services.task_registry import TaskRegistry
+from sources.base import ResearchSource, SearchResult
+from sources.shared_source import SharedWorkSource
+
+
+class CountingSource(ResearchSource):
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def search(self, query: str) -> list[SearchResult]:
+        self.calls.append(query)
+        await asyncio.sleep(0.01)
+        return [SearchResult("title", f"https://example.com/{query}", "snippet")]
+
+    async def fetch_content(self, url: str) -> str:
+        self.calls.append(url)
+        return f"content of {url}"
+
+
+def test_shared_source_runs_each_request_once():
+    inner = CountingSource()
+    shared = SharedWorkSource(inner)
+
+    async def main():
+        await asyncio.gather(shared.search("Solar"), shared.search(" solar "))
+        await shared.fetch_content("https://example.com/a?utm_source=x")
+        await shared.fetch_content("https://example.com/a")
+        shared.release()
+        await shared.search("solar")
+
+    asyncio.run(main())
+    assert inner.calls == ["Solar", "https://example.com/a?utm_source=x", "solar"]
+    assert shared.stats() == {"requested": 5, "executed": 3, "saved": 2}
+
+
+def test_status_aggregates_items_and_releases_the_source():
+    async def main():
+        registry = TaskRegistry()
+        manager = BatchManager(registry)
+        source = SharedWorkSource(CountingSource())
+        batch = Batch(
+            "b1",
+            [
+                BatchItem("solar", "t1"),
+                BatchItem("wind", "t2"),
+                BatchItem("Solar", "t1", duplicate_of=0),
+            ],
+            source,
+        )
+        manager.add(batch)
+        gate = asyncio.Event()
+
+        async def work(task_id: str, wait: bool) -> None:
+            await source.search(task_id)
+            if wait:
+                await gate.wait()
+            await registry.update_task(task_id, status="completed", progress=100)
+
+        registry.create_task("t1", manager.track(batch, work("t1", wait=False)))
+        registry.create_task("t2", manager.track(batch, work("t2", wait=True)))
+        await asyncio.sleep(0.05)
+        running = await manager.status(batch)
+        memo_while_running = len(source._calls)
+        gate.set()
+        await asyncio.sleep(0.05)
+        finished = await manager.status(batch)
+        return batch, running, memo_while_running, finished, source
+
+    batch, running, memo_while_running, finished, source = asyncio.run(main())
+    assert batch.task_ids == ["t1", "t2"]
+    assert running["counts"] == {"completed": 2, "pending": 1}
+    assert running["progress"] == 67 and not running["done"]
+    assert memo_while_running == 2
+    assert finished["done"] and finished["progress"] == 100
+    assert [i["duplicate_of"] for i in finished["items"]] == [None, None, 0]
+    assert source._calls == {}
+
+
+def test_evicted_batches_release_their_source():
+    manager = BatchManager(TaskRegistry(), max_batches=1)
+    first = SharedWorkSource(CountingSource())
+    first._calls["search:x"] = None
+    manager.add(Batch("b1", [], first))
+    manager.add(Batch("b2", [], None))
+    assert manager.get("b1") is None and first._calls == {}
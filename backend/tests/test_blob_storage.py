@@ -0,0 +1,94 @@
+import asyncio
+import socket
+
+from aiohttp import web
+
+from services.blob_storage import BlobStorageService
+
+ACCOUNT_KEY = "a2V5a2V5a2V5a2V5"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeBlobService:
+    """Just enough of the Blob REST API for create, upload and a ranged download."""
+
+    def __init__(self) -> None:
+        self.blobs: dict[str, tuple[bytes, dict]] = {}
+        self.containers: set[str] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path.strip("/").split("/", 2)[1:]
+        headers = {"ETag": '"0x1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        if request.method == "PUT" and request.query.get("restype") == "container":
+            if path[0] in self.containers:
+                return web.Response(
+                    status=409, headers={"x-ms-error-code": "ContainerAlreadyExists"}
+                )
+            self.containers.add(path[0])
+            return web.Response(status=201, headers=headers)
+        name = "/".join(path)
+        if request.method == "PUT":
+            stored = {
+                "Content-Type": request.headers.get("x-ms-blob-content-type", ""),
+                "Content-Encoding": request.headers.get("x-ms-blob-content-encoding", ""),
+            }
+            self.blobs[name] = (await request.read(), stored)
+            return web.Response(status=201, headers=headers)
+        if name not in self.blobs:
+            return web.Response(status=404, headers={"x-ms-error-code": "BlobNotFound"})
+        data, stored = self.blobs[name]
+        start, _, end = request.headers["x-ms-range"].removeprefix("bytes=").partition("-")
+        end = min(int(end), len(data) - 1)
+        body = data[int(start) : end + 1]
+        headers.update({k: v for k, v in stored.items() if v})
+        headers.update({
+            "Content-Range": f"bytes {start}-{end}/{len(data)}",
+            "x-ms-blob-type": "BlockBlob",
+        })
+        return web.Response(status=206, body=body, headers=headers)
+
+
+async def _round_trip(content: str, gzip_enabled: bool) -> tuple[str | None, FakeBlobService]:
+    fake = FakeBlobService()
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    storage = BlobStorageService(
+        "DefaultEndpointsProtocol=http;AccountName=dev;"
+        f"AccountKey={ACCOUNT_KEY};BlobEndpoint=http://127.0.0.1:{port}/dev",
+        "reports",
+        gzip_enabled=gzip_enabled,
+    )
+    try:
+        await storage.upload_report("t1", content)
+        return await storage.download_report("t1"), fake
+    finally:
+        await storage.close()
+        await runner.cleanup()
+
+
+def test_gzip_report_round_trip():
+    content = "# 調査レポート\n\n" + "本文 " * 500
+    downloaded, fake = asyncio.run(_round_trip(content, gzip_enabled=True))
+    data, stored = fake.blobs["reports/t1.md"]
+    assert stored["Content-Encoding"] == "gzip"
+    assert len(data) < len(content.encode("utf-8"))
+    assert downloaded == content
+
+
+def test_plain_report_round_trip():
+    downloaded, _ = asyncio.run(_round_trip("# Report\n", gzip_enabled=False))
+    assert downloaded == "# Report\n"
+
+
+def test_missing_local_report(tmp_path):
+    storage = BlobStorageService("", "reports", local_dir=str(tmp_path))
+    assert asyncio.run(storage.download_report("missing")) is None
@@ -0,0 +1,72 @@
+import asyncio
+
+from sources.base import ResearchSource, SearchResult
+from sources.cached_source import CachedSource
+
+
+class CountingSource(ResearchSource):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def search(self, query: str) -> list[SearchResult]:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return [SearchResult("title", f"https://example.com/{query}", "snippet")]
+
+    async def fetch_content(self, url: str) -> str:
+        self.calls += 1
+        return "" if url.endswith("empty") else f"content of {url}"
+
+
+def test_concurrent_lookups_share_one_call_and_count_as_hits():
+    inner = CountingSource()
+    cache = CachedSource(inner)
+
+    async def main():
+        return await asyncio.gather(*(cache.search("Solar Power") for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert inner.calls == 1
+    assert all(r == results[0] for r in results)
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"]) == (1, 3)
+    assert stats["hit_ratio"] == 0.75
+
+
+def test_normalized_keys_hit_memory():
+    inner = CountingSource()
+    cache = CachedSource(inner)
+
+    async def main():
+        await cache.fetch_content("https://Example.com/a/?utm_source=x")
+        return await cache.fetch_content("https://example.com/a")
+
+    assert asyncio.run(main()) == "content of https://Example.com/a/?utm_source=x"
+    assert inner.calls == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_empty_results_are_not_cached():
+    inner = CountingSource()
+    cache = CachedSource(inner)
+
+    async def main():
+        await cache.fetch_content("https://example.com/empty")
+        await cache.fetch_content("https://example.com/empty")
+
+    asyncio.run(main())
+    assert inner.calls == 2
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    db = str(tmp_path / "cache.db")
+    first = CachedSource(CountingSource(), db_path=db)
+    asyncio.run(first.search("wind"))
+    first.close()
+    inner = CountingSource()
+    second = CachedSource(inner, db_path=db)
+    results = asyncio.run(second.search("wind"))
+    second.close()
+    assert inner.calls == 0
+    assert results[0].url == "https://example.com/wind"
+    assert second.stats()["disk_hits"] == 1
@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from config import Settings
+from services.call_trace import CallTrace, ReplayLLM, TracePlayer
+from services.metrics import stage_span
+from sources.base import ResearchSource, SearchResult
+from sources.replay_source import RecordingSource, ReplaySource
+
+
+class FakeSource(ResearchSource):
+    async def search(self, query: str) -> list[SearchResult]:
+        return [SearchResult("Title", f"https://example.com/{query}", "snippet")]
+
+    async def fetch_content(self, url: str) -> str:
+        if url.endswith("broken"):
+            raise RuntimeError("scrape failed")
+        return f"content of {url}"
+
+
+def _call(kind, key, stage="analyze", start=0.0, duration=0.1, **extra):
+    return {"kind": kind, "key": key, "stage": stage, "start": start, "duration": duration, **extra}
+
+
+def test_record_save_load_and_replay(tmp_path):
+    trace = CallTrace("solar", "t1")
+    source = RecordingSource(FakeSource(), trace)
+
+    async def record():
+        await source.search("Solar")
+        await source.fetch_content("https://example.com/solar?utm_source=x")
+        with pytest.raises(RuntimeError):
+            await source.fetch_content("https://example.com/broken")
+
+    asyncio.run(record())
+    path = tmp_path / "trace.json.gz"
+    trace.save(str(path))
+    player = TracePlayer(CallTrace.load(str(path)))
+    replay = ReplaySource(player)
+
+    async def play():
+        results = await replay.search("  SOLAR ")  # same normalized query
+        content = await replay.fetch_content("https://example.com/solar")
+        with pytest.raises(RuntimeError, match="scrape failed"):
+            await replay.fetch_content("https://example.com/broken")
+        missing = await replay.search("wind")
+        return results, content, missing
+
+    results, content, missing = asyncio.run(play())
+    assert results == [SearchResult("Title", "https://example.com/Solar", "snippet")]
+    assert content == "content of https://example.com/solar?utm_source=x"
+    assert missing == []
+    assert player.stats() == {"replayed": 3, "fallback": 0, "missing": 1, "unused": 0}
+
+
+def test_for_task_leaves_out_credentials():
+    config = Settings(OPENAI_API_KEY="secret", AZURE_STORAGE_CONNECTION_STRING="secret")
+    recorded = CallTrace.for_task("q", "t1", config).config
+    assert "secret" not in json.dumps(recorded)
+    assert recorded["MAX_RESEARCH_DEPTH"] == config.MAX_RESEARCH_DEPTH
+
+
+def test_load_rejects_other_versions(tmp_path):
+    path = tmp_path / "trace.json.gz"
+    with gzip.open(path, "wt") as f:
+        json.dump({"version": 99, "query": "q", "calls": []}, f)
+    with pytest.raises(ValueError):
+        CallTrace.load(str(path))
+
+
+def test_take_falls_back_to_same_stage():
+    trace = CallTrace("q", calls=[_call("complete", "old-prompt"), _call("complete", "x", "report")])
+    player = TracePlayer(trace)
+    assert player.take("complete", "new-prompt", "analyze")["key"] == "old-prompt"
+    assert player.take("complete", "old-prompt", "analyze") is None  # already used
+    assert player.stats() == {"replayed": 1, "fallback": 1, "missing": 1, "unused": 1}
+
+
+def test_zero_latency_replay_keeps_recorded_finish_order():
+    trace = CallTrace(
+        "q",
+        calls=[
+            _call("search", "slow", start=0.0, duration=2.0, result=[]),
+            _call("search", "fast", start=0.5, duration=0.1, result=[]),
+        ],
+    )
+    replay = ReplaySource(TracePlayer(trace))
+    finished = []
+
+    async def run(query):
+        await replay.search(query)
+        finished.append(query)
+
+    async def main():
+        await asyncio.gather(run("slow"), run("fast"))
+
+    asyncio.run(main())
+    assert finished == ["fast", "slow"]
+
+
+def test_replay_llm_streams_recorded_deltas():
+    result = {"deltas": [[0.1, "Hello"], [0.2, " world"]], "usage": None}
+    trace = CallTrace("q", calls=[_call("stream", "unmatched", "report", result=result)])
+    llm = ReplayLLM(TracePlayer(trace))
+
+    async def main():
+        with stage_span("report"):
+            return [d async for d in llm.stream(messages=[{"role": "user", "content": "hi"}])]
+
+    assert asyncio.run(main()) == ["Hello", " world"]
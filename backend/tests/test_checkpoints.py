@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from services.checkpoints import (
+    STAGE_GATHERED,
+    STAGE_REPORTED,
+    STAGE_RESEARCHING,
+    Checkpoint,
+    CheckpointStore,
+)
+from services.findings import FindingsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"), ttl=60)
+    yield store
+    store.close()
+
+
+def test_round_trip_with_findings(store):
+    findings = FindingsStore()
+    findings.add("https://example.com/a", "A", "solar panel output", kind="content")
+    store.save(
+        Checkpoint(
+            task_id="t1",
+            query="solar",
+            stage=STAGE_GATHERED,
+            depth=2,
+            current_queries=["solar cost"],
+            queries_run=["solar", "solar cost"],
+            findings=findings,
+            last_seq=17,
+        )
+    )
+    loaded = store.load("t1")
+    assert (loaded.stage, loaded.depth, loaded.last_seq) == (STAGE_GATHERED, 2, 17)
+    assert loaded.queries_run == ["solar", "solar cost"]
+    assert [f.url for f in loaded.findings.findings] == ["https://example.com/a"]
+    # Dedup index is rebuilt, so the same page is still rejected after a resume
+    assert loaded.findings.add("https://example.com/a", "A", "x", kind="content") is None
+    assert store.load("missing") is None
+
+
+def test_reached_follows_stage_order():
+    checkpoint = Checkpoint(task_id="t1", query="q", stage=STAGE_GATHERED)
+    assert checkpoint.reached(STAGE_RESEARCHING)
+    assert checkpoint.reached(STAGE_GATHERED)
+    assert not checkpoint.reached(STAGE_REPORTED)
+
+
+def test_info_and_interrupted(store):
+    store.save(Checkpoint(task_id="t1", query="first", last_seq=5))
+    store.save(Checkpoint(task_id="t2", query="second"))
+    store.save(Checkpoint(task_id="t3", query="third"))
+    store.set_status("t2", "interrupted")
+    store.set_status("t3", "failed")
+    info = store.info("t1")
+    assert (info["query"], info["status"], info["last_seq"]) == ("first", "running", 5)
+    assert store.info("missing") is None
+    assert store.interrupted() == ["t1", "t2"]  # oldest first, failed excluded
+    store.delete("t1")
+    assert store.interrupted() == ["t2"]
+
+
+def test_prune_drops_expired(store):
+    store.save(Checkpoint(task_id="old", query="q"))
+    store.save(Checkpoint(task_id="new", query="q"))
+    store._conn.execute(
+        "UPDATE checkpoints SET updated_at = ? WHERE task_id = 'old'", (time.time() - 120,)
+    )
+    assert store.prune() == 1
+    assert store.load("old") is None and store.load("new") is not None
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from sources.base import ResearchSource, SearchResult
+from sources.composite_source import CircuitBreaker, CompositeSource, LatencyWindow, SourceBackend
+
+
+class FakeSource(ResearchSource):
+    def __init__(self, urls: list[str], delay: float = 0.0, fail: bool = False) -> None:
+        self.urls = urls
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def search(self, query: str) -> list[SearchResult]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("down")
+        return [SearchResult(url, url, "snippet") for url in self.urls]
+
+    async def fetch_content(self, url: str) -> str:
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("down")
+        return f"{self.urls[0]} has {url}"
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()  # a single trial
+    breaker.release_trial()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_latency_quantile_needs_min_samples():
+    window = LatencyWindow()
+    for i in range(10):
+        window.add(i / 10)
+    assert window.quantile(0.5, min_samples=20) is None
+    assert window.quantile(0.5) == 0.5
+
+
+def test_search_interleaves_by_rank_and_dedups_urls():
+    a = FakeSource(["https://a.com/1", "https://shared.com/x?utm_source=a"])
+    b = FakeSource(["https://shared.com/x", "https://b.com/2"])
+    composite = CompositeSource([SourceBackend("a", a), SourceBackend("b", b)])
+    results = asyncio.run(composite.search("q"))
+    assert [r.url for r in results] == [
+        "https://a.com/1",
+        "https://shared.com/x",
+        "https://b.com/2",
+    ]
+    # Fetched from the source that returned the URL first
+    assert asyncio.run(composite.fetch_content("https://b.com/2")).startswith("https://shared")
+
+
+def test_failing_source_trips_breaker_and_is_skipped():
+    bad = FakeSource([], fail=True)
+    good = FakeSource(["https://good.com/1"])
+    composite = CompositeSource(
+        [
+            SourceBackend("bad", bad, breaker=CircuitBreaker(failure_threshold=2)),
+            SourceBackend("good", good),
+        ]
+    )
+
+    async def main():
+        for _ in range(3):
+            assert [r.url for r in await composite.search("q")] == ["https://good.com/1"]
+
+    asyncio.run(main())
+    assert bad.calls == 2
+    stats = composite.stats()["bad"]
+    assert (stats["failures"], stats["rejected"], stats["breaker"]) == (2, 1, "open")
+
+
+def test_deadline_counts_as_failure():
+    slow = FakeSource(["https://slow.com/1"], delay=1.0)
+    composite = CompositeSource([SourceBackend("slow", slow, search_deadline=0.05)])
+    assert asyncio.run(composite.search("q")) == []
+    assert composite.stats()["slow"]["failures"] == 1
+
+
+def test_slow_call_is_hedged():
+    source = FakeSource(["https://a.com/1"])
+    backend = SourceBackend("a", source)
+    for _ in range(20):
+        backend.latencies["search"].add(0.01)
+    composite = CompositeSource([backend], hedge_min_samples=20)
+    source.delay = 0.2
+    assert len(asyncio.run(composite.search("q"))) == 1
+    assert composite.stats()["a"]["hedges"] == 1 and source.calls == 2
@@ -0,0 +1,64 @@
+import asyncio
+
+from services.concurrency import PrioritySemaphore
+
+
+def test_waiters_are_woken_by_priority_then_fifo():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        order: list[str] = []
+
+        async def worker(name: str, priority: int) -> None:
+            async with semaphore.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await semaphore.acquire()
+        workers = [
+            asyncio.create_task(worker(name, priority))
+            for name, priority in [("low", 5), ("high-1", -1), ("mid", 0), ("high-2", -1)]
+        ]
+        await asyncio.sleep(0)
+        assert semaphore.waiting == 4
+        await semaphore.release()
+        await asyncio.gather(*workers)
+        return order, semaphore.in_use
+
+    order, in_use = asyncio.run(main())
+    assert order == ["high-1", "high-2", "mid", "low"]
+    assert in_use == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await semaphore.release()
+        return semaphore.in_use, semaphore.waiting
+
+    assert asyncio.run(main()) == (0, 0)
+
+
+def test_set_limit_grows_and_shrinks():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        semaphore.set_limit(2)
+        await asyncio.wait_for(waiter, 1)
+        assert semaphore.in_use == 2
+        # Shrinking takes effect as holders release
+        semaphore.set_limit(1)
+        await semaphore.release()
+        blocked = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        await semaphore.release()
+        await asyncio.wait_for(blocked, 1)
+
+    asyncio.run(main())
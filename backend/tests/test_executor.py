@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.executor import CPUExecutor, LoopLagMonitor
+
+
+def _thread_name(_: object = None) -> str:
+    return threading.current_thread().name
+
+
+def test_small_inputs_run_inline_and_large_ones_in_the_pool():
+    executor = CPUExecutor("thread", workers=2, min_size=100)
+
+    async def main():
+        small = await executor.run(_thread_name, size=10)
+        large = await executor.run(_thread_name, size=1000)
+        unsized = await executor.run(_thread_name)
+        return small, large, unsized
+
+    try:
+        small, large, unsized = asyncio.run(main())
+    finally:
+        executor.close()
+    assert small == "MainThread"
+    assert large.startswith("cpu") and unsized.startswith("cpu")
+
+
+def test_process_pool_with_thread_override():
+    executor = CPUExecutor("process", workers=1, min_size=0)
+
+    async def main():
+        total = await executor.run(sum, [1, 2, 3])
+        # thread=True keeps shared state in-process
+        name = await executor.run(_thread_name, thread=True)
+        return total, name
+
+    try:
+        total, name = asyncio.run(main())
+    finally:
+        executor.close()
+    assert total == 6 and name.startswith("cpu")
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        CPUExecutor("fibers")
+
+
+def test_lag_monitor_sheds_until_lag_halves():
+    monitor = LoopLagMonitor(warn_threshold=0.25, shed_threshold=1.0)
+    recovered = []
+    monitor.on_recover.append(lambda: recovered.append(True))
+    monitor.observe(1.2)
+    assert monitor.overloaded
+    monitor.observe(0.6)  # below the threshold but not below half of it
+    assert monitor.overloaded and not recovered
+    monitor.observe(0.4)
+    assert not monitor.overloaded and recovered == [True]
+    assert monitor.stats()["max_lag"] == 1.2
+
+
+def test_lag_monitor_never_sheds_without_threshold():
+    monitor = LoopLagMonitor(shed_threshold=0)
+    monitor.observe(10.0)
+    assert not monitor.overloaded
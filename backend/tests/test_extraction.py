@@ -0,0 +1,61 @@
+from services.extraction import Page, _BM25, extract_passages, split_passages, strip_boilerplate
+from services.findings import estimate_tokens
+
+
+def test_strip_boilerplate_drops_chrome_and_keeps_text():
+    page = "\n".join([
+        "[Home](/) | [About](/about)",
+        "Accept all cookies",
+        "# Offshore wind",
+        "Offshore wind capacity doubled in 2023, driven by projects in the North Sea.",
+        "![chart](/img.png)",
+        "Menu",
+        "Menu",
+        "プライバシーポリシー",
+    ])
+    text = strip_boilerplate(page)
+    assert "Offshore wind capacity doubled" in text
+    assert "# Offshore wind" in text
+    for chrome in ("Home", "cookies", "img.png", "Menu", "プライバシー"):
+        assert chrome not in text
+
+
+def test_split_passages_keeps_headings_with_their_paragraph():
+    text = "# Title\n\n" + "A sentence here. " * 10 + "\n\n## Next\n\n" + "Other text. " * 10
+    passages = split_passages(text, passage_tokens=40)
+    assert passages[0].startswith("# Title\nA sentence")
+    assert any(p.startswith("## Next\nOther text") for p in passages)
+    assert all(estimate_tokens(p) <= 80 for p in passages)
+
+
+def test_bm25_prefers_rare_matching_terms():
+    docs = [["solar", "power", "cost"], ["wind", "power"], ["power", "grid", "power"]]
+    bm25 = _BM25(docs)
+    scores = [bm25.score(i, {"solar", "power"}) for i in range(3)]
+    assert scores[0] == max(scores)
+    assert bm25.score(1, {"nuclear"}) == 0.0
+
+
+def test_extract_passages_selects_relevant_text_within_budget():
+    relevant = "Battery storage costs fell sharply as lithium prices dropped."
+    filler = [f"Unrelated paragraph {i} about gardening and cooking recipes." for i in range(12)]
+    content = "\n\n".join(filler[:6] + [relevant] + filler[6:])
+    pages = [Page("https://a.example", content, "battery storage cost")]
+    [extracted] = extract_passages(pages, "battery prices", token_budget=30, passage_tokens=15)
+    assert relevant in extracted
+    assert estimate_tokens(extracted) <= 40
+
+
+def test_extract_passages_handles_japanese():
+    relevant = "蓄電池のコストはリチウム価格の下落で大きく低下した。"
+    filler = [f"料理のレシピと園芸の話題その{i}。" * 3 for i in range(10)]
+    content = "\n\n".join(filler[:5] + [relevant] + filler[5:])
+    pages = [Page("https://a.example", content, "蓄電池 コスト")]
+    [extracted] = extract_passages(pages, "蓄電池のコスト", token_budget=20, passage_tokens=15)
+    assert relevant in extracted
+
+
+def test_short_pages_are_kept_whole():
+    pages = [Page("https://a.example", "First point.\n\nSecond point.", "q")]
+    [extracted] = extract_passages(pages, "q", token_budget=100)
+    assert "First point." in extracted and "Second point." in extracted
@@ -0,0 +1,64 @@
+from services.findings import FindingsStore, truncate_to_tokens
+from services.text import index_terms
+
+JA_PAGE = (
+    "再生可能エネルギーの導入は世界各地で急速に進んでおり、太陽光発電と風力発電の"
+    "設備容量は過去十年で大きく増加した。日本でも固定価格買取制度の導入以降、"
+    "太陽光発電の普及が進み、系統への接続や出力制御が新たな課題となっている。"
+)
+
+
+def test_index_terms_splits_japanese_into_bigrams():
+    assert index_terms("Solar power") == ["solar", "power"]
+    assert index_terms("太陽光発電") == ["太陽", "陽光", "光発", "発電"]
+    assert index_terms("日 solar") == ["日", "solar"]
+
+
+def test_near_duplicate_japanese_content_is_dropped():
+    store = FindingsStore(dedup_threshold=0.8)
+    assert store.add("https://a.example/1", "A", JA_PAGE, kind="content") is not None
+    edited = JA_PAGE.replace("大きく", "著しく")
+    assert store.add("https://b.example/2", "B", edited, kind="content") is None
+    assert store.duplicates_dropped == 1
+
+
+def test_distinct_content_is_kept():
+    store = FindingsStore()
+    store.add("https://a.example/1", "A", JA_PAGE, kind="content")
+    other = "量子コンピュータは重ね合わせともつれを利用して計算を行う。" * 3
+    assert store.add("https://b.example/2", "B", other, kind="content") is not None
+    assert len(store) == 2
+
+
+def test_rank_matches_japanese_queries():
+    store = FindingsStore()
+    store.add("https://a.example/wind", "風力", "洋上風力発電の建設コストが下がっている。")
+    store.add("https://b.example/ai", "AI", "大規模言語モデルの推論コストについて。")
+    ranked = store.rank(["風力発電のコスト"])
+    assert ranked[0].url == "https://a.example/wind"
+
+
+def test_duplicate_url_is_ignored_after_canonicalization():
+    store = FindingsStore()
+    assert store.add("https://Example.com/page/?utm_source=x", "A", "text") is not None
+    assert store.add("https://example.com/page", "A", "text") is None
+    assert store.has("HTTPS://example.com/page/")
+
+
+def test_truncate_prefers_line_boundary():
+    text = "a" * 30 + "\n" + "b" * 30
+    assert truncate_to_tokens(text, 10) == "a" * 30
+    assert truncate_to_tokens("short", 10) == "short"
+
+
+def test_chunk_contexts_keep_sub_query_groups_together():
+    store = FindingsStore()
+    for i in range(3):
+        store.add(f"https://wind.example/{i}", "Wind", f"offshore wind farm {i} " * 20, query="wind")
+        store.add(f"https://solar.example/{i}", "Solar", f"solar panel {i} " * 20, query="solar")
+    budget = sum(f.tokens for f in store.findings if f.query == "solar")
+    chunks = store.chunk_contexts(["solar"], budget)
+    # The relevant sub-query's findings come first, together in one chunk
+    assert chunks[0].count("solar.example") == 3 and "wind.example" not in chunks[0]
+    assert all("solar.example" not in c for c in chunks[1:])
+    assert sum(c.count("### ") for c in chunks) == len(store)
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from services.concurrency import PrioritySemaphore
+from services.llm_gateway import AdaptiveLimit, TokenBucket
+
+
+def test_token_bucket_waits_for_refill():
+    async def main():
+        bucket = TokenBucket(6000)  # 100 tokens/s
+        await bucket.consume(6000)
+        started = time.monotonic()
+        await bucket.consume(20)
+        return time.monotonic() - started
+
+    assert 0.15 <= asyncio.run(main()) < 1.0
+
+
+def test_token_bucket_refund_and_disabled():
+    async def main():
+        bucket = TokenBucket(600)
+        await bucket.consume(600)
+        bucket.adjust(-300)  # the call used 300 fewer tokens than estimated
+        started = time.monotonic()
+        await bucket.consume(300)
+        assert time.monotonic() - started < 0.1
+        # A rate of 0 never waits
+        await TokenBucket(0).consume(10**9)
+
+    asyncio.run(main())
+
+
+def test_adaptive_limit_halves_on_429_and_regrows():
+    semaphore = PrioritySemaphore(8)
+    limit = AdaptiveLimit(semaphore, min_limit=1, max_limit=8, latency_target=1.0, cooldown=60)
+    limit.on_rate_limited()
+    assert semaphore.limit == 4
+    # Within the cooldown, a burst of 429s counts once
+    limit.on_rate_limited()
+    assert semaphore.limit == 4
+    # About +1 per window's worth of fast successes
+    for _ in range(5):
+        limit.on_success(0.1)
+    assert semaphore.limit == 5
+    # Slow successes don't grow the window
+    limit.on_success(5.0)
+    assert limit.window < 6
+
+
+def test_adaptive_limit_reacts_to_low_token_budget_headers():
+    semaphore = PrioritySemaphore(8)
+    limit = AdaptiveLimit(semaphore, min_limit=2, max_limit=8, latency_target=1.0, cooldown=0)
+    headers = {"x-ratelimit-remaining-tokens": "50", "x-ratelimit-limit-tokens": "1000"}
+    for _ in range(5):
+        limit.on_success(0.1, headers)
+    assert semaphore.limit == 2
+    limit.on_success(0.1, {"x-ratelimit-remaining-tokens": "oops"})
+    assert limit.window > 2
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from services.metrics import (
+    ERRORS,
+    MetricsRegistry,
+    call_span,
+    current_stage,
+    current_trace,
+    stage_span,
+    start_trace,
+)
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ("service",))
+    in_use = registry.gauge("in_use", "Slots in use.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("op",), buckets=(0.1, 1))
+    calls.inc(service='say "hi"')
+    calls.inc(2, service='say "hi"')
+    in_use.set(3)
+    latency.observe(0.05, op="get")
+    latency.observe(0.5, op="get")
+    latency.observe(5, op="get")
+    assert registry.render().splitlines() == [
+        "# HELP calls_total Calls.",
+        "# TYPE calls_total counter",
+        'calls_total{service="say \\"hi\\""} 3',
+        "# HELP in_use Slots in use.",
+        "# TYPE in_use gauge",
+        "in_use 3",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{op="get",le="0.1"} 1',
+        'latency_seconds_bucket{op="get",le="1"} 2',
+        'latency_seconds_bucket{op="get",le="+Inf"} 3',
+        'latency_seconds_sum{op="get"} 5.55',
+        'latency_seconds_count{op="get"} 3',
+    ]
+
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ("service",))
+    with pytest.raises(ValueError):
+        calls.inc(stage="x")
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Again.")
+
+
+def test_spans_record_into_the_task_trace():
+    async def task():
+        trace = start_trace()
+        with stage_span("search"):
+            assert current_stage() == "search"
+            with call_span("firecrawl", "search") as span:
+                span.outcome = "empty"
+        with pytest.raises(RuntimeError):
+            with stage_span("analyze"):
+                raise RuntimeError("bad json")
+        return trace, current_stage()
+
+    async def main():
+        # Each task gets its own trace; the caller's context is untouched
+        result = await asyncio.create_task(task())
+        return result, current_trace()
+
+    errors_before = ERRORS.value(stage="analyze", error="RuntimeError")
+    (trace, stage_after), outer = asyncio.run(main())
+    spans = trace.summary()["spans"]
+    assert set(spans) == {"search", "firecrawl.search", "analyze"}
+    assert spans["search"]["count"] == 1
+    assert stage_after == "none" and outer is None
+    assert ERRORS.value(stage="analyze", error="RuntimeError") == errors_before + 1
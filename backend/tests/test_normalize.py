@@ -0,0 +1,26 @@
+import pytest
+
+from sources.normalize import canonicalize_url, normalize_query
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("HTTP://Example.COM:80//a//b/", "http://example.com/a/b"),
+        ("https://example.com:8443/", "https://example.com:8443/"),
+        ("https://example.com/p?utm_source=x&b=2&a=1&fbclid=y#frag", "https://example.com/p?a=1&b=2"),
+        ("http://[::1]:8080/a/", "http://[::1]:8080/a"),
+        ("https://[2001:DB8::1]:443/", "https://[2001:db8::1]/"),
+        # Malformed ports are left alone rather than raising
+        ("http://a:99999/", "http://a:99999/"),
+        ("http://a:port/", "http://a:port/"),
+        ("not a url", "not a url"),
+    ],
+)
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_normalize_query():
+    assert normalize_query("  What   is  ＡＩ?  ") == "what is ai"
+    assert normalize_query("太陽光発電。") == "太陽光発電。"
@@ -0,0 +1,61 @@
+import asyncio
+
+from services.prefetch import Prefetcher
+
+
+class FakeFetch:
+    def __init__(self, slow: set[str] = frozenset()) -> None:
+        self.slow = slow
+        self.urls: list[str] = []
+
+    async def __call__(self, url: str) -> str:
+        self.urls.append(url)
+        if url in self.slow:
+            await asyncio.sleep(10)
+        if url.endswith("empty"):
+            return ""
+        if url.endswith("broken"):
+            raise RuntimeError("scrape failed")
+        return f"content of {url}"
+
+
+def test_start_fills_buffer_in_rank_order():
+    fetch = FakeFetch()
+
+    async def main():
+        prefetch = Prefetcher(fetch, max_pages=2)
+        started = prefetch.start([("u1", "q"), ("u1", "q"), ("u2", "q"), ("u3", "q")])
+        again = prefetch.start([("u4", "q")])  # buffer still full
+        pages = await prefetch.take(wait=True)
+        return started, again, pages
+
+    started, again, pages = asyncio.run(main())
+    assert (started, again) == (2, 0)
+    assert [(p.url, p.content) for p in pages] == [("u1", "content of u1"), ("u2", "content of u2")]
+    assert fetch.urls == ["u1", "u2"]
+
+
+def test_take_with_wait_drops_empty_and_failed_pages():
+    async def main():
+        prefetch = Prefetcher(FakeFetch(), max_pages=3)
+        prefetch.start([("ok", "q1"), ("empty", "q2"), ("broken", "q3")])
+        return await prefetch.take(wait=True)
+
+    pages = asyncio.run(main())
+    assert [(p.url, p.query) for p in pages] == [("ok", "q1")]
+
+
+def test_take_without_wait_keeps_finished_pages_and_cancels_the_rest():
+    async def main():
+        prefetch = Prefetcher(FakeFetch(slow={"slow"}), max_pages=2)
+        prefetch.start([("fast", "q"), ("slow", "q")])
+        await asyncio.sleep(0.01)
+        pending = [task for _, task in prefetch._tasks.values()]
+        pages = await prefetch.take(wait=False)
+        await asyncio.sleep(0)
+        return pages, pending, prefetch
+
+    pages, pending, prefetch = asyncio.run(main())
+    assert [p.url for p in pages] == ["fast"]
+    assert pending[1].cancelled()
+    assert prefetch._tasks == {}
@@ -0,0 +1,53 @@
+import time
+
+from services.blob_storage import BlobStorageService
+from services.report_cache import HashingEmbedder, ReportCache, cosine
+
+
+def test_exact_match_after_normalization():
+    cache = ReportCache()
+    cache.store("What is solar power?", "t1", "url", "report")
+    entry, similarity = cache.lookup("  what is SOLAR power ")
+    assert (entry.task_id, similarity) == ("t1", 1.0)
+
+
+def test_near_duplicate_queries_match_and_unrelated_miss():
+    cache = ReportCache(threshold=0.7)
+    cache.store("history of the solar power industry", "t1", "url", "report")
+    hit = cache.lookup("solar power industry history")
+    assert hit is not None and hit[0].task_id == "t1" and hit[1] < 1.0
+    assert cache.lookup("quantum computing error correction") is None
+    assert cache.stats()["similar_hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_japanese_queries_share_bigrams():
+    embedder = HashingEmbedder()
+    similar = cosine(embedder.embed("日本の太陽光発電の現状"), embedder.embed("太陽光発電の日本の現状"))
+    unrelated = cosine(embedder.embed("日本の太陽光発電の現状"), embedder.embed("量子計算の誤り訂正"))
+    assert similar > 0.8 > unrelated
+
+
+def test_ttl_and_lru_eviction():
+    cache = ReportCache(max_entries=2, ttl=60)
+    cache.store("a query", "t1", "url", "report")
+    cache.store("b query", "t2", "url", "report")
+    cache.lookup("a query")
+    cache.store("c query", "t3", "url", "report")
+    assert cache.lookup("b query") is None  # least recently used
+    cache._entries["a query"].created_at = time.time() - 120
+    assert cache.lookup("a query") is None  # expired
+    assert cache.lookup("c query") is not None
+
+
+def test_hits_get_a_freshly_signed_url():
+    storage = BlobStorageService(
+        "DefaultEndpointsProtocol=https;AccountName=dev;AccountKey=a2V5a2V5a2V5a2V5",
+        "reports",
+        sas_hours=1,
+    )
+    cache = ReportCache()
+    cache.store("solar", "t1", "https://old.example/expired", "report")
+    entry, _ = cache.lookup("solar")
+    url = storage.report_url(entry.task_id)
+    assert url.startswith("https://dev.blob.core.windows.net/reports/t1.md?")
+    assert "se=" in url and "sig=" in url
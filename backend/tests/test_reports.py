@@ -0,0 +1,87 @@
+import gzip
+
+import pytest
+
+from routers.reports import _accepts_gzip, _etag_matches, _parse_range
+from services.report_index import ReportBody, ReportBodyCache, ReportIndex
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=90-", (90, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=95-200", (95, 99)),
+        ("bytes=-500", (0, 99)),
+        ("bytes=100-", None),
+        ("bytes=9-2", None),
+        ("bytes=-", None),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+def test_etag_matching():
+    etag = '"abc"'
+    assert _etag_matches('"abc"', etag)
+    assert _etag_matches('W/"abc"', etag)
+    assert _etag_matches('"x", "abc-gzip"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"abd"', etag)
+    assert not _etag_matches(None, etag)
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.5", True),
+        ("gzip;q=0", False),
+        ("*", True),
+        ("identity", False),
+        (None, False),
+    ],
+)
+def test_accepts_gzip(header, expected):
+    assert _accepts_gzip(header) is expected
+
+
+def test_report_body_encodings():
+    body = ReportBody.build("# レポート\n")
+    assert gzip.decompress(body.gzipped) == body.data == "# レポート\n".encode()
+    assert body.etag.startswith('"') and body.etag.endswith('"')
+
+
+def test_body_cache_is_bounded_by_bytes():
+    bodies = [ReportBody.build(str(i) * 1000) for i in range(3)]
+    cache = ReportBodyCache(max_bytes=bodies[0].size * 2)
+    for i, body in enumerate(bodies):
+        cache.put(str(i), body)
+    assert cache.get("0") is None
+    assert cache.get("2") is bodies[2]
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_index_lists_searches_and_replaces(tmp_path):
+    index = ReportIndex(str(tmp_path / "reports.db"))
+    index.record("t1", "solar power", "Photovoltaic output rose in 2023.")
+    index.record("t2", "洋上風力", "洋上風力発電の建設コストが低下した。")
+    total, items = index.list()
+    assert total == 2 and [i["task_id"] for i in items] == ["t2", "t1"]
+
+    total, items = index.list(search="photovoltaic")
+    assert [i["task_id"] for i in items] == ["t1"] and "Photovoltaic" in items[0]["snippet"]
+    assert index.list(search="建設コスト")[1][0]["task_id"] == "t2"
+    # Words under three characters can't be searched with the trigram tokenizer
+    assert index.list(search="of") == (0, [])
+
+    created = index.get("t1")["created_at"]
+    index.record("t1", "solar power", "Revised text.")
+    assert index.get("t1")["created_at"] == created
+    assert index.content("t1") == "Revised text."
+    assert index.list(search="photovoltaic") == (0, [])
+    index.close()
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from config import Settings
+from services.findings import FindingsStore
+from services.metrics import TaskTrace
+from services.research_engine import _budget_exhausted, _novel_queries, _summarize_findings
+from services.task_models import TaskInfo
+from services.task_registry import TaskRegistry
+
+
+class FakeLLM:
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+        self.prompts: list[str] = []
+
+    async def complete(self, priority: int = 0, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        prompt = kwargs["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        message = SimpleNamespace(content=f"notes on {prompt.count('### ')} findings")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _findings(n: int) -> FindingsStore:
+    store = FindingsStore()
+    for i in range(n):
+        store.add(f"https://example.com/{i}", f"Page {i}", f"solar fact number {i} " * 40)
+    return store
+
+
+def test_summarize_findings_maps_chunks_in_parallel():
+    findings = _findings(6)
+    per_finding = findings.findings[0].tokens
+    config = Settings(REPORT_CHUNK_TOKENS=per_finding * 2, REPORT_MAX_CHUNKS=2)
+    registry = TaskRegistry()
+    registry.backend.create(TaskInfo(id="t1"))
+    llm = FakeLLM()
+
+    notes = asyncio.run(_summarize_findings("solar", "t1", registry, config, llm, findings))
+
+    # Six findings make three chunks of two; the cap keeps the first two
+    assert len(llm.prompts) == 2 and llm.max_running == 2
+    assert notes == "## Notes 1\nnotes on 2 findings\n\n## Notes 2\nnotes on 2 findings"
+    messages = [e.message for e in registry.backend.get("t1").events]
+    assert messages[0] == "Summarizing findings in 2 parts..."
+    assert messages[-1] == "Summarized part 2 of 2"
+
+
+def test_novel_queries_drop_repeats_of_earlier_and_sibling_queries():
+    previous = ["solar panel efficiency"]
+    candidates = [
+        "Solar panel efficiency",  # same as an earlier query after normalization
+        "offshore wind costs",
+        "costs of offshore wind",  # same terms as its sibling
+        "",
+        "太陽光発電の効率",
+    ]
+    kept = _novel_queries(candidates, previous, threshold=0.7)
+    assert kept == ["offshore wind costs", "太陽光発電の効率"]
+
+
+def test_budget_exhausted_names_the_budget():
+    trace = TaskTrace()
+    unlimited = Settings(TASK_TIME_BUDGET_SECONDS=0, TASK_TOKEN_BUDGET=0)
+    assert _budget_exhausted(unlimited, time.monotonic() - 3600, trace) is None
+    timed = Settings(TASK_TIME_BUDGET_SECONDS=10)
+    assert _budget_exhausted(timed, time.monotonic(), trace) is None
+    assert _budget_exhausted(timed, time.monotonic() - 11, trace) == "time_budget"
+    tokens = Settings(TASK_TOKEN_BUDGET=1000)
+    trace.tokens = 1000
+    assert _budget_exhausted(tokens, time.monotonic(), trace) == "token_budget"
+    assert _budget_exhausted(tokens, time.monotonic(), None) is None
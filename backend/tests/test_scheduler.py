@@ -0,0 +1,48 @@
+import asyncio
+
+from services.scheduler import ResearchScheduler
+from services.task_registry import TaskRegistry
+
+
+def test_free_slots_go_round_robin_across_clients():
+    async def main():
+        registry = TaskRegistry()
+        scheduler = ResearchScheduler(registry, max_running=1)
+        started: list[str] = []
+
+        async def work(name: str) -> None:
+            started.append(name)
+            await asyncio.sleep(0.01)
+
+        submissions = [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b")]
+        for task_id, client in submissions:
+            scheduler.submit(task_id, client, work(task_id))
+        await asyncio.sleep(0)
+        positions = {task_id: scheduler.position(task_id) for task_id, _ in submissions}
+        await asyncio.gather(*registry._async_tasks.values())
+        return started, positions
+
+    started, positions = asyncio.run(main())
+    # b1 is not stuck behind all of client a's burst
+    assert started == ["a1", "a2", "b1", "a3"]
+    # Positions assume nothing finishes meanwhile, so b (nothing running) goes first
+    assert positions == {"a1": None, "a2": 2, "a3": 3, "b1": 1}
+
+
+def test_queued_tasks_get_position_events():
+    async def main():
+        registry = TaskRegistry()
+        scheduler = ResearchScheduler(registry, max_running=1)
+        gate = asyncio.Event()
+        scheduler.submit("first", "a", gate.wait())
+        scheduler.submit("second", "b", asyncio.sleep(0))
+        await asyncio.sleep(0.01)
+        info = await registry.get_task("second")
+        status, events = info.status, list(info.events)
+        gate.set()
+        await asyncio.gather(*registry._async_tasks.values())
+        return status, events
+
+    status, events = asyncio.run(main())
+    assert status == "queued"
+    assert [(e.event_type, e.data) for e in events] == [("queued", {"position": 1})]
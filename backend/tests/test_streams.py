@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from services.streams import MultiplexedStream, StreamHub
+from services.task_models import ProgressEvent
+from services.task_registry import TaskRegistry
+
+
+async def _snapshot_of(registry: TaskRegistry, task_id: str) -> dict:
+    info = await registry.get_task(task_id)
+    if info is None:
+        return {"id": task_id, "status": "not_found", "last_event_id": 0}
+    return {"id": task_id, "status": info.status, "last_event_id": info.last_seq}
+
+
+def test_hub_enforces_max_streams():
+    registry = TaskRegistry()
+    hub = StreamHub(max_streams=1)
+    first = MultiplexedStream(registry, lambda t: _snapshot_of(registry, t))
+    hub.open(first)
+    assert hub.full
+    with pytest.raises(ValueError):
+        hub.open(MultiplexedStream(registry, lambda t: _snapshot_of(registry, t)))
+    hub.discard(first)
+    assert len(hub) == 0 and not hub.full
+
+
+def test_stream_merges_snapshot_and_live_events():
+    async def main():
+        registry = TaskRegistry()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            await registry.emit("t", ProgressEvent("completed", "done", 100))
+
+        registry.create_task("t", work())
+        stream = MultiplexedStream(registry, lambda t: _snapshot_of(registry, t), max_tasks=2)
+        added = await stream.add({"t": None, "missing": None})
+        items = stream.events(keepalive=1)
+        snapshot = await items.__anext__()
+        release.set()
+        event = await items.__anext__()
+        stream.close()
+        await registry.shutdown()
+        return added, snapshot, event
+
+    added, snapshot, event = asyncio.run(main())
+    assert added == ["t", "missing"]
+    assert [s["status"] for s in snapshot[2]] == ["pending", "not_found"]
+    assert event[:2] == ("event", "t") and event[2].event_type == "completed"
+
+
+def test_stream_rejects_too_many_tasks():
+    async def main():
+        registry = TaskRegistry()
+        stream = MultiplexedStream(registry, lambda t: _snapshot_of(registry, t), max_tasks=1)
+        await stream.add({"a": None})
+        with pytest.raises(ValueError):
+            await stream.add({"b": None})
+
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from services.concurrency import PrioritySemaphore
+from services.task_backends import InMemoryTaskBackend, SQLiteTaskBackend
+from services.task_models import ProgressEvent, TaskInfo
+from services.task_registry import TaskRegistry
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = InMemoryTaskBackend(event_log_size=8)
+    else:
+        backend = SQLiteTaskBackend(str(tmp_path / "tasks.db"), event_log_size=8)
+    yield backend
+    backend.close()
+
+
+def test_update_returns_row_fields(backend):
+    backend.create(TaskInfo(id="t"))
+    backend.append_event("t", ProgressEvent("progress", "step", 10))
+    info = backend.update("t", status="running", progress=20)
+    assert (info.status, info.progress, info.last_seq) == ("running", 20, 1)
+    assert backend.update("missing", status="running") is None
+
+
+def test_get_without_events(backend):
+    backend.create(TaskInfo(id="t"))
+    backend.append_event("t", ProgressEvent("progress", "step", 10))
+    assert [m["content"] for m in backend.get("t").messages] == ["step"]
+    assert backend.get("t", events=False).last_seq == 1
+
+
+def test_finish_fails_unfinished_tasks_only(backend):
+    backend.create(TaskInfo(id="done"))
+    backend.update("done", status="completed")
+    backend.create(TaskInfo(id="stuck"))
+    backend.update("stuck", status="running")
+    assert backend.finish("done") == "completed"
+    assert backend.finish("stuck") == "failed"
+    assert backend.get("stuck").error == "Task exited unexpectedly"
+    assert backend.get("done").finished_at is not None
+    assert backend.finish("missing") is None
+
+
+def test_event_log_is_bounded(backend):
+    backend.create(TaskInfo(id="t"))
+    for i in range(20):
+        backend.append_event("t", ProgressEvent("progress", str(i), i))
+    events = backend.events_after("t", 0)
+    assert [e.seq for e in events] == list(range(13, 21))
+
+
+def test_registry_emits_in_order_and_finishes(backend):
+    async def main():
+        registry = TaskRegistry(backend, poll_interval=0.01)
+
+        async def work():
+            # Concurrent emits still get sequence numbers in call order
+            await asyncio.gather(
+                *(registry.emit("t", ProgressEvent("progress", str(i), i)) for i in range(5))
+            )
+
+        registry.create_task("t", work())
+        seen = [e.seq async for e in registry.subscribe("t")]
+        await registry.shutdown()
+        return seen, await registry.get_task("t", events=False)
+
+    seen, info = asyncio.run(main())
+    assert seen == [1, 2, 3, 4, 5]
+    assert info.status == "failed" and info.finished_at is not None
+
+
+def test_sqlite_lease_released_from_another_task(tmp_path):
+    backend = SQLiteTaskBackend(str(tmp_path / "tasks.db"), lease_seconds=3)
+
+    async def stream(semaphore):
+        async with semaphore.slot():
+            yield 1
+            yield 2
+
+    async def main():
+        semaphore = PrioritySemaphore(2, backend.semaphore("llm", 2))
+        chunks = stream(semaphore)
+        # Acquired in one task, finalized in another (as LLMGateway.stream can be)
+        await asyncio.create_task(chunks.__anext__())
+        await asyncio.create_task(chunks.aclose())
+        return semaphore.in_use
+
+    assert asyncio.run(main()) == 0
+    assert backend._execute("SELECT COUNT(*) FROM leases")[0][0] == 0
+    backend.close()
+
+
+def test_cancel_marks_task_failed(backend):
+    async def main():
+        registry = TaskRegistry(backend)
+        registry.create_task("t", asyncio.sleep(10))
+        await asyncio.sleep(0)
+        cancelled = await registry.cancel_task("t")
+        await registry.shutdown()
+        return cancelled, await registry.get_task("t", events=False)
+
+    cancelled, info = asyncio.run(main())
+    assert cancelled
+    assert (info.status, info.error) == ("failed", "Cancelled by user")
+
+
+def test_resume_past_the_event_ring_gets_a_resync(backend):
+    async def main():
+        registry = TaskRegistry(backend)
+        backend.create(TaskInfo(id="t"))
+        for i in range(1, 11):
+            await registry.emit("t", ProgressEvent("progress", str(i), i))
+        await registry.emit("t", ProgressEvent("completed", "done", 100))
+        resumed = [e async for e in registry.subscribe("t", last_event_id=2)]
+        caught_up = [e async for e in registry.subscribe("t", last_event_id=9)]
+        return resumed, caught_up
+
+    resumed, caught_up = asyncio.run(main())
+    # event_log_size is 8: events 4-11 are kept, so 3 was evicted
+    assert resumed[0].event_type == "resync"
+    assert resumed[0].seq == 3
+    assert resumed[0].data["missed"] == 1
+    assert resumed[0].data["status"] == "pending"
+    assert [e.seq for e in resumed[1:]] == list(range(4, 12))
+    assert [e.event_type for e in caught_up] == ["progress", "completed"]
+
+
+def test_sweep_compacts_oldest_finished_tasks_into_records(backend):
+    for task_id in ("old", "mid", "new", "live", "watched"):
+        backend.create(TaskInfo(id=task_id))
+    for task_id in ("watched", "old", "mid", "new"):
+        backend.update(task_id, status="completed", result_url=f"url-{task_id}")
+        backend.finish(task_id)
+    # Only the newest finished task is retained; subscribed and live tasks stay
+    assert backend.sweep(3600, 1, 3600, 10, keep={"watched"}) == 2
+    assert backend.get("old") is None and backend.get("mid") is None
+    assert backend.get("new") is not None and backend.get("live") is not None
+    assert backend.get("watched") is not None
+    record = backend.get_record("old")
+    assert (record.status, record.result_url) == ("completed", "url-old")
+    # Records past max_records go oldest first
+    assert backend.sweep(3600, 1, 3600, 1, keep={"watched"}) == 0
+    assert backend.get_record("old") is None and backend.get_record("mid") is not None
+
+
+def test_memory_stats_account_live_retained_and_records():
+    backend = InMemoryTaskBackend()
+    for task_id in ("a", "b", "c"):
+        backend.create(TaskInfo(id=task_id))
+    for task_id in ("b", "c"):
+        backend.update(task_id, status="completed")
+        backend.finish(task_id)
+    backend.sweep(3600, 1, 3600, 10, keep=set())
+    stats = backend.stats()
+    assert (stats["live_tasks"], stats["retained_tasks"], stats["terminal_records"]) == (1, 1, 1)
+    assert all(size > 0 for size in stats["approx_memory_bytes"].values())
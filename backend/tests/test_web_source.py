@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from config import Settings
+from services.http_client import close_http_client, get_http_client
+from sources.web_source import WebSource
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_search_and_scrape_share_the_given_client():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.path, request.headers["Authorization"]))
+        if request.url.path.endswith("/search"):
+            data = [{"title": "T", "url": "https://example.com", "description": "D"}]
+            return httpx.Response(200, json={"data": data})
+        return httpx.Response(200, json={"data": {"markdown": "# Page"}})
+
+    async def main():
+        async with _client(handler) as client:
+            source = WebSource("key", client, base_url="https://firecrawl.test/v1/")
+            return await source.search("q"), await source.fetch_content("https://example.com")
+
+    results, content = asyncio.run(main())
+    assert [(r.title, r.url, r.snippet) for r in results] == [("T", "https://example.com", "D")]
+    assert content == "# Page"
+    assert seen == [("/v1/search", "Bearer key"), ("/v1/scrape", "Bearer key")]
+
+
+def test_errors_return_empty_unless_raise_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500)
+
+    async def main():
+        async with _client(handler) as client:
+            quiet = WebSource("key", client)
+            loud = WebSource("key", client, raise_errors=True)
+            empty = (await quiet.search("q"), await quiet.fetch_content("u"))
+            with pytest.raises(httpx.HTTPStatusError):
+                await loud.search("q")
+            return empty
+
+    assert asyncio.run(main()) == ([], "")
+
+
+def test_http_client_is_shared_until_closed():
+    config = Settings(HTTP2_ENABLED=False)
+
+    async def main():
+        first = get_http_client(config)
+        assert get_http_client(config) is first
+        await close_http_client()
+        assert first.is_closed
+        second = get_http_client(config)
+        await close_http_client()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert second is not first
@@ -2,11 +2,13 @@ const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
 export interface TaskInfo {
 	id: string;
-	status: 'pending' | 'running' | 'completed' | 'failed';
+	status: 'pending' | 'queued' | 'running' | 'completed' | 'failed';
 	progress: number;
 	messages: Array<{ role: string; content: string; timestamp?: string }>;
 	result_url: string | null;
 	error: string | null;
+	last_event_id: number;
+	queue_position: number | null;
 }
 
 export interface ProgressEvent {
@@ -51,8 +53,10 @@ export function subscribeToTask(
 		}
 	};
 	es.onerror = () => {
-		es.close();
-		onDone?.();
+		// While CONNECTING the browser retries on its own and resumes via Last-Event-ID
+		if (es.readyState === EventSource.CLOSED) {
+			onDone?.();
+		}
 	};
 	return es;
 }